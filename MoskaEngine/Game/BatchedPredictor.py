@@ -0,0 +1,94 @@
+from __future__ import annotations
+import threading
+import numpy as np
+from typing import Any, Callable, Dict, List, Tuple
+
+class _PredictRequest:
+    """ A pending prediction of one game. """
+    def __init__(self, X : np.ndarray, model_id : Any):
+        self.X = X
+        self.model_id = model_id
+        self.result : np.ndarray = None
+        self.error : Exception = None
+        self.done = False
+
+    def key(self) -> Tuple:
+        """ Requests with the same key can be concatenated to a single model call. """
+        model_id = tuple(self.model_id) if isinstance(self.model_id, list) else self.model_id
+        return (model_id, self.X.shape[1:], self.X.dtype.str)
+
+
+class BatchedPredictor:
+    """ Collects the model predictions of several games running in the same process, and makes them with one model call.
+
+    Each game runs in its own thread, and is registered with 'add_game' before it starts and 'remove_game' after it has ended.
+    When a game has a BatchedPredictor, MoskaGame.model_predict calls 'predict', which blocks the game until
+    every registered game is waiting for a prediction (or has ended). Then the requests are concatenated
+    (grouped by model and input shape), the model is called once per group, and each game is resumed with its own rows of the output.
+
+    The games do not need to load the models themselves. The 'predict_func' takes the concatenated input and the model_id,
+    and must return an array of shape (nmodels, nsamples, ...) like MoskaGame.model_predict.
+    """
+    def __init__(self, predict_func : Callable[[np.ndarray, Any], np.ndarray]):
+        self.predict_func = predict_func
+        self.ngames = 0                                 # The number of registered games, that have not ended
+        self.pending : List[_PredictRequest] = []       # Requests waiting for the next model call
+        self.nrequests = 0                              # Total number of predictions requested by the games
+        self.ncalls = 0                                 # Total number of calls to 'predict_func'
+        self._cond = threading.Condition()
+
+    def add_game(self) -> None:
+        """ Register a game, that may request predictions. """
+        with self._cond:
+            self.ngames += 1
+        return
+
+    def remove_game(self) -> None:
+        """ Unregister an ended game. The games waiting for a prediction might now be the only active games. """
+        with self._cond:
+            self.ngames -= 1
+            self._flush_if_ready()
+        return
+
+    def predict(self, X : np.ndarray, model_id : (str or int) = "all") -> np.ndarray:
+        """ Wait until the prediction of X is made as part of a batch, and return it.
+        The output is the same as if 'predict_func' was called with only X.
+        """
+        request = _PredictRequest(X, model_id)
+        with self._cond:
+            self.pending.append(request)
+            self.nrequests += 1
+            self._flush_if_ready()
+            self._cond.wait_for(lambda : request.done)
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _flush_if_ready(self) -> None:
+        """ Make the pending predictions if all the registered games are waiting. Must be called with the lock held. """
+        if not self.pending or len(self.pending) < self.ngames:
+            return
+        requests = self.pending
+        self.pending = []
+        groups : Dict[Tuple, List[_PredictRequest]] = {}
+        for request in requests:
+            groups.setdefault(request.key(), []).append(request)
+        for group in groups.values():
+            try:
+                X = np.concatenate([request.X for request in group], axis=0) if len(group) > 1 else group[0].X
+                out = self.predict_func(X, group[0].model_id)
+                self.ncalls += 1
+            except Exception as e:
+                for request in group:
+                    request.error = e
+                    request.done = True
+                continue
+            # Split the output along the sample axis
+            start = 0
+            for request in group:
+                end = start + request.X.shape[0]
+                request.result = out[:, start:end]
+                request.done = True
+                start = end
+        self._cond.notify_all()
+        return
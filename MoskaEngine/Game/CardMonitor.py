@@ -1,10 +1,9 @@
 from __future__ import annotations
 import itertools
 import random
-from typing import TYPE_CHECKING, List, Tuple
+from typing import TYPE_CHECKING, Dict, List, Tuple
 from ..Player.AbstractPlayer import AbstractPlayer
-from .Deck import Card, StandardDeck
-from .utils import check_can_kill_card
+from .Deck import Card, UNKNOWN_CARD, ALL_CARDS_MASK, KILL_MASKS, cards_to_mask, mask_to_cards, mask_popcount
 if TYPE_CHECKING:
     from .Game import MoskaGame
 
@@ -13,24 +12,79 @@ class CardMonitor:
     CardMonitor is a class that keeps track of the cards that are known to each player, and which cards have fallen.
     Each time a move is played, the CardMonitor is updated with the new information, such as:
     - If a player picked cards from the table, each player now knows them.
-    - If cards are discarded from the table, the cards are removed from the cards_fall_dict as keys and values
+    - If cards are discarded from the table, the cards are removed from the game.
 
-    The attributes:
-    - player_cards: A dictionary that maps player names to a list of cards. Some cards in this list are not known, and are marked as Card(-1,"X").
-    If the CardMonitor has observed, that a player has publically lifted some cards, then the unknown cards are updated.
-    - cards_fall_dict: A dictionary that maps cards to a list of cards. The cards in the list are the cards, that the key card can fall.
+    The information is stored as bitmasks of cards (see Deck.cards_to_mask):
+    - in_game_mask: The cards that are still in the game. The cards a card can kill are KILL_MASKS[trump][card.id] & in_game_mask,
+    so the score of a card is a popcount, and removing cards from the game is a single mask update.
+    - known_masks: Maps player names to the cards, that the player is publicly known to have.
+    - unknown_counts: Maps player names to the number of cards in the players hand, that are not publicly known.
+
+    The old list based views are available as properties, which are materialised when they are read:
+    - player_cards: A dictionary that maps player names to a list of cards. The unknown cards are marked as Card(-1,"X"),
+    and are first in the list, followed by the known cards in id order.
+    - cards_kill_dict: A dictionary that maps the cards in the game to a list of cards, that the key card can kill.
     """
-    player_cards : dict[str,List[Card]]= {}
-    cards_kill_dict : dict[Card,List[Card]] = {}
+    in_game_mask : int = 0                  # The cards still in the game
+    known_masks : Dict[str,int] = {}        # The cards each player is publicly known to have
+    unknown_counts : Dict[str,int] = {}     # The number of not publicly known cards in each players hand
     game : MoskaGame = None
     started : bool = False
         
     def __init__(self,moskaGame : MoskaGame, ignore_errors : bool = False) -> None:
         self.game = moskaGame
-        self.player_cards = {}
-        self.cards_kill_dict = {}
+        self.in_game_mask = 0
+        self.known_masks = {}
+        self.unknown_counts = {}
+        self._kill_dict_cache : Tuple[int,Dict[Card,List[Card]]] = (None, {})
         self.started = False
         self.ignore_errors = ignore_errors
+    
+    @property
+    def player_cards(self) -> Dict[str,List[Card]]:
+        """ The cards of each player as lists, where the cards that are not publicly known are Card(-1,"X").
+        The lists are created when this is read, so modifying them does not change the CardMonitor.
+        """
+        return {name : [UNKNOWN_CARD]*self.unknown_counts[name] + mask_to_cards(mask) for name, mask in self.known_masks.items()}
+    
+    @player_cards.setter
+    def player_cards(self, player_cards : Dict[str,List[Card]]) -> None:
+        self.known_masks = {name : cards_to_mask(cards) for name, cards in player_cards.items()}
+        self.unknown_counts = {name : sum((1 for card in cards if card is UNKNOWN_CARD)) for name, cards in player_cards.items()}
+    
+    @property
+    def cards_kill_dict(self) -> Dict[Card,List[Card]]:
+        """ A dictionary of the cards in the game (ordered by id), and the cards in the game that they can kill.
+        The dictionary is created when this is read after the cards in the game have changed, and must not be modified.
+        """
+        mask, kill_dict = self._kill_dict_cache
+        if mask != self.in_game_mask:
+            mask = self.in_game_mask
+            kill_masks = KILL_MASKS[self.game.trump]
+            kill_dict = {card : mask_to_cards(kill_masks[card.id] & mask) for card in mask_to_cards(mask)}
+            self._kill_dict_cache = (mask, kill_dict)
+        return kill_dict
+    
+    @cards_kill_dict.setter
+    def cards_kill_dict(self, cards_kill_dict : Dict[Card,List[Card]]) -> None:
+        # The lists of killable cards always follow from the cards in the game
+        self.in_game_mask = cards_to_mask(cards_kill_dict.keys())
+    
+    def cards_in_game(self) -> List[Card]:
+        """ Return the cards that are still in the game, ordered by id. """
+        return mask_to_cards(self.in_game_mask)
+    
+    def kill_mask(self, card : Card) -> int:
+        """ Return the bitmask of the cards in the game, that 'card' can kill. """
+        return KILL_MASKS[self.game.trump][card.id] & self.in_game_mask
+    
+    def card_score(self, card : Card) -> int:
+        """ Return how many cards in the game 'card' can kill. """
+        return mask_popcount(KILL_MASKS[self.game.trump][card.id] & self.in_game_mask)
+    
+    def ncards(self, player_name : str) -> int:
+        """ Return the number of cards the player has, known or not. """
+        return mask_popcount(self.known_masks[player_name]) + self.unknown_counts[player_name]
         
     def start(self) -> None:
         """ Start tracking cards.
@@ -41,27 +95,37 @@ class CardMonitor:
         # The trump card has been changed at this point.
         # Search where the card is, and if a player has it everyone knows it, so update the card monitor
         for pl in self.game.players:
-            self.player_cards[pl.name] = []
-
+            self.known_masks[pl.name] = 0
+            self.unknown_counts[pl.name] = 0
             if self.game._orig_trump_card in pl.hand.cards:
-                cards = [Card(-1,"X") for _ in range(5)] + [self.game._orig_trump_card]
+                cards = [UNKNOWN_CARD]*5 + [self.game._orig_trump_card]
                 self.game.glog.info(f"Trump card on player: {pl.name}")
             else:
-                cards = [Card(-1,"X") for _ in range(6)]
+                cards = [UNKNOWN_CARD]*6
             self.update_known(pl.name,cards=cards,add=True)
             # Old backup, if there are incorrect players
-            if len(self.player_cards[pl.name]) != 6:
-                self.player_cards.pop(pl.name)
+            if self.ncards(pl.name) != 6:
+                self.known_masks.pop(pl.name)
+                self.unknown_counts.pop(pl.name)
             
         self.game.glog.info(f"Created card monitor. Player Cards:")
         for pl, cards in self.player_cards.items():
             self.game.glog.info(f"{pl} : {cards}")
         self.make_cards_kill_dict()
-        assert len(self.cards_kill_dict) == 52, f"Invalid make cards fall dict"
+        assert mask_popcount(self.in_game_mask) == 52, f"Invalid make cards fall dict"
         self.started = True
         self.game.glog.info(f"Card monitor started")
         return
     
+    def get_hidden_mask(self,player : AbstractPlayer) -> int:
+        """ Same as get_hidden_cards, but returns a bitmask of the cards. """
+        known_mask = player.hand.mask | cards_to_mask(self.game.cards_to_fall) | cards_to_mask(self.game.fell_cards)
+        for pl, mask in self.known_masks.items():
+            if pl == player.name:
+                continue
+            known_mask |= mask
+        return self.in_game_mask & ~known_mask
+    
     def get_hidden_cards(self,player : AbstractPlayer) -> List[Card]:
         """Get a list of cards whose location is not known to the player.
         This has all cards in a standard deck, EXCEPT:
@@ -69,19 +133,9 @@ class CardMonitor:
         - Cards that are in the table (fell, and not-fell cards)
         - The cards the player calling this function has in their hand.
 
-        All other cards locations are not known
+        All other cards locations are not known. The cards are ordered by id.
         """
-        known_cards = player.hand.copy().cards
-        known_cards += self.game.cards_to_fall.copy()
-        known_cards += self.game.fell_cards.copy()
-        for pl, cards in self.player_cards.items():
-            if pl == player.name:
-                continue
-            known_cards += [card for card in cards if card != Card(-1,"X")]
-        # Each player knows which cards are still in the game, and which cards are known to them
-        # The hidden cards are the intersection of the cards that are still in the game and the cards that are known to the player
-        hidden_cards = [card for card in self.cards_kill_dict.keys() if card not in known_cards]
-        return hidden_cards
+        return mask_to_cards(self.get_hidden_mask(player))
     
     
     def get_cards_possibly_in_deck(self,player : AbstractPlayer) -> list[Card]:
@@ -116,14 +170,14 @@ class CardMonitor:
             cards_possibly_in_deck.remove(self.game.trump_card)
         samples = []
         # Shuffle the cards for fun
-        random.shuffle(cards_possibly_in_deck)
+        player.rng.shuffle(cards_possibly_in_deck)
         def random_combination(iterable, r):
             # Read all combination tuples to a list
             # Return r random combinations from all the combinations itertools.combinations(cards, ncards)
             pool = tuple(iterable)
             n = len(pool)
             # No sort needed
-            indices = random.sample(range(n), min(r, n))
+            indices = player.rng.sample(range(n), min(r, n))
             return tuple(pool[i] for i in indices)
         combs = itertools.combinations(cards_possibly_in_deck,ncards)
         # If the player will lift the remaining deck, there will be the trump card in the lifted cards
@@ -137,18 +191,9 @@ class CardMonitor:
         return samples
 
     def make_cards_kill_dict(self):
-        """Create the cards_fall_dict by going through each card
-        and checking if each card can be fell with the card
+        """Put all the cards of a standard deck in the game. The cards each card can kill are then read from the precomputed kill masks of the trump suit.
         """
-        deck = StandardDeck().pop_cards(52)
-        for i,card in enumerate(deck):
-            self.cards_kill_dict[card] = []
-            for i2,card2 in enumerate(deck):
-                if i == i2:
-                    continue
-                # Requires the game to be started, otherwise we have no information on the trump suit
-                if check_can_kill_card(card,card2,self.game.trump):
-                    self.cards_kill_dict[card].append(card2)
+        self.in_game_mask = ALL_CARDS_MASK
         return
     
     def update_from_move(self, moveid : str, args : Tuple) -> None:
@@ -172,73 +217,82 @@ class CardMonitor:
         # If there are only 2 players left (and no deck), we know the other players cards, and can infer the other players cards reliably
         # This can also be possible for more players, but with 2 it is trivial
         pl_left = self.game.get_players_condition(lambda x: x.EXIT_STATUS == 0)
-        if len(pl_left) == 2 and len(self.game.deck) == 0 and player.EXIT_STATUS == 0 and any((c.rank == -1 for c in self.player_cards[pl_left[0].name] + self.player_cards[pl_left[1].name])):
+        if len(pl_left) == 2 and len(self.game.deck) == 0 and player.EXIT_STATUS == 0 and (self.unknown_counts[pl_left[0].name] or self.unknown_counts[pl_left[1].name]):
             self.game.glog.info(f"Only two players left, updating known cards")
-            # Get the cards that are hidden to the player
+            self._save_contents(self.known_masks, self.unknown_counts)
             # If there are only two players left, we know the other players cards
-            hidden_cards = self.get_hidden_cards(player)
+            hidden_mask = self.get_hidden_mask(player)
             other_player = self.game.get_players_condition(lambda x: x.EXIT_STATUS == 0 and x.name != player.name)[0]
 
             # The other players cards are the hidden cards + what we already know about the other player
-            self.player_cards[other_player.name] = [c for c in self.player_cards[other_player.name] if c.suit != "X"] + hidden_cards
+            self.known_masks[other_player.name] |= hidden_mask
+            self.unknown_counts[other_player.name] = 0
+            known_mask = self.known_masks[other_player.name]
 
-            if len(other_player.hand.cards) != len(self.player_cards[other_player.name]):
+            if len(other_player.hand.cards) != mask_popcount(known_mask):
                 self.game.glog.error(f"Other players actual hand and counted cards do not match on length")
                 self.game.glog.error(f"Other players actual hand: {other_player.hand.cards}")
-                self.game.glog.error(f"Other players counted cards: {self.player_cards[other_player.name]}")
+                self.game.glog.error(f"Other players counted cards: {mask_to_cards(known_mask)}")
                 if not self.ignore_errors:
                     raise Exception(f"Other players actual hand and counted cards do not match on length")
                 #raise Exception(f"Other players actual hand and counted cards do not match on length")
-            if not all([c in self.player_cards[other_player.name] for c in other_player.hand.cards]):
+            if other_player.hand.mask & ~known_mask:
                 if not self.ignore_errors:
                     raise Exception(f"Other players actual hand and counted cards do not match on cards")
 
-            other_player.plog.info(f"Updated known cards: {self.player_cards[other_player.name]}")
+            other_player.plog.info(f"Updated known cards: {mask_to_cards(known_mask)}")
             other_player.plog.info(f"Actual hand: {other_player.hand.cards}")
         # After updating known cards, check if the player lifted unknown cards from deck
         self.update_unknown(player.name)
         # No updates to hand when playing from deck or skipping
         return
     
+    def _save_contents(self, *containers) -> None:
+        """ Record the contents of containers to the games undo journal, if there is one (the game is making a mock move).
+        """
+        journal = self.game.undo_journal
+        if journal is None:
+            return
+        for container in containers:
+            journal.save_contents(container)
+        return
+    
+    def _save_attr(self, name : str) -> None:
+        """ Record the value of an attribute of the CardMonitor to the games undo journal, if there is one. """
+        journal = self.game.undo_journal
+        if journal is not None:
+            journal.save_attr(self, name)
+        return
+    
     def remove_from_game(self,cards : List[Card]) -> None:
-        """ Remove cards from the card monitor. Both as keys and values in the cards_fall_dict.
+        """ Remove cards from the game, so they are no longer in cards_kill_dict as keys or values.
         This is called at the end of a turn, and when cards are fallen from hand.
         
         Called from Turns.EndTurn.clear_table with moskaGame.fell_cards IF all cards were not lifted
         """
-        # Remove the removed cards from the cards_fall_dict
-        for card in cards:
-            # Remove the fallen card as a key
-            if card in self.cards_kill_dict:
-                self.cards_kill_dict.pop(card)
-        # Remove the card as value from the list
-        for card_d, falls in self.cards_kill_dict.copy().items():
-            for card in cards:
-                if card in falls:
-                    self.cards_kill_dict[card_d].remove(card)
+        self._save_attr("in_game_mask")
+        self.in_game_mask &= ~cards_to_mask(cards)
         return
         
     
     def update_unknown(self, player_name : str) -> None:
         """Update missing cards from the players hand. Either add or remove unknown cards (Card(-1,"X"))
         """
-        # The cards we know the player has
-        known_cards = self.player_cards[player_name]
         # Get the cards the player actually has
-        actual_cards = self.game.get_players_condition(cond = lambda x : x.name == player_name)[0].hand.cards
+        actual_hand = self.game.get_players_condition(cond = lambda x : x.name == player_name)[0].hand
         # If a player has the trump card, and we do not know it yet
         # This requires, that the deck is empty. Otherwise it is just a mock move
-        if any(card == self.game.trump_card for card in actual_cards) and self.game.trump_card not in known_cards and len(self.game.deck) == 0:
+        trump_bit = self.game.trump_card.bit if self.game.trump_card is not None else 0
+        if actual_hand.mask & trump_bit and not self.known_masks[player_name] & trump_bit and len(self.game.deck) == 0:
             self.update_known(player_name,[self.game.trump_card],add=True)
-            known_cards = self.player_cards[player_name]
-        missing = len(actual_cards) - len(known_cards)
+        missing = len(actual_hand.cards) - self.ncards(player_name)
         add = True
         if missing < 0:
             add = False
         if missing == 0:
             return
         # Either add unknown cards, or remove unknown cards from the players hand
-        self.update_known(player_name,[Card(-1,"X") for _ in range(abs(missing))],add=add)
+        self.update_known(player_name,[UNKNOWN_CARD]*abs(missing),add=add)
         return
     
     def update_known(self, player_name : str, cards : List[Card], add : bool = False) -> None:
@@ -250,19 +304,25 @@ class CardMonitor:
             cards (_type_): List of cards to add or remove from the player shand
             add (bool, optional): Whether to add (True) or remove (False) cards from the players hand. Defaults to False.
         """
+        self._save_contents(self.known_masks, self.unknown_counts)
+        known_mask = self.known_masks[player_name]
+        nunknown = self.unknown_counts[player_name]
         # If we are removing cards from the players hand
         if not add:
             for card in cards:
-                # If the card we want to remove from the players hand is not known, then mark it as an unknown card
-                if card not in self.player_cards[player_name]:
-                    card = Card(-1,"X")
-                try:
-                    self.player_cards[player_name].remove(card)
-                except:
+                if known_mask & card.bit:
+                    known_mask &= ~card.bit
+                # If the card we want to remove from the players hand is not known, then an unknown card is removed
+                elif nunknown > 0:
+                    nunknown -= 1
+                else:
                     print(f"CardMonitor: Tried to remove {card} from {player_name}, but it was not in the players hand")
                     if not self.ignore_errors:
                         raise ValueError(f"CardMonitor: Tried to remove {card} from {player_name}, but it was not in the players hand")
         # If we want to add cards to the players hand
         else:
-            self.player_cards[player_name] = cards + self.player_cards[player_name]
-        return
\ No newline at end of file
+            nunknown += sum((1 for card in cards if card is UNKNOWN_CARD))
+            known_mask |= cards_to_mask(cards)
+        self.known_masks[player_name] = known_mask
+        self.unknown_counts[player_name] = nunknown
+        return
@@ -1,37 +1,66 @@
-from collections import deque
-import itertools as it
+from array import array
 import random
 import time
-from typing import Iterable
+from typing import Iterable, List, Set
+import numpy as np
 from . import utils
 
 class Card:
     """ A class representing a card.
-    This is sort of like a named tuple, but with more freedom to customize
+
+    Each card has a canonical integer id: 4*(rank - 2) + suit index for the 52 cards of a standard deck,
+    which is the index of the card in an unshuffled StandardDeck, and UNKNOWN_CARD_ID for the placeholder Card(-1,"X"),
+    which marks a card whose identity is not known.
+
+    The cards are interned flyweights: Card(rank, suit) always returns the same immutable instance,
+    so cards are equal only if they are the same object, and they are hashed by their id.
+    'bit' is 1 << id, the cards bit in a bitmask of cards (see cards_to_mask). The unknown card has no bit.
+    The instances are shared by every game in the process, so per-game and per-player information
+    (whether a card is kopled, or a players score for a card) is not stored in the cards.
     """
-    rank : int = None
-    suit : str = None
-    kopled : bool = False
-    score : int = None
-    _frozen : bool = False
-    
-    def __init__(self,rank,suit,kopled=False,score=None):
-        self.rank = rank
-        self.suit = suit
-        self.kopled = kopled
-        self.score = score
-        self._frozen = True
+    __slots__ = ("rank", "suit", "id", "bit")
+    
+    def __new__(cls, rank, suit):
+        try:
+            return _CARDS_BY_RANK_SUIT[(rank, suit)]
+        except KeyError:
+            raise ValueError(f"There is no card with rank {rank} and suit {suit}") from None
+    
+    @classmethod
+    def _create(cls, rank : int, suit : str, id_ : int) -> "Card":
+        """ Create the interned instance. Only used when this module is imported. """
+        card = object.__new__(cls)
+        object.__setattr__(card, "rank", rank)
+        object.__setattr__(card, "suit", suit)
+        object.__setattr__(card, "id", id_)
+        object.__setattr__(card, "bit", 1 << id_ if id_ != UNKNOWN_CARD_ID else 0)
+        return card
+    
+    @staticmethod
+    def from_id(id_ : int) -> "Card":
+        """ Return the card with the given integer id. """
+        return CARDS_BY_ID[id_]
     
     def __setattr__(self, name, value):
-        ## TODO
-        if name in ["rank","suit"] and self._frozen:
-            raise TypeError(f"{name} can not be set, as it is frozen.")
-        super.__setattr__(self,name, value)
+        raise TypeError(f"{name} can not be set, as cards are immutable.")
     
+    def __delattr__(self, name):
+        raise TypeError(f"{name} can not be deleted, as cards are immutable.")
+    
+    def __reduce__(self):
+        """ Unpickle to the interned instance of the process. """
+        return (Card, (self.rank, self.suit))
+    
+    def __copy__(self):
+        return self
+    
+    def __deepcopy__(self, memo):
+        return self
+    
+    # Equality is the default identity comparison, since each card has exactly one instance
     def __hash__(self):
-        """ Only hash by value and suit """
-        return hash((self.rank,self.suit))
-        
+        """ Hash by the id, which is the same in every process, so the iteration order of sets of cards is reproducible. """
+        return self.id
     
     def __repr__(self) -> str:
         """ How to represent the card when printing"""
@@ -46,25 +75,139 @@ class Card:
     def __lt__(self,other):
         """ How to compare the card to others"""
         return self.rank < other.rank
-    
-    def __eq__(self,other):
-        return self.rank == other.rank and self.suit == other.suit
-    
+
+
+UNKNOWN_CARD_ID = 4*13                                  # The id of the placeholder card
+CARDS_BY_ID = tuple(Card._create(rank, suit, 4*(rank - 2) + si) for rank in utils.CARD_VALUES for si, suit in enumerate(utils.CARD_SUITS))
+UNKNOWN_CARD = Card._create(-1, "X", UNKNOWN_CARD_ID)   # Marks a card whose identity is not known
+_CARDS_BY_RANK_SUIT = {(card.rank, card.suit) : card for card in CARDS_BY_ID + (UNKNOWN_CARD,)}
+
+# Bitmasks of cards. The ids are ordered by rank, so the four cards of a rank are a nibble of the mask.
+ALL_CARDS_MASK = (1 << 52) - 1
+RANK_MASKS = {rank : 0b1111 << 4*(rank - 2) for rank in utils.CARD_VALUES}     # The cards of each rank
+SUIT_MASKS = {suit : sum((1 << 4*(rank - 2) + si for rank in utils.CARD_VALUES)) for si, suit in enumerate(utils.CARD_SUITS)}  # The cards of each suit
+_LOWEST_OF_RANKS = sum((1 << 4*(rank - 2) for rank in utils.CARD_VALUES))       # The lowest bit of each rank
+
+def cards_to_mask(cards : Iterable[Card]) -> int:
+    """ Return a bitmask with the bit of each card set. Unknown cards are ignored. """
+    mask = 0
+    for card in cards:
+        mask |= card.bit
+    return mask
+
+def mask_to_cards(mask : int) -> List[Card]:
+    """ Return the cards in the mask, ordered by their id. """
+    cards = []
+    while mask:
+        low = mask & -mask
+        cards.append(CARDS_BY_ID[low.bit_length() - 1])
+        mask ^= low
+    return cards
+
+def mask_popcount(mask : int) -> int:
+    """ Return the number of cards in the mask. """
+    return bin(mask).count("1")
+
+def rank_spread(mask : int) -> int:
+    """ Return a mask of all the cards, that have the same rank as some card in the mask. """
+    lowest = (mask | mask >> 1 | mask >> 2 | mask >> 3) & _LOWEST_OF_RANKS
+    return lowest * 0b1111
+
+def rank_count_at_least(mask : int, n : int) -> int:
+    """ Return a mask of all the cards, whose rank has atleast n cards in the mask (n between 1 and 4).
+    The cards of each rank are counted in parallel within the nibbles of the mask.
+    """
+    counts = mask - (mask >> 1 & _LOWEST_OF_RANKS * 0b0101)
+    counts = (counts & _LOWEST_OF_RANKS * 0b0011) + (counts >> 2 & _LOWEST_OF_RANKS * 0b0011)
+    # The count is at most 4, so the highest bit of the nibble is set only if count + 8 - n >= 8
+    lowest = (counts + _LOWEST_OF_RANKS * (8 - n)) >> 3 & _LOWEST_OF_RANKS
+    return lowest * 0b1111
+
+def mask_ranks(mask : int) -> Set[int]:
+    """ Return the set of ranks of the cards in the mask. """
+    lowest = (mask | mask >> 1 | mask >> 2 | mask >> 3) & _LOWEST_OF_RANKS
+    ranks = set()
+    while lowest:
+        low = lowest & -lowest
+        ranks.add((low.bit_length() - 1) // 4 + 2)
+        lowest ^= low
+    return ranks
+
+
+_BIT_SHIFTS = np.arange(UNKNOWN_CARD_ID, dtype=np.uint64)
+
+def masks_to_array(masks) -> np.ndarray:
+    """ Unpack an array of masks to an array with an extra last axis of length 52, where [..., id] is 1 if the card with the id is in the mask, else 0. """
+    masks = np.asarray(masks, dtype=np.uint64)
+    return (masks[..., np.newaxis] >> _BIT_SHIFTS) & np.uint64(1)
+
+
+def _make_kill_table(trump : str) -> np.ndarray:
+    """ Return a boolean table, where [i,j] is True if the card with id i can kill the card with id j. The unknown card kills nothing. """
+    table = np.zeros((UNKNOWN_CARD_ID + 1, UNKNOWN_CARD_ID + 1), dtype=bool)
+    for kill_card in CARDS_BY_ID:
+        for killed_card in CARDS_BY_ID:
+            table[kill_card.id, killed_card.id] = utils.check_can_kill_card(kill_card, killed_card, trump)
+    table.setflags(write=False)
+    return table
+
+# The kill tables are computed once for each trump suit, and indexed by the card ids
+KILL_TABLES = {trump : _make_kill_table(trump) for trump in utils.CARD_SUITS}
+# KILL_MASKS[trump][id] is the bitmask of cards, that the card with the id can kill
+KILL_MASKS = {trump : tuple((cards_to_mask((CARDS_BY_ID[j] for j in np.flatnonzero(row))) for row in table)) for trump, table in KILL_TABLES.items()}
+
+def can_kill(kill_card : Card, killed_card : Card, trump : str) -> bool:
+    """ Same as utils.check_can_kill_card, but with a table lookup. """
+    return bool(KILL_MASKS[trump][kill_card.id] & killed_card.bit)
+
+def cards_kill_mask(cards : Iterable[Card], trump : str) -> int:
+    """ Return the bitmask of cards, that some card in 'cards' can kill. """
+    kill_masks = KILL_MASKS[trump]
+    mask = 0
+    for card in cards:
+        mask |= kill_masks[card.id]
+    return mask
+
+
+_UNSHUFFLED_IDS = array("B", range(UNKNOWN_CARD_ID))
 
 class StandardDeck:
-    """ The class representing a standard deck implementation as a deque, to mitigate some risks """
-    def __init__(self,shuffle : bool=True, seed=None):
+    """ The class representing a standard deck.
+
+    The deck is a preallocated array of card ids, and the cards in the deck are the ids between the 'top' and 'end' pointers,
+    starting from the top of the deck. Drawing cards only moves the top pointer, so no memory is allocated for the deck,
+    and a draw is undone by restoring 'top' (see Turns._save_attr).
+    The deck is shuffled with its own random number generator, so creating or shuffling a deck has no effect on the global random module.
+    The cards of a standard deck in a fixed order (for enumerations) are in CARDS_BY_ID.
+    """
+    def __init__(self,shuffle : bool=True, seed=None, rng : random.Random = None):
         """Initilize the deck with the combinations of card values and card suits
 
         Args:
             shuffle (bool, optional): Whether to shuffle the deck. Defaults to True. Else the deck is in the order of a Kartesian product.
+            seed (int, optional): The seed of the decks own random number generator, used for shuffling. Defaults to None (random).
+            rng (random.Random, optional): The random number generator used for shuffling. If given, the seed is ignored.
         """
-        random.seed(seed if seed else random.randint(0,1000000))
-        self.cards = deque((Card(v,s) for v,s in it.product(utils.CARD_VALUES,utils.CARD_SUITS)))
+        self.rng = rng if rng is not None else random.Random(seed)
+        self._ids = array("B", _UNSHUFFLED_IDS)         # The card ids. The deck is _ids[top:end]
+        self.top = 0
+        self.end = UNKNOWN_CARD_ID
         if shuffle:
             self.shuffle()
         return None
     
+    @property
+    def cards(self) -> List[Card]:
+        """ The cards in the deck as a list, from the top of the deck. Modifying the list doesn't change the deck. """
+        ids = self._ids
+        return [CARDS_BY_ID[ids[i]] for i in range(self.top, self.end)]
+    
+    @cards.setter
+    def cards(self, cards : Iterable[Card]) -> None:
+        self._ids = array("B", (card.id for card in cards))
+        self.top = 0
+        self.end = len(self._ids)
+    
     def __repr__(self) -> str:
         """ How to represent the StandardDeck -instance"""
         s = ""
@@ -74,21 +217,36 @@ class StandardDeck:
     
     def __len__(self) -> None:
         """ The amount of cards in the deck"""
-        return len(self.cards)
+        return self.end - self.top
     
     def shuffle(self) -> None:
         """ Shuffle the deck inplace """
-        random.shuffle(self.cards)
+        with memoryview(self._ids) as view, view[self.top:self.end] as cards:
+            self.rng.shuffle(cards)
         return None
     
     def pop_cards(self,n) -> None:
         """ Pop n cards from the top of the pile.
         If there are less cards in the pile, than was asked, the rest of the cards are returned, or empty"""
-        #print("Current deck: ",self)
-        if not self.cards or n <= 0:
+        if n <= 0 or self.top >= self.end:
             return []
-        return [self.cards.popleft() for _ in range(min(len(self),n))]
-                
+        ids = self._ids
+        top = self.top
+        self.top = min(top + n, self.end)
+        return [CARDS_BY_ID[ids[i]] for i in range(top, self.top)]
+    
+    def _append(self, card : Card) -> None:
+        """ Place a card to the bottom of the deck. """
+        if self.end == len(self._ids):
+            # Move the cards to the start of the array, to make room at the bottom
+            n = len(self)
+            self._ids[:n] = self._ids[self.top:self.end]
+            self.top, self.end = 0, n
+            if n == len(self._ids):
+                self._ids.append(0)
+        self._ids[self.end] = card.id
+        self.end += 1
+        return
     
     def add(self,cards : Iterable[Card],shuffle=True) -> None:
         """Add cards back to the deck
@@ -106,7 +264,7 @@ class StandardDeck:
         for card in cards:
             if not isinstance(card,Card):
                 raise TypeError("The iterable to add to the deck, must be of type Card")
-            self.cards.append(card)
+            self._append(card)
         if shuffle:
             self.shuffle()
         return None
@@ -117,10 +275,9 @@ class StandardDeck:
         Args:
             card (Card): Card to insert to the bottom
         """
-        self.cards.append(card)
+        self._append(card)
         
 
-
 if __name__ == "__main__":
     start = time.time()
     for i in range(1000):
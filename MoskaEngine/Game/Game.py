@@ -12,12 +12,20 @@ from typing import Any, Callable, Dict, Generator, List, Tuple
 from ..Player.AbstractPlayer import AbstractPlayer
 from .GameState import FullGameState
 from . import utils
-from .Deck import Card, StandardDeck
+from .Deck import Card, StandardDeck, UNKNOWN_CARD
 from .CardMonitor import CardMonitor
+from .TurnPolicy import AbstractTurnPolicy, get_turn_policy
+from .UndoJournal import UndoJournal
+from .BatchedPredictor import BatchedPredictor
+from .GameMetrics import GameMetrics
+from .InterpreterPool import InterpreterPool, DEFAULT_MAX_BATCH_SIZE, get_interpreter_pool
 #import tensorflow as tf is done at set_model_vars_from_path IF a path is given.
 # This is to gain a speedup if not using tensorflow
 from .Turns import PlayFallFromDeck, PlayFallFromHand, PlayToOther, InitialPlay, EndTurn, PlayToSelf, Skip, PlayToSelfFromDeck
 
+# Attributes of MoskaGame, that other attributes depend on. Setting these calls MoskaGame._on_special_attr_set
+_SPECIAL_ATTRS = frozenset(("EXIT_FLAG", "players", "log_file", "nplayers", "random_seed"))
+
 
 class MoskaGame:
     """This is a class for a Moskagame. This class itself handles:
@@ -43,6 +51,7 @@ class MoskaGame:
     trump_card : Card = None              # Trump card
     cards_to_fall : List[Card] = []         # Current cards on the table, for the target to fall
     fell_cards : List[Card] = []            # Cards that have fell during the last turn
+    kopled_card : Card = None               # The card lifted from the deck this turn, that couldn't fall a card. It is kopled while it is in cards_to_fall
     turnCycle = utils.TurnCycle([],ptr = 0) # A TurnCycle instance, that rotates from the last to the first, created when players defined
     deck  : StandardDeck = None             # The deck belonging to the moskaGame. 
     threads : Dict[int,AbstractPlayer] = {} # A dictionary of threads with the threads native id as key, and the player as value
@@ -54,13 +63,31 @@ class MoskaGame:
     lock_holder = None                      # The player that currently holds the lock
     turns : dict = {}                       # A dictionary of turns, with the turn name as key, and the turn class as value
     timeout : float = 3                     # The timeout for the duration of the game. Started when start() is called, and ended when either an error occurs, or the game ends.
-    random_seed = None                      # The random seed of the game. CURRENTLY NOT CONFIRMED TO WORK
+    random_seed = None                      # The random seed of the game. The random streams of the game, deck, turn policy and players are derived from it
+    rng : random.Random = None              # The games own random number generator, derived from random_seed
     nplayers : int = 0                      # The number of players in the game
     card_monitor : CardMonitor = None       # The card monitor instance 
-    __prev_lock_holder__ = None             # The previous lock holder, used to check if the lock holder has changed, to avoid one thread locking the game twice in a row
+    undo_journal : UndoJournal = None       # The journal of changes made during a mock move. None when not making a mock move
+    __prev_lock_holder__ = None             # The player who held the lock last. Passed to the turn policy when choosing who acts next
+    turn_policy : AbstractTurnPolicy = None # Decides which player gets the lock next
+    batched_predictor : BatchedPredictor = None # Makes the model predictions together with other games, if set
+    interpreter_pools : List[InterpreterPool] = []  # A pool of pre-allocated interpreters for each model in model_paths
+    headless : bool = False                 # Whether the game runs without logging or any file system access
+    state_results : List[List] = None       # The gathered state vectors of a headless game, set when the game ends
+    metrics : GameMetrics = None            # Timing metrics of the game, if collected
+    _turn_condition : threading.Condition = None    # Condition on main_lock, that the players wait on until it is their turn
+    _next_actor : int = None                # The thread id of the player, who can acquire the lock next. None means anyone can
+    _exit_condition : threading.Condition = None    # Condition, that the player threads notify when they finish or fail, and the main thread waits on
     GATHER_DATA : bool = True               # Whether to gather data or not
     EXIT_FLAG = False                       # Whether the game is running or not. If this is True, then no-one can obtain the lock, threads will stop, and start() will return
     IS_RUNNING = False                      # Currently no real use
+    scheduler : str = "threads"             # How the players are run; 'threads' (a thread per player) or 'sequential' (all players in the main thread)
+    def __new__(cls, *args, trusted : bool = False, **kwargs):
+        """ Create a TrustedMoskaGame instead, if trusted is True. """
+        if trusted and cls is MoskaGame:
+            cls = TrustedMoskaGame
+        return super().__new__(cls)
+    
     def __init__(self,
                  players : List[AbstractPlayer] = [],
                  log_file : str = "",
@@ -77,6 +104,13 @@ class MoskaGame:
                  in_web : bool = False,
                  gather_jsons : bool = False,
                  one_card_in_deck : bool = False,
+                 scheduler : str = "threads",
+                 turn_policy : (str or AbstractTurnPolicy) = "random",
+                 trusted : bool = False,
+                 batched_predictor : BatchedPredictor = None,
+                 headless : bool = False,
+                 collect_metrics : bool = False,
+                 max_batch_size : int = DEFAULT_MAX_BATCH_SIZE,
                  ):
         """Initialize the game, by setting the deck, models, players, card monitor and some other variables.
         Args:
@@ -86,15 +120,43 @@ class MoskaGame:
             log_file (str, optional): The file to which to write the logs. Defaults to os.devnull.
             log_level (logging, optional): The logging level. Defaults to logging.INFO.
             timeout (int, optional): The timeout for the game. Defaults to 3.
-            random_seed ([type], optional): The random seed to use. Defaults to None.
+            random_seed (int, optional): The random seed to use. Defaults to None, in which case a random seed is chosen.
+                The game, the deck, the turn policy and each player get their own random stream derived from the seed (see utils.derive_seed),
+                so the same seed and players replay the same game. The global random module is not seeded.
             gather_data (bool, optional): Whether to gather data or not. Defaults to True. The gathered data will be written to a csv file.
             model_paths (List[str], optional): The paths to the models to use. Defaults to [""]. If the paths are empty, no neural network based models can be used.
+            scheduler (str, optional): How to run the players. Defaults to 'threads'.
+                'threads' starts a thread for each player, and the threads compete for the games lock.
+                'sequential' plays the players turns one after another from the main thread, without any locking or polling.
+            turn_policy (str or AbstractTurnPolicy, optional): Who acts next after a player releases the lock. Defaults to 'random'.
+                'random' (or 'seeded-random') chooses a random player other than the previous one, with a generator derived from random_seed,
+                and 'round-robin' gives the turn to the next player in pid order.
+            trusted (bool, optional): Whether to skip checking that attributes are only set by the lock holder. Defaults to False.
+                Requires the 'sequential' scheduler, where only one player plays at a time. The game is then created as a TrustedMoskaGame.
+            batched_predictor (BatchedPredictor, optional): If given, model_predict waits for the predictor to make the prediction
+                together with the predictions of other games in the same process. Defaults to None. See Play/Simulate.py play_games_batched.
+            headless (bool, optional): Whether to run the game without any file system access. Defaults to False.
+                The game and the players log nothing, no folders are created and the working directory is not changed.
+                If gather_data is True, the state vectors are stored to 'state_results' instead of a file.
+            collect_metrics (bool, optional): Whether to collect timing metrics of the game (see GameMetrics). Defaults to False.
+                If True, start returns a tuple (ranks, metrics as a dict), and the metrics are also available in 'metrics'.
+            max_batch_size (int, optional): The largest batch size, for which each model has a pre-allocated interpreter. Defaults to DEFAULT_MAX_BATCH_SIZE.
+                Larger inputs are predicted in chunks. See InterpreterPool.
         """
         self.evaluator_nn = None
         self.nturns = 0
         self.in_folder = in_folder
         if in_console and in_web:
             raise ValueError("Cannot be in both console and web")
+        if scheduler not in ("threads", "sequential"):
+            raise ValueError(f"Argument 'scheduler' must be either 'threads' or 'sequential'. Given argument: {scheduler}")
+        if trusted and scheduler != "sequential":
+            raise ValueError(f"A trusted game requires the 'sequential' scheduler. Given scheduler: {scheduler}")
+        if headless and (gather_jsons or player_evals):
+            raise ValueError("A headless game can not write jsons or player evaluations.")
+        self.headless = headless
+        self.metrics = GameMetrics() if collect_metrics else None
+        self.scheduler = scheduler
         self.in_console = in_console
         self.in_web = in_web
         self.has_graphics = in_console or in_web
@@ -107,9 +169,16 @@ class MoskaGame:
         self.gather_jsons = gather_jsons
         self.player_evals_data : Dict[int,List[int]] = {}
         self.threads = {}
+        # The class level lists would be shared by all games in the process
+        self.cards_to_fall = []
+        self.fell_cards = []
         self.log_level = log_level
-        os.makedirs(in_folder,exist_ok=True)
-        self.log_file = os.path.join(in_folder,log_file) if log_file else os.devnull
+        if self.headless:
+            self.glog = utils.HEADLESS_LOGGER
+            self.log_file = ""
+        else:
+            os.makedirs(in_folder,exist_ok=True)
+            self.log_file = os.path.join(in_folder,log_file) if log_file else os.devnull
         # Write the states of the game to a json file
         if self.gather_jsons:
             self.jsons_file = self.log_file
@@ -117,14 +186,17 @@ class MoskaGame:
                 self.jsons_file = self.jsons_file.replace(".log",".json")
             with open(self.jsons_file,"w") as f:
                 f.write("[\n")
-        self.interpreters = []
+        self.interpreter_pools = []
         self.input_details = []
         self.output_details = []
+        self.max_batch_size = max_batch_size
         self.model_paths = model_paths
         self.set_model_vars_from_paths()
+        self.batched_predictor = batched_predictor
         self.random_seed = random_seed if random_seed else int(10000000*random.random())
         self.one_card_in_deck = one_card_in_deck
-        self.deck = deck if deck else StandardDeck(seed = self.random_seed)
+        self.deck = deck if deck else StandardDeck(seed = utils.derive_seed(self.random_seed, "deck"))
+        self.turn_policy = get_turn_policy(turn_policy, seed = utils.derive_seed(self.random_seed, "turn_policy"))
         self.players = players
         self.timeout = timeout
         self.EXIT_FLAG = False
@@ -134,14 +206,15 @@ class MoskaGame:
 
 
     def set_model_vars_from_paths(self) -> None:
-        """Set the model paths, interpreters, input and output details from the model paths.
+        """Set the model paths, interpreter pools, input and output details from the model paths.
         This is used to load the models from the paths, and to set the input and output details of each model.
 
-        The models must be tensorflow lite models.
+        The models must be tensorflow lite models, or '.npz' files of dense models (see NumpyModel), which are predicted without tensorflow.
+        Each model has an InterpreterPool (or a NumpyModel), which is loaded and pre-warmed the first time the model is used in the process.
         """
         if isinstance(self.model_paths,str):
             self.model_paths = [self.model_paths] if self.model_paths else []
-        self.interpreters = []
+        self.interpreter_pools = []
         self.input_details = []
         self.output_details = []
         # Loop through the model paths, and convert shorthands to absolute paths and check that they all exist
@@ -153,8 +226,8 @@ class MoskaGame:
         for i, path in enumerate(self.model_paths):
             if not path:
                 utils.raise_model_not_found_error(orig_paths[i])
-        self.glog.debug("Importing Tensorflow and loading models from paths: {}".format(self.model_paths))
-        # We import tensorflow only if there are models to load! This speeds up the process.
+        self.glog.debug("Loading models from paths: {}".format(self.model_paths))
+        # We import tensorflow only if there are tflite models to load! This speeds up the process.
         # This also allows the user to run the game without tensorflow installed.
         # Furthermore, Tensorflow cannot be run with optimizations (-OO flag),
         # So this allows us to simulate games without tensorflow bots with optmizations
@@ -162,27 +235,23 @@ class MoskaGame:
         os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
         for path in self.model_paths:
             try:
-                interpreter, input_details, output_details = self._get_tflite_details(path)
+                pool = self._get_interpreter_pool(path)
             except Exception as e:
                 self.glog.error(f"Could not load model from path {path}.")
                 raise e
-            self.interpreters.append(interpreter)
-            self.output_details.append(output_details)
-            self.input_details.append(input_details)
+            self.interpreter_pools.append(pool)
+            self.output_details.append(pool.output_details)
+            self.input_details.append(pool.input_details)
         self.glog.info(f"Loaded {self.model_paths} models.")
         self.glog.debug(f"Input details: {self.input_details}")
         self.glog.debug(f"Output details: {self.output_details}")
         return
     
-    def _get_tflite_details(self, path : str):
-        """Get the interpreter, input details and output details from the model path.
+    def _get_interpreter_pool(self, path : str) -> InterpreterPool:
+        """Get the pool of pre-allocated interpreters of the model in the path.
+        The pools are shared by every game in the process, so each model is loaded only once per process.
         """
-        import tensorflow as tf
-        interpreter = tf.lite.Interpreter(model_path=path)
-        interpreter.allocate_tensors()
-        input_details = interpreter.get_input_details()
-        output_details = interpreter.get_output_details()
-        return interpreter, input_details, output_details
+        return get_interpreter_pool(path, max_batch_size=self.max_batch_size)
     
     def model_predict(self, X : np.ndarray, model_id : (str or int) = "all") -> np.ndarray:
         """ Make a prediction with the model with the given id. The ID can either be an integer or a string (path to the model or 'all').
@@ -194,9 +263,28 @@ class MoskaGame:
             X (np.ndarray): The input data to the model. The shape must be (n, input_size)
             model_id (str or int, optional): The id of the model to use. Defaults to "all". If "all", then all models are used.
         """
+        player_logger = self.threads[self._get_caller_id()].plog
+        if not isinstance(X,np.ndarray):
+            try:
+                player_logger.debug(f"Converting X {type(X)} to np.ndarray")
+                X = np.array(X)
+            except:
+                raise Exception(f"Could not convert {X} to np.ndarray")
+        if not X.shape:
+            raise Exception(f"X.shape is empty: {X.shape}")
+        # The prediction is made together with the predictions of other games
+        if self.batched_predictor is not None:
+            return self.batched_predictor.predict(X, model_id)
+        return self.predict_with_models(X, model_id)
+
+    def predict_with_models(self, X : np.ndarray, model_id : (str or int) = "all") -> np.ndarray:
+        """ Make a prediction with this games models, without converting X or using the batched predictor.
+        The arguments and output are the same as in model_predict.
+        This can be used as the 'predict_func' of a BatchedPredictor, and it doesn't require the caller to be a player.
+        """
         # See which models the player wants to use
         if model_id == "all":
-            model_id = list(range(len(self.interpreters)))
+            model_id = list(range(len(self.interpreter_pools)))
         if isinstance(model_id,int):
             model_id = [model_id]
         if isinstance(model_id,str):
@@ -204,33 +292,15 @@ class MoskaGame:
                 model_id = [self.model_paths.index(model_id)]
             except:
                 raise Exception(f"Could not find model path {model_id} in {self.model_paths}")
-        player_logger = self.threads[threading.get_native_id()].plog
         output_data = []
-        if not isinstance(X,np.ndarray):
-            try:
-                player_logger.debug(f"Converting X {type(X)} to np.ndarray")
-                X = np.array(X)
-            except:
-                raise Exception(f"Could not convert {X} to np.ndarray")
         if not model_id:
             raise Exception(f"model_id is empty: {model_id}")
-        if not X.shape:
-            raise Exception(f"X.shape is empty: {X.shape}")
-        if not self.interpreters:
+        if not self.interpreter_pools:
             raise Exception("No model found for prediction. Model paths: {}".format(self.model_paths))
-        for m_id,model_info in enumerate(zip(self.interpreters,self.input_details,self.output_details)):
-            interpreter,input_details,output_details = model_info
+        for m_id,pool in enumerate(self.interpreter_pools):
             if m_id not in model_id:
                 continue
-            if len(X.shape) != len(input_details[0]["shape"]):
-                prev_shape = X.shape
-                X = np.expand_dims(X, axis=-1)
-            interpreter.resize_tensor_input(input_details[0]["index"],X.shape)
-            interpreter.allocate_tensors()
-            interpreter.set_tensor(input_details[0]['index'], X)
-            interpreter.invoke()
-            out = interpreter.get_tensor(output_details[0]['index'])
-            output_data.append(out)
+            output_data.append(pool.predict(X))
         output_data = np.array(output_data)
         return output_data
     
@@ -267,29 +337,41 @@ class MoskaGame:
         """
         if name == "EXIT_FLAG":
             super.__setattr__(self, name, value)
+            self._on_special_attr_set(name, value)
             return
-        if name != "lock_holder" and self.threads and threading.get_native_id() != self.lock_holder:
+        if name != "lock_holder" and self.threads and self._get_caller_id() != self.lock_holder:
             raise threading.ThreadError(f"Setting MoskaGame attribute with out lock!")
         super.__setattr__(self, name, value)
+        if name in _SPECIAL_ATTRS:
+            self._on_special_attr_set(name, value)
+        if self.threads and self.lock_holder and (self is not self.threads[self.lock_holder]) and name not in ["deck", "fell_cards", "cards_to_fall"]:
+            self.glog.debug(f"Setting MoskaGame attribute {name} to {value}")
+        return
+    
+    def _on_special_attr_set(self, name, value) -> None:
+        """ Called after setting one of the attributes in _SPECIAL_ATTRS, to set the attributes that depend on it.
+        """
+        # If the game is exiting, wake up the players waiting for their turn
+        if name == "EXIT_FLAG":
+            if value:
+                self._wake_players()
         # If setting the players, set the turnCycle and the new deck
-        if name == "players":
+        elif name == "players":
             self._set_players(value)
             self.glog.debug(f"Set players to: {value}")
         # If setting the log_file, set the logger
-        if name == "log_file" and value:
+        elif name == "log_file" and value and not self.headless:
             assert isinstance(value, str), f"'{name}' of MoskaGame attribute must be a string"
             self.name = value.split(".")[0]
             self._set_glogger(value)
         # If setting nplayers, create random players and set self.players
-        if name == "nplayers":
+        elif name == "nplayers":
             self.players = self.players if self.players else self._get_random_players(value)
             self.glog.debug(f"Created {value} random players.")
-        # If setting the random seed, set the random seed
-        if name == "random_seed":
-            random.seed(value)
+        # If setting the random seed, set the games random number generator
+        elif name == "random_seed":
+            self.rng = random.Random(utils.derive_seed(value, "game"))
             self.glog.info(f"Set random_seed to {self.random_seed}")
-        if self.threads and self.lock_holder and (self is not self.threads[self.lock_holder]) and name not in ["deck", "fell_cards", "cards_to_fall"]:
-            self.glog.debug(f"Setting MoskaGame attribute {name} to {value}")
         return
     
     def _set_players(self,players : List[AbstractPlayer]) -> None:
@@ -297,10 +379,11 @@ class MoskaGame:
         Here we set the deck, turncycle, and each players moskagame attribute.
         """
         assert isinstance(players, list), f"'players' of MoskaGame attribute must be a list"
-        self.deck = StandardDeck(seed=self.random_seed)
+        self.deck = StandardDeck(seed=utils.derive_seed(self.random_seed, "deck"))
         for pl in players:
             pl.moskaGame = self
-        self.turnCycle = utils.TurnCycle(players)
+        # The players, who have not finished, are the active players of the turn cycle. The players keep it up to date, when their rank is set.
+        self.turnCycle = utils.TurnCycle(players, active=[pl.rank is None for pl in players])
         return
     
     def _set_glogger(self,log_file : str) -> None:
@@ -319,62 +402,160 @@ class MoskaGame:
         return
     
     def _create_locks(self) -> None:
-        """ Initialize the RLock (re-enterable lock) for the game. """
+        """ Initialize the RLock (re-enterable lock) for the game, and the condition the players wait on for their turn. """
         self.main_lock = threading.RLock()
+        self._turn_condition = threading.Condition(self.main_lock)
+        self._exit_condition = threading.Condition()
         self.glog.debug("Created RLock")
         return
     
+    def _notify_player_exit(self) -> None:
+        """ Called by a player thread, when it has stopped playing. Wakes up the main thread waiting in '_join_threads'.
+        """
+        if self._exit_condition is None:
+            return
+        with self._exit_condition:
+            self._exit_condition.notify_all()
+        return
+    
+    def _wake_players(self) -> None:
+        """ Wake up the players waiting for their turn, so they notice that the game is exiting.
+        If someone is holding the lock, they will wake the players when releasing it.
+        """
+        if self._turn_condition is None or not self.main_lock.acquire(blocking=False):
+            return
+        try:
+            self._turn_condition.notify_all()
+        finally:
+            self.main_lock.release()
+        return
+    
+    def _get_turn_candidates(self) -> List[AbstractPlayer]:
+        """ Return the players who are still playing, and can thus be given the turn. """
+        return self.get_players_condition(lambda x : x.EXIT_STATUS == 0 and x.rank is None)
+    
+    def _choose_next_player(self) -> AbstractPlayer:
+        """ Ask the turn policy which player acts next. Returns None if no-one is playing anymore. """
+        candidates = self._get_turn_candidates()
+        if not candidates:
+            return None
+        return self.turn_policy.next_player(candidates, self.__prev_lock_holder__)
+    
+    def _get_caller_id(self) -> int:
+        """ Return the id of whoever is calling a method of the game.
+        With the 'threads' scheduler, this is the native id of the calling thread.
+        With the 'sequential' scheduler, everything runs in one thread, so the caller is the lock holder,
+        or the game itself (id 0) if no-one holds the lock.
+        """
+        if self.scheduler == "sequential":
+            return self.lock_holder if self.lock_holder is not None else 0
+        return threading.get_native_id()
+    
+    def _check_no_duplicate_cards(self) -> None:
+        """ Check that no card is on the table twice, after a player has released the lock.
+        If there is, the game is exited.
+
+        Raises:
+            AssertionError: If 'cards_to_fall' has duplicate cards.
+        """
+        if len(set(self.cards_to_fall)) != len(self.cards_to_fall):
+            print(f"Game log {self.log_file} failed, DUPLICATE CARD")
+            self.glog.error(f"Game log {self.log_file} failed, DUPLICATE CARD")
+            self.EXIT_FLAG = True
+            raise AssertionError(f"DUPLICATE CARD in game {self.log_file}")
+        return
+    
+    @contextlib.contextmanager
+    def _get_sequential_lock(self,player=None) -> bool:
+        """ The 'sequential' scheduler counterpart of 'get_lock'.
+        The players are called one at a time from the main thread, so no actual locking is needed.
+        Only the lock_holder is set to the players pseudo thread id (or 0 for the game itself).
+        """
+        self.lock_holder = player.thread_id if isinstance(player, AbstractPlayer) else 0
+        if self.EXIT_FLAG:
+            self.lock_holder = None
+            yield False
+            return
+        yield True
+        self._check_no_duplicate_cards()
+        if isinstance(player, AbstractPlayer):
+            self.__prev_lock_holder__ = player
+        self.lock_holder = None
+        return
+    
     @contextlib.contextmanager
     def get_lock(self,player=None) -> bool:
         """A wrapper around getting the moskagames main_lock.
+        A player waits until the turn policy has given them the turn (the game itself doesn't wait).
         Sets the lock_holder to the obtaining threads id
         and yields True if the lock was obtained.
-        If the lock was not obtained, yields False.
         If the lock was obtained, but the game is exiting, yields False.
         If the lock was obtained, but the lock_holder is not in self.threads, yields False.
-        If the lock was obtained, but the lock_holder is the same as the previous lock_holder, yields False.
+        When the lock is released, the turn policy chooses who acts next, and the waiting players are notified.
         Returns none
         """
+        if self.scheduler == "sequential":
+            with self._get_sequential_lock(player) as ml:
+                yield ml
+            return
+        wait_start = time.perf_counter() if self.metrics is not None else 0
         with self.main_lock as lock:
-            self.lock_holder = threading.get_native_id()
-            if self.lock_holder == self.__prev_lock_holder__:
-                self.lock_holder = None
-                yield False
-                return
-            if self.lock_holder not in self.threads:
-                self.lock_holder = None
-                print(f"Game {self.log_file}: Couldn't find lock holder id {self.lock_holder}!")
-                yield False
-                return
-            # Yields false if the game is exiting
-            if self.EXIT_FLAG:
+            # The waiting players are notified however the lock is released, since '_wake_players' relies on the lock holder to do it
+            try:
+                native_id = threading.get_native_id()
+                if not player:
+                    player = self.threads.get(native_id, None)
+                if isinstance(player, AbstractPlayer):
+                    nfailed = self._wait_for_turn(native_id)
+                    if self.metrics is not None:
+                        self.metrics.add_lock_wait(time.perf_counter() - wait_start, nfailed)
+                self.lock_holder = native_id
+                if self.lock_holder not in self.threads:
+                    self.lock_holder = None
+                    print(f"Game {self.log_file}: Couldn't find lock holder id {self.lock_holder}!")
+                    yield False
+                    return
+                # Yields false if the game is exiting
+                if self.EXIT_FLAG:
+                    self.lock_holder = None
+                    yield False
+                    return
+                if isinstance(player, AbstractPlayer):
+                    self.glog.debug(f"{player.name} has locked the game.")
+                # Here we tell the player that they have the key
+                yield True
+                self._check_no_duplicate_cards()
+                if isinstance(player, AbstractPlayer):
+                    self.__prev_lock_holder__ = player
+                next_player = self._choose_next_player()
+                self._next_actor = next_player.thread_id if next_player is not None else None
                 self.lock_holder = None
-                yield False
-                return
-            if not player:
-                player = self.threads[self.lock_holder]
-            if isinstance(player, AbstractPlayer):
-                self.glog.debug(f"{player.name} has locked the game.")
-            # Here we tell the player that they have the key
-            yield True
-            if len(set(self.cards_to_fall)) != len(self.cards_to_fall):
-                print(f"Game log {self.log_file} failed, DUPLICATE CARD")
-                self.glog.error(f"Game log {self.log_file} failed, DUPLICATE CARD")
-                self.EXIT_FLAG = True
-                raise AssertionError(f"DUPLICATE CARD in game {self.log_file}")
-            self.__prev_lock_holder__ = self.lock_holder
-            self.lock_holder = None
+            finally:
+                self._turn_condition.notify_all()
         if isinstance(player, AbstractPlayer):
             self.glog.debug(f"{player.name} has unlocked the game.")
-            # Sleep a random time between 0 and 100 ms
-            sleep_time = random.random()/10
-            time.sleep(sleep_time)
         return
     
+    def _wait_for_turn(self, native_id : int) -> int:
+        """ Wait on the turn condition until it is the turn of the player with 'native_id', or the game is exiting.
+        Must be called while holding the main lock.
+        Returns the number of times the player was woken up, but it was not their turn.
+        """
+        nchecks = 0
+        def is_turn():
+            nonlocal nchecks
+            nchecks += 1
+            return self.EXIT_FLAG or self._next_actor is None or self._next_actor == native_id
+        self._turn_condition.wait_for(is_turn)
+        return nchecks - 1
+    
     def _reduce_logging_wrapper(self,func) -> Callable:
         """ A wrapper, that reduces the logging of a player in the wrapped function.
         This is used in the _make_move function, if mock is True.
         """
+        # The headless logger discards everything, and setting the level of a logger clears the cache of every logger
+        if self.headless:
+            return func
         functools.wraps(func)
         def wrapper(*args,**kwargs):
             self.glog.setLevel(logging.WARNING)
@@ -420,7 +601,7 @@ class MoskaGame:
         TODO: Change AssertioErrors to custom errors.
         """
         # If the lock holder isn't correct, raise an error
-        if self.lock_holder != threading.get_native_id():
+        if self.lock_holder != self._get_caller_id():
             raise threading.ThreadError(f"Making moves is supposed to be implicit and called in a context manager after acquiring the games lock")
         # If incorrect move, raise an error
         if move not in self.turns.keys():
@@ -447,12 +628,16 @@ class MoskaGame:
                         return x
                 self.glog.info(f"Turn number: {self.nturns}: '{player.name}' called '{move}' with args {[_print_fmt(a) for a in args]}")
                 print(f"Turn number: {self.nturns}: '{player.name}' played '{move}' with arguments {[_print_fmt(a) for a in args]}")
+        if not mock and self.metrics is not None:
+            move_start = time.perf_counter()
         # Create a function for making the move, so we can wrap it with the _reduce_logging_wrapper if mock is True
         move_call = self._move_call_wrapper(move_call)
         if mock:
             move_call = self._reduce_logging_wrapper(move_call)
         suc, msg = move_call(move,*args)
         if not suc:
+            if not mock and self.metrics is not None:
+                self.metrics.add_make_move(time.perf_counter() - move_start)
             player.plog.warning(msg)
             return False, msg
         if not mock and self.player_evals:
@@ -490,29 +675,33 @@ class MoskaGame:
             for pid, pl in enumerate(self.players):
                 if pl.thread_id == self.lock_holder or pl.rank is not None:
                     continue
+                if self.undo_journal is not None:
+                    self.undo_journal.save_attr(pl, "ready")
                 pl.ready = False
+        if not mock and self.metrics is not None:
+            self.metrics.add_make_move(time.perf_counter() - move_start)
         return True, ""
     
     def _make_mock_move(self,move,args,state_fmt="FullGameState") -> FullGameState:
         """ Makes a move, like '_make_move', but returns the game state after the move and restores self and attributes to its original state.
-        This is basically a wrapper around _make_move, which saves the game state before the move, and restores it after the move.
+        The changes made by the move are recorded to an undo journal, and after taking a snapshot of the new state, the changes are rolled back.
         """
-        state = FullGameState.from_game(self,copy=True)
-        #self.glog.debug("Saved state data. Setting logger to level WARNING for Mock move")
-        player = args[0]
-
-        # Normally play the move; change games state precisely as it would actually change, but with different logging
-        success, msg = self._make_move(move,args,mock=True)
-        if not success:
-            raise AssertionError(f"Mock move failed: {msg}")
-        if state_fmt == "FullGameState" or "FullGameState-Depr":
-            new_state = FullGameState.from_game(self,copy=True)
-        else:
+        if state_fmt not in ["FullGameState", "FullGameState-Depr"]:
             raise NameError(f"Argument 'state_fmt' was not recognized. Given argument: {state_fmt}")
-        # Save the new game state, for evaluation of the move
-        state.restore_game_state(self,check=False)
-        is_eq, msg = state.is_game_equal(self,return_msg=True)
-        if not is_eq:
+        if self.metrics is not None:
+            self.metrics.nmock_moves += 1
+        self.undo_journal = UndoJournal()
+        try:
+            # Normally play the move; change games state precisely as it would actually change, but with different logging
+            success, msg = self._make_move(move,args,mock=True)
+            if success:
+                # Save the new game state, for evaluation of the move
+                new_state = FullGameState.from_game(self,copy=True)
+        finally:
+            # Undo the changes made by the move
+            self.undo_journal.rollback()
+            self.undo_journal = None
+        if not success:
             raise AssertionError(f"Mock move failed: {msg}")
         # Return the new_state
         return new_state
@@ -533,10 +722,10 @@ class MoskaGame:
         """
         json_dict = {
             "trump_card" : self.trump_card.as_str(symbol=False),
-            "deck_left" : len(self.deck.cards),
+            "deck_left" : len(self.deck),
             "cards_to_kill" : [c.as_str(symbol=False) for c in self.cards_to_fall],
             "killed_cards" : [c.as_str(symbol=False) for c in self.fell_cards],
-            "kopled_card" : "".join([c.as_str(symbol=False) for c in self.cards_to_fall if c.kopled]),
+            "kopled_card" : self.kopled_card.as_str(symbol=False) if self.kopled_card in self.cards_to_fall else "",
             "target" : self.get_target_player().name,
             "initiator" : self.get_initiating_player().name,
             "turn" : self.get_turn_player_name(),
@@ -551,11 +740,11 @@ class MoskaGame:
         and each players name and the number of cards they have in their hand.
         """
         s = f"Trump card: {self.trump_card}\n"
-        s += f"Deck left: {len(self.deck.cards)}\n"
+        s += f"Deck left: {len(self.deck)}\n"
         for pl in self.players:
             s += f"{pl.name}{' (TG)' if pl is self.get_target_player() else ''}"
             s += " " * max(16 - len(s.split("\n")[-1]),1)
-            s += f" : {len(self.card_monitor.player_cards[pl.name])}\n"
+            s += f" : {self.card_monitor.ncards(pl.name)}\n"
         s += f"Cards to kill : {self.cards_to_fall}\n"
         s += f"killed cards : {self.fell_cards}\n"
         return s
@@ -566,7 +755,7 @@ class MoskaGame:
         and each players name and the cards (counted) they have in their hand.
         """
         s = f"Trump card: {self.trump_card}\n"
-        s += f"Deck left: {len(self.deck.cards)}\n"
+        s += f"Deck left: {len(self.deck)}\n"
         for pl in self.players:
             s += f"{pl.name}{' (TG)' if pl is self.get_target_player() else ''}"
             s += " " * max(16 - len(s.split("\n")[-1]),1)
@@ -580,12 +769,11 @@ class MoskaGame:
         """
         # Load the NN from
         file = utils.get_model_file("Model-nn1-BB")
-        if len(self.interpreters) < 1:
-            interp, input_details, output_details = self._get_tflite_details(file)
-            file = utils.get_model_file("Model-nn1-BB")
-            self.interpreters.append(interp)
-            self.input_details.append(input_details)
-            self.output_details.append(output_details)
+        if len(self.interpreter_pools) < 1:
+            pool = self._get_interpreter_pool(file)
+            self.interpreter_pools.append(pool)
+            self.input_details.append(pool.input_details)
+            self.output_details.append(pool.output_details)
         model_id = 0
         pred_format = "bitmap"
         return model_id, pred_format
@@ -615,13 +803,13 @@ class MoskaGame:
         """
         state = FullGameState.from_game(self, copy = False)
         s = f"Trump card: {self.trump_card}\n"
-        s += f"Deck left: {len(self.deck.cards)}\n"
+        s += f"Deck left: {len(self.deck)}\n"
         for pid,pl in enumerate(self.players):
             s += f"{pl.name}{' (TG)' if pl is self.get_target_player() else ''}"
             pl_eval = self.player_evals_data.get(pl.pid,[0])[-1]
             s += f"({pl_eval})"
             s += " " * max(16 - len(s.split("\n")[-1]),1)
-            s += f" : {len(self.card_monitor.player_cards[pl.name])}\n"
+            s += f" : {self.card_monitor.ncards(pl.name)}\n"
         s += f"Cards to kill : {self.cards_to_fall}\n"
         s += f"killed cards : {self.fell_cards}\n"
         return s
@@ -633,7 +821,7 @@ class MoskaGame:
         """
         state = FullGameState.from_game(self, copy = False)
         s = f"Trump card: {self.trump_card}\n"
-        s += f"Deck left: {len(self.deck.cards)}\n"
+        s += f"Deck left: {len(self.deck)}\n"
         for pid,pl in enumerate(self.players):
             s += f"{pl.name}{' (TG)' if pl is self.get_target_player() else ''}"
             pl_eval = self.player_evals_data.get(pl.pid,[0])[-1]
@@ -651,14 +839,14 @@ class MoskaGame:
         """
         state = FullGameState.from_game(self, copy = False)
         s = f"Trump card: {self.trump_card}\n"
-        s += f"Deck left: {len(self.deck.cards)}\n"
+        s += f"Deck left: {len(self.deck)}\n"
         for pid,pl in enumerate(self.players):
             s += f"{pl.name}{' (TG)' if pl is self.get_target_player() else ''}"
             if "human" in type(pl).__name__.lower():
                 pl_eval = self.player_evals_data.get(pl.pid,[0])[-1]
                 s += f"({pl_eval})"
             s += " " * max(16 - len(s.split("\n")[-1]),1)
-            s += f" : {len(self.card_monitor.player_cards[pl.name])}\n"
+            s += f" : {self.card_monitor.ncards(pl.name)}\n"
         s += f"Cards to kill : {self.cards_to_fall}\n"
         s += f"killed cards : {self.fell_cards}\n"
         return s
@@ -669,12 +857,12 @@ class MoskaGame:
         and each players name and the cards (counted) they have in their hand.
         """
         s = f"Trump card: {self.trump_card}\n"
-        s += f"Deck left: {len(self.deck.cards)}\n"
+        s += f"Deck left: {len(self.deck)}\n"
         for pl in self.players:
             s += f"{pl.name}{' (TG)' if pl is self.get_target_player() else ''}"
             s += " " * max(16 - len(s.split("\n")[-1]),1)
-            ncards = len(self.card_monitor.player_cards[pl.name])
-            s += f" : {[Card(-1, 'X') for _ in range(ncards)]}\n"
+            ncards = self.card_monitor.ncards(pl.name)
+            s += f" : {[UNKNOWN_CARD]*ncards}\n"
         s += f"Cards to kill : {self.cards_to_fall}\n"
         s += f"killed cards : {self.fell_cards}\n"
         return s
@@ -711,7 +899,7 @@ class MoskaGame:
         self.cards_to_fall.clear()
         self.fell_cards.clear()
         # Add self to allowed threads
-        self.threads[threading.get_native_id()] = self
+        self.threads[self._get_caller_id()] = self
         self.glog.info("Starting player threads")
         with self.get_lock() as ml:
             for pl in self.players:
@@ -724,25 +912,26 @@ class MoskaGame:
             self.IS_RUNNING = True
         return
     
-    def _join_threads(self) -> None:
+    def _join_threads(self) -> bool:
         """ Join all threads.
-        This does not actually call the join method, but rather constantly checks if any thread has reported to have failed.
+        This does not actually call the join method, but rather waits until the player threads notify,
+        that every player has stopped playing or that a player has failed.
         If any thread has EXIT_STATUS 2, the game is terminated.
-        The game timeouts if after 'timeout' seconds, any thread is still alive.
+        The game timeouts if after 'timeout' seconds, any thread is still playing.
         """
         self.glog.info("Main thread waiting for player threads")
-        start = time.time()
-        while time.time() - start < self.timeout and any([pl.thread.is_alive() for pl in self.players]):
-            time.sleep(0.1)
-            # Check if any thread has failed
-            if any((pl.EXIT_STATUS == 2 for pl in self.players)):
-                failed_player = self.get_players_condition(lambda x : x.EXIT_STATUS == 2)[0]
-                self.glog.error(f"Player {failed_player.name} failed. File: {failed_player.log_file}. Exiting.")
-                with self.get_lock() as ml:
-                    print(f"Game with log {self.log_file} failed.")
-                    self.glog.error(f"Game FAILED. Exiting.")
-                    self.EXIT_FLAG = True
-                return False
+        with self._exit_condition:
+            self._exit_condition.wait_for(lambda : any((pl.EXIT_STATUS == 2 for pl in self.players)) or all((pl.EXIT_STATUS != 0 for pl in self.players)),
+                                          timeout=self.timeout)
+        # Check if any thread has failed
+        if any((pl.EXIT_STATUS == 2 for pl in self.players)):
+            failed_player = self.get_players_condition(lambda x : x.EXIT_STATUS == 2)[0]
+            self.glog.error(f"Player {failed_player.name} failed. File: {failed_player.log_file}. Exiting.")
+            with self.get_lock() as ml:
+                print(f"Game with log {self.log_file} failed.")
+                self.glog.error(f"Game FAILED. Exiting.")
+                self.EXIT_FLAG = True
+            return False
         # Check if any thread has timed out
         if any((pl.EXIT_STATUS != 1 for pl in self.players)):
             print(f"Game with log {self.log_file} timedout.")
@@ -752,19 +941,57 @@ class MoskaGame:
         self.glog.info("Threads finished")
         return True
     
+    def _run_sequential(self) -> bool:
+        """ Play the game with the 'sequential' scheduler.
+        The players turns are played one after another from the main thread, in the order given by the turn policy,
+        until every player has finished, a player fails, or the game times out.
+
+        Returns:
+            bool: True if the game finished successfully, else False
+        """
+        self.glog.info("Playing the players turns sequentially")
+        start = time.time()
+        while True:
+            player = self._choose_next_player()
+            if player is None:
+                break
+            if any((pl.EXIT_STATUS == 2 for pl in self.players)):
+                failed_player = self.get_players_condition(lambda x : x.EXIT_STATUS == 2)[0]
+                self.glog.error(f"Player {failed_player.name} failed. File: {failed_player.log_file}. Exiting.")
+                print(f"Game with log {self.log_file} failed.")
+                self.glog.error(f"Game FAILED. Exiting.")
+                self.EXIT_FLAG = True
+                break
+            if time.time() - start > self.timeout:
+                print(f"Game with log {self.log_file} timedout.")
+                self.glog.error(f"Game timedout after {self.timeout} seconds. Exiting.")
+                self.EXIT_FLAG = True
+                break
+            if player.delay:
+                time.sleep(player.delay)
+            with self.get_lock(player) as ml:
+                if not ml:
+                    break
+                keep_playing = player._play_turn()
+            if not keep_playing or player.rank is not None:
+                player._finish_play()
+        # If the game was exited, the players that are still running are stopped, as their threads would be
+        for pl in self.get_players_condition(lambda x : x.EXIT_STATUS == 0):
+            pl.EXIT_STATUS = 2
+            pl._finish_play()
+        if any((pl.EXIT_STATUS != 1 for pl in self.players)):
+            return False
+        self.glog.info("Players finished")
+        return True
     
     def get_initiating_player(self) -> AbstractPlayer:
         """ Return the player, whose turn it is/was to initiate the turn aka. play to an empty table.
         """
-        active = self.get_target_player()
-        ptr = int(self.turnCycle.ptr)
-        out = self.turnCycle.get_prev_condition(cond = lambda x : x.rank is None and x is not active,incr_ptr=False)
-        # This can happen, if a player has just finished, then for a short while the player is both the target and the initiating player.
-        if not out:
-            out = self.turnCycle.get_prev_condition(cond = lambda x : x.rank is None,incr_ptr=False)
+        # The previous player still in the game before the target.
+        # If the target is the only player in the game (they have just finished), then for a short while the player is both the target and the initiating player.
+        out = self.turnCycle.get_prev_active()
         if not out:
             raise RuntimeError("No initiating player found.")
-        assert self.turnCycle.ptr == ptr, "Problem with turnCycle"
         return out
     
     def get_players_condition(self, cond : Callable = lambda x : True) -> List[AbstractPlayer]:
@@ -813,7 +1040,7 @@ class MoskaGame:
         self.deck.place_to_bottom(self.trump_card)
         self.glog.info(f"Placed {self.trump_card} to bottom of deck.")
         if self.one_card_in_deck:
-            self.deck.pop_cards(len(self.deck.cards)-2)
+            self.deck.pop_cards(len(self.deck)-2)
         return
     
     def get_player_state_vectors(self, shuffle = True, balance = True) -> List[List]:
@@ -833,11 +1060,11 @@ class MoskaGame:
                 else:
                     not_losers.append(state + [1])
         if balance:
-            state_results = losers + random.sample(not_losers,min(len(losers),len(not_losers)))
+            state_results = losers + self.rng.sample(not_losers,min(len(losers),len(not_losers)))
         else:
             state_results = losers + not_losers
         if shuffle:
-            random.shuffle(state_results)
+            self.rng.shuffle(state_results)
         return state_results
         
         
@@ -879,26 +1106,32 @@ class MoskaGame:
         """ The main method of MoskaGame. Sets the trump card, locks the game to avoid race conditions between players,
         initializes and starts the player threads.
         After that, the players play the game, only one modifying the state of the game at a time.
+        Returns the ranks, or None if the game failed. If collecting metrics, returns a tuple (ranks, metrics) for a succesful game.
         """
         if len(set([pl.name for pl in self.players])) != len(self.players):
             raise ValueError("Players must have unique names.")
         self._set_trump()
         self._create_locks()
         self.glog.info(f"Starting the game with seed {self.random_seed}...")
-        os.makedirs(self.in_folder,exist_ok=True)
-        old_dir = os.getcwd()
-        os.chdir(self.in_folder)
+        if not self.headless:
+            os.makedirs(self.in_folder,exist_ok=True)
+            old_dir = os.getcwd()
+            os.chdir(self.in_folder)
         self._start_player_threads()
         self.glog.info(f"Started moska game with players {[pl.name for pl in self.players]}")
         # Wait for the threads to finish, fail, or timeout
-        success = self._join_threads()
+        if self.scheduler == "sequential":
+            success = self._run_sequential()
+        else:
+            success = self._join_threads()
         if self.gather_jsons:
             with open(self.jsons_file,"a") as f:
                 # Remove the last ',\n'
                 f.truncate(f.tell()-3)
                 # Write the end of the json
                 f.write("\n]")
-        os.chdir(old_dir)
+        if not self.headless:
+            os.chdir(old_dir)
         if not success:
             return None
         self.glog.info("Final ranking: ")
@@ -909,6 +1142,10 @@ class MoskaGame:
         if self.GATHER_DATA:
             balance, shuffle = (False, False) if self.has_graphics else (True, True)
             state_results = self.get_player_state_vectors(shuffle = shuffle, balance = balance)
+        if self.GATHER_DATA and self.headless:
+            with self.get_lock() as ml:
+                self.state_results = state_results
+        elif self.GATHER_DATA:
             vector_path = os.path.join(self.in_folder,"Vectors")
             os.makedirs(vector_path,exist_ok=True)
             with open(os.path.join(vector_path,self.get_random_file_name()),"w") as f:
@@ -928,4 +1165,64 @@ class MoskaGame:
         ranks = sorted(ranks,key = lambda x : x[1] if x[1] is not None else float("inf"))
         for p,rank in ranks:
             self.glog.info(f"#{rank} - {p}")
-        return ranks
\ No newline at end of file
+        if self.metrics is not None:
+            return ranks, self.metrics.as_dict()
+        return ranks
+
+
+class _SpecialAttr:
+    """ A descriptor for an attribute in _SPECIAL_ATTRS of a TrustedMoskaGame.
+    It only handles setting the attribute, so reading the attribute is a normal lookup from the instance dictionary.
+    """
+    def __set_name__(self, owner, name : str) -> None:
+        self.name = name
+    
+    def __set__(self, game : MoskaGame, value) -> None:
+        game.__dict__[self.name] = value
+        game._on_special_attr_set(self.name, value)
+
+
+class TrustedMoskaGame(MoskaGame):
+    """ A MoskaGame for a trusted engine, where only one player plays at a time (the 'sequential' scheduler).
+    Setting an attribute is a plain object attribute assignment: it isn't checked that the caller holds the lock, and nothing is logged.
+    Only the attributes in _SPECIAL_ATTRS have descriptors, which set the attributes depending on them.
+    Create one with MoskaGame(..., scheduler="sequential", trusted=True).
+    """
+    __setattr__ = object.__setattr__
+    EXIT_FLAG = _SpecialAttr()
+    players = _SpecialAttr()
+    log_file = _SpecialAttr()
+    nplayers = _SpecialAttr()
+    random_seed = _SpecialAttr()
+    
+    def __init__(self, *args, **kwargs):
+        # The descriptors hide the class defaults of MoskaGame, so they are copied to the instance
+        for name in _SPECIAL_ATTRS:
+            self.__dict__[name] = getattr(MoskaGame, name, None)
+        kwargs.setdefault("scheduler", "sequential")
+        kwargs["trusted"] = True
+        super().__init__(*args, **kwargs)
+
+
+if __name__ == "__main__":
+    # Micro-benchmark of the attribute guard. Run with 'python -m MoskaEngine.Game.Game'
+    from ..Player.MoskaBot3 import MoskaBot3
+    nsets = 100000
+    ngames = 20
+    for trusted in [False, True]:
+        game = MoskaGame(players=[MoskaBot3(name = "mb1"), MoskaBot3(name = "mb2")], gather_data=False, scheduler="sequential", trusted=trusted)
+        # Set attributes as a player holding the lock
+        game.threads = {0 : game, -1 : game.players[0]}
+        game.lock_holder = -1
+        start = time.perf_counter()
+        for i in range(nsets):
+            game.nturns = i
+        set_time = (time.perf_counter() - start) / nsets
+        nmoves = 0
+        start = time.perf_counter()
+        for i in range(ngames):
+            game = MoskaGame(players=[MoskaBot3(name = f"mb{j}") for j in range(4)], gather_data=False, scheduler="sequential", trusted=trusted, random_seed=i+1)
+            game.start()
+            nmoves += game.nturns
+        move_time = (time.perf_counter() - start) / nmoves
+        print(f"{type(game).__name__}: {1e9*set_time:.0f} ns per attribute set, {1e6*move_time:.1f} us per move ({nmoves} moves)")
@@ -0,0 +1,70 @@
+from typing import Any, Dict, List, Tuple
+
+
+class GameMetrics:
+    """ Timing metrics of a game, collected if the game is created with MoskaGame(..., collect_metrics=True).
+
+    The metrics tell whether a slow game spends its time in scheduling (waiting for the lock), in the search of the players (choose_move),
+    in inference (part of choose_move) or in making the moves:
+    - The time the players spent waiting for the games lock, and how many times a player was woken up, but it wasn't their turn.
+      These are only collected with the 'threads' scheduler, since with the 'sequential' scheduler the players never wait.
+    - The choose_move time and the number of mock moves per decision, grouped by the player class and the chosen move.
+    - The time spent in MoskaGame._make_move for the chosen moves.
+
+    Only sums and counts are stored, so the metrics are cheap to collect in every game.
+    """
+    def __init__(self) -> None:
+        self.lock_wait_time = 0.0           # Total seconds the players waited for the lock
+        self.lock_acquisitions = 0          # Number of times a player acquired the lock
+        self.failed_lock_acquisitions = 0   # Number of times a waiting player was woken up, but it was not their turn
+        self.make_move_time = 0.0           # Total seconds spent in MoskaGame._make_move
+        self.nmoves = 0                     # Number of moves made with MoskaGame._make_move (including invalid moves)
+        self.nmock_moves = 0                # Number of mock moves made in the game
+        self.decisions : Dict[Tuple[str,str],List] = {} # (player class, move) : [number of decisions, total choose_move time, total mock moves]
+
+    def add_lock_wait(self, wait_time : float, nfailed : int) -> None:
+        """ Record a lock acquisition, which took 'wait_time' seconds, and during which the player was woken up 'nfailed' times before their turn. """
+        self.lock_wait_time += wait_time
+        self.lock_acquisitions += 1
+        self.failed_lock_acquisitions += nfailed
+        return
+
+    def add_decision(self, player_class : str, move : str, choose_time : float, nmock_moves : int) -> None:
+        """ Record a call to choose_move, which chose 'move' in 'choose_time' seconds and made 'nmock_moves' mock moves. """
+        stats = self.decisions.get((player_class, move))
+        if stats is None:
+            stats = [0, 0.0, 0]
+            self.decisions[(player_class, move)] = stats
+        stats[0] += 1
+        stats[1] += choose_time
+        stats[2] += nmock_moves
+        return
+
+    def add_make_move(self, make_move_time : float) -> None:
+        """ Record a call to MoskaGame._make_move. """
+        self.make_move_time += make_move_time
+        self.nmoves += 1
+        return
+
+    def as_dict(self) -> Dict[str,Any]:
+        """ Return the metrics as a dictionary of plain values, that can be returned from a process or written to json.
+        The decisions are keyed by 'player class/move', and contain the count, the total and mean choose_move times and the mean number of mock moves.
+        """
+        decisions = {}
+        for (player_class, move), (n, choose_time, nmock_moves) in self.decisions.items():
+            decisions[f"{player_class}/{move}"] = {
+                "count" : n,
+                "choose_move_time" : choose_time,
+                "mean_choose_move_time" : choose_time / n,
+                "mean_mock_moves" : nmock_moves / n,
+            }
+        return {
+            "lock_wait_time" : self.lock_wait_time,
+            "lock_acquisitions" : self.lock_acquisitions,
+            "failed_lock_acquisitions" : self.failed_lock_acquisitions,
+            "make_move_time" : self.make_move_time,
+            "nmoves" : self.nmoves,
+            "mean_make_move_time" : self.make_move_time / self.nmoves if self.nmoves else 0.0,
+            "nmock_moves" : self.nmock_moves,
+            "decisions" : decisions,
+        }
@@ -1,13 +1,90 @@
-import copy
 import json
-from typing import Dict, List, TYPE_CHECKING, Tuple
+import random
+from functools import lru_cache
+from itertools import repeat
+from operator import attrgetter, is_not
+from typing import Callable, Dict, List, TYPE_CHECKING, Sequence, Tuple
 import warnings
+import numpy as np
 from .Deck import Card
 if TYPE_CHECKING:
     from .Game import MoskaGame
     from Player.AbstractPlayer import AbstractPlayer
-from .Deck import StandardDeck
-REFERENCE_DECK = tuple(StandardDeck(shuffle = False).cards)
+from .Deck import CARDS_BY_ID, UNKNOWN_CARD, UNKNOWN_CARD_ID, KILL_MASKS, KILL_TABLES, StandardDeck, cards_to_mask, mask_to_cards, mask_popcount, masks_to_array
+REFERENCE_DECK = CARDS_BY_ID  # The cards in the order of their ids
+
+
+@lru_cache(maxsize=256)
+def _cards_fall_dict(trump : str, in_game_mask : int) -> Dict[Card,List[Card]]:
+    """ The cards in the game, and the cards in the game that they can kill. Shared by all states with the same cards in the game. """
+    kill_masks = KILL_MASKS[trump]
+    return {card : mask_to_cards(kill_masks[card.id] & in_game_mask) for card in mask_to_cards(in_game_mask)}
+
+
+# Zobrist keys. The keys are generated from a fixed seed, so the hashes are the same in every process.
+_MAX_PLAYERS = 8
+_zobrist_rng = random.Random(0x6d6f736b61)
+def _zobrist_keys(n : int) -> Tuple[int,...]:
+    return tuple((_zobrist_rng.getrandbits(64) for _ in range(n)))
+_DECK_KEYS = _zobrist_keys(53)
+_HAND_KEYS = tuple((_zobrist_keys(53) for _ in range(_MAX_PLAYERS)))
+_KNOWN_KEYS = tuple((_zobrist_keys(53) for _ in range(_MAX_PLAYERS)))
+_UNKNOWN_COUNT_KEYS = tuple((_zobrist_keys(53) for _ in range(_MAX_PLAYERS)))
+_FELL_KEYS = _zobrist_keys(53)
+_TO_FALL_KEYS = _zobrist_keys(53)
+_IN_GAME_KEYS = _zobrist_keys(53)
+_READY_KEYS = _zobrist_keys(_MAX_PLAYERS)
+_PLAYER_IN_GAME_KEYS = _zobrist_keys(_MAX_PLAYERS)
+_TC_KEYS = _zobrist_keys(840)     # The turn cycle index modulo the number of players (2...8) is determined by the index modulo 840
+_TARGET_KEYS = _zobrist_keys(_MAX_PLAYERS)
+_TRUMP_KEYS = dict(zip(("C","D","H","S"), _zobrist_keys(4)))
+_TRUMP_CARD_KEYS = _zobrist_keys(53)
+_KOPLED_KEYS = _zobrist_keys(53)
+
+def _xor(values) -> int:
+    h = 0
+    for value in values:
+        h ^= value
+    return h
+
+def _cards_hash(keys : Tuple[int,...], cards) -> int:
+    h = 0
+    for card in cards:
+        h ^= keys[card.id]
+    return h
+
+def _mask_hash(keys : Tuple[int,...], mask : int) -> int:
+    h = 0
+    while mask:
+        low = mask & -mask
+        h ^= keys[low.bit_length() - 1]
+        mask ^= low
+    return h
+
+def _flags_hash(keys : Tuple[int,...], flags) -> int:
+    h = 0
+    for i, flag in enumerate(flags):
+        if flag:
+            h ^= keys[i]
+    return h
+
+# The hash of each field of FullGameState. The order of the cards in a collection is not hashed.
+_FIELD_HASHES = {
+    "deck" : lambda deck : _cards_hash(_DECK_KEYS, deck),
+    "full_player_cards" : lambda hands : _xor((_cards_hash(_HAND_KEYS[pid], cards) for pid, cards in enumerate(hands))),
+    "known_masks" : lambda masks : _xor((_mask_hash(_KNOWN_KEYS[pid], mask) for pid, mask in enumerate(masks))),
+    "unknown_counts" : lambda counts : _xor((_UNKNOWN_COUNT_KEYS[pid][n] for pid, n in enumerate(counts))),
+    "fell_cards" : lambda cards : _cards_hash(_FELL_KEYS, cards),
+    "cards_to_fall" : lambda cards : _cards_hash(_TO_FALL_KEYS, cards),
+    "in_game_mask" : lambda mask : _mask_hash(_IN_GAME_KEYS, mask),
+    "players_ready" : lambda flags : _flags_hash(_READY_KEYS, flags),
+    "players_in_game" : lambda flags : _flags_hash(_PLAYER_IN_GAME_KEYS, flags),
+    "tc_index" : lambda ptr : _TC_KEYS[ptr % 840],
+    "target_pid" : lambda pid : _TARGET_KEYS[pid],
+    "trump" : lambda trump : _TRUMP_KEYS.get(trump, 0),
+    "trump_card" : lambda card : _TRUMP_CARD_KEYS[card.id] if card is not None else 0,
+    "kopled_card" : lambda card : _KOPLED_KEYS[card.id] if card is not None else 0,
+}
 
 
 class FullGameState:
@@ -15,19 +92,39 @@ class FullGameState:
     This is an entirely static representation and is not perfect, i.e. you can not restore an arbitrary games state from this.
     You atleast need the player instances.
     This used to represent the game as a vector, and to store information about the game and later to restore it (mock move).
+
+    The state has a fixed layout of immutable values: the ordered card collections are tuples,
+    the publicly known cards and the cards still in the game are bitmasks (see Deck.cards_to_mask), and the flags are tuples of booleans.
+    Hence the states never share mutable containers with the game or each other, and copying a state only copies the references (see copy).
+    The values are changed by assigning a new value to the attribute, for example with set_player_cards.
+
+    The state has a 64-bit Zobrist hash (zobrist_hash), which is the XOR of random keys for each (card, location) and each flag.
+    The order of the cards in the deck, hands and table is not part of the hash, since it doesn't change the evaluation of a state.
+    The hash is computed when first read (or with compute_zobrist_hash), and after that it is updated incrementally, when an attribute is assigned:
+    only the keys of the changed attribute are XORed out and in. The hash is copied with the state,
+    so the successors made by MoveSimulator only hash what their move changed.
     """
-    def __init__(self,*args, copy : bool = False):
-        """ Initilize the game state, with either copying everything or not. """
-        self.copied = copy
-        if copy:
-            self.__init__with_copy(*args)
-        else:
-            self.__init__no_copy(*args)
+    __slots__ = ("deck",                # The cards in the deck, from the top
+                 "full_player_cards",   # Complete information about the players current cards
+                 "known_masks",         # The cards each player publicly has
+                 "unknown_counts",      # The number of cards each player has, that are not publicly known
+                 "fell_cards",          # Cards that have fallen and are on the table
+                 "cards_to_fall",       # Cards played to the target, that have not yet fallen
+                 "in_game_mask",        # The cards still in the game
+                 "players_ready",       # Whether each player is ready
+                 "players_in_game",     # Whether each player is in the game
+                 "tc_index",            # The index in turn cycle. Ensures the target player is saved
+                 "target_pid",
+                 "trump",
+                 "trump_card",          # The card at the bottom of the deck. Needed to know when a player publicly has it.
+                 "kopled_card",         # The card lifted from the deck this turn, that didn't fall a card. It is kopled while it is in cards_to_fall.
+                 "_zobrist",            # The Zobrist hash, or None if it hasn't been computed
+                 )
     
-    def __init__no_copy(self,
+    def __init__(self,
                  deck : StandardDeck,
-                 known_player_cards : List[Card],
-                 full_player_cards : List[Card],
+                 known_player_cards : List[List[Card]],
+                 full_player_cards : List[List[Card]],
                  fell_cards : List[Card],
                  cards_to_fall : List[Card],
                  cards_fall_dict : Dict[Card,List[Card]],
@@ -35,53 +132,95 @@ class FullGameState:
                  players_in_game : List[bool],
                  tc_index : int,
                  target_pid : int,
-                 trump : str
+                 trump : str,
+                 trump_card : Card = None,
+                 kopled_card : Card = None,
+                 copy : bool = True,
                  ):
-        """ Initilize the game state, without copying everything.
-        This is faster, but if you modify the game state, this instance will be modified as well.
+        """ Initilize the game state from the games containers. The deck can be a StandardDeck or a sequence of cards.
+        The containers are always converted to the fixed layout, so the state is never modified with the game, and 'copy' has no effect.
+        Only the keys of cards_fall_dict are used, since the cards a card can fall are determined by the trump suit.
         """
-        self.deck = deck # The deck of cards
-        self.full_player_cards = full_player_cards # Complete information about the players current cards
-        self.known_player_cards = known_player_cards # Known player cards
-        self.fell_cards = fell_cards # Cards that have fallen and are on the table
-        self.cards_to_fall = cards_to_fall # Cards played to the target, that have not yet fallen
-        self.cards_fall_dict = cards_fall_dict # A dictionary containing each card left in the game, and the cards that the card can fall.
-        self.players_ready = players_ready # A list of booleans representing if each player is ready
-        self.players_in_game = players_in_game # A list of booleans representing if each player is in the game
-        self.tc_index = tc_index # The index in turn cycle. Ensures the target player is saved
+        object.__setattr__(self, "_zobrist", None)
+        self.deck = tuple(deck.cards) if isinstance(deck, StandardDeck) else tuple(deck)
+        self.full_player_cards = tuple((tuple(cards) for cards in full_player_cards))
+        self.known_masks = tuple((cards_to_mask(cards) for cards in known_player_cards))
+        self.unknown_counts = tuple((sum((1 for card in cards if card is UNKNOWN_CARD)) for cards in known_player_cards))
+        self.fell_cards = tuple(fell_cards)
+        self.cards_to_fall = tuple(cards_to_fall)
+        self.in_game_mask = cards_to_mask(cards_fall_dict)
+        self.players_ready = tuple(players_ready)
+        self.players_in_game = tuple(players_in_game)
+        self.tc_index = tc_index
         self.target_pid = target_pid
         self.trump = trump
-        
-        
-    def __init__with_copy(self,
-                deck : StandardDeck,
-                known_player_cards : List[Card],
-                full_player_cards : List[Card],
-                fell_cards : List[Card],
-                cards_to_fall : List[Card],
-                cards_fall_dict : Dict[Card,List[Card]],
-                players_ready : List[bool],
-                players_in_game : List[bool],
-                tc_index : int,
-                target_pid : int,
-                trump : str
-                ):
-        """ Initilize the game state, with copying everything.
-        This is slower, but if you modify the game state, this instance will not be modified.
-        All mutable objects are deepcopied.
+        self.trump_card = trump_card
+        self.kopled_card = kopled_card
+    
+    def __setattr__(self, name : str, value) -> None:
+        """ Set the attribute, and update the Zobrist hash if it has been computed. """
+        zobrist = self._zobrist
+        if zobrist is not None:
+            field_hash = _FIELD_HASHES[name]
+            object.__setattr__(self, "_zobrist", zobrist ^ field_hash(getattr(self, name)) ^ field_hash(value))
+        object.__setattr__(self, name, value)
+    
+    @property
+    def zobrist_hash(self) -> int:
+        """ The 64-bit Zobrist hash of the state. States with the same hash are equal, except for the order of cards in the collections. """
+        return self.compute_zobrist_hash()
+    
+    def compute_zobrist_hash(self) -> int:
+        """ Compute the Zobrist hash, if it hasn't been computed yet, and return it.
+        After this, the hash is updated incrementally when the state (or a copy of it) is changed.
         """
-        self.deck = copy.deepcopy(deck) # The deck of cards
-        self.full_player_cards = copy.deepcopy(full_player_cards) # Complete information about the players current cards
-        self.known_player_cards = copy.deepcopy(known_player_cards) # Known player cards
-        self.fell_cards = copy.deepcopy(fell_cards) # Cards that have fallen and are on the table
-        self.cards_to_fall = copy.deepcopy(cards_to_fall) # Cards played to the target, that have not yet fallen
-        self.cards_fall_dict = copy.deepcopy(cards_fall_dict) # A dictionary containing each card left in the game, and the cards that the card can fall.
-        self.players_ready = copy.copy(players_ready) # A list of booleans representing if each player is ready
-        self.players_in_game = copy.copy(players_in_game) # A list of booleans representing if each player is in the game
-        self.tc_index = tc_index # The index in turn cycle. Ensures the target player is saved
-        self.target_pid = target_pid
-        self.trump = trump
-        
+        if self._zobrist is None:
+            object.__setattr__(self, "_zobrist", _xor((field_hash(getattr(self, name)) for name, field_hash in _FIELD_HASHES.items())))
+        return self._zobrist
+    
+    @property
+    def known_player_cards(self) -> List[List[Card]]:
+        """ The publicly known cards of each player, like CardMonitor.player_cards: The unknown cards (Card(-1,"X")) first, then the known cards by id.
+        The lists are created when this is read.
+        """
+        return [[UNKNOWN_CARD]*nunknown + mask_to_cards(mask) for mask, nunknown in zip(self.known_masks, self.unknown_counts)]
+    
+    @property
+    def cards_fall_dict(self) -> Dict[Card,List[Card]]:
+        """ A dictionary containing each card left in the game, and the cards that the card can fall.
+        The dictionary is shared between states, and must not be modified.
+        """
+        return _cards_fall_dict(self.trump, self.in_game_mask)
+    
+    def cards_in_game(self) -> List[Card]:
+        """ Return the cards still in the game, ordered by id. """
+        return mask_to_cards(self.in_game_mask)
+    
+    def card_score(self, card : Card) -> int:
+        """ Return how many cards in the game 'card' can fall. """
+        return mask_popcount(KILL_MASKS[self.trump][card.id] & self.in_game_mask)
+    
+    def player_ncards(self) -> List[int]:
+        """ Return the number of cards each player has, as known to everyone. """
+        return [mask_popcount(mask) + nunknown for mask, nunknown in zip(self.known_masks, self.unknown_counts)]
+    
+    def set_player_cards(self, pid : int, cards : Sequence[Card]) -> None:
+        """ Set the cards of player 'pid'. """
+        cards = tuple(cards)
+        if self._zobrist is not None:
+            keys = _HAND_KEYS[pid]
+            object.__setattr__(self, "_zobrist", self._zobrist ^ _cards_hash(keys, self.full_player_cards[pid]) ^ _cards_hash(keys, cards))
+        object.__setattr__(self, "full_player_cards", self.full_player_cards[:pid] + (cards,) + self.full_player_cards[pid + 1:])
+        return
+    
+    def set_known_cards(self, pid : int, known_mask : int, nunknown : int) -> None:
+        """ Set the publicly known cards of player 'pid', and the number of their cards that are not known. """
+        if self._zobrist is not None:
+            object.__setattr__(self, "_zobrist", (self._zobrist ^ _mask_hash(_KNOWN_KEYS[pid], self.known_masks[pid] ^ known_mask)
+                                                  ^ _UNKNOWN_COUNT_KEYS[pid][self.unknown_counts[pid]] ^ _UNKNOWN_COUNT_KEYS[pid][nunknown]))
+        object.__setattr__(self, "known_masks", self.known_masks[:pid] + (known_mask,) + self.known_masks[pid + 1:])
+        object.__setattr__(self, "unknown_counts", self.unknown_counts[:pid] + (nunknown,) + self.unknown_counts[pid + 1:])
+        return
         
     def restore_game_state(self,game : 'MoskaGame', check : bool = False) -> None:
         """ Restore the game state of a game.
@@ -89,14 +228,14 @@ class FullGameState:
         If check is False, the game state is not checked after restoration.
         If check is True and the game state is not equal to this game state, a ValueError is raised.
         """
-        if not self.copied:
-            warnings.warn("The game state was not copied. This may cause unexpected behaviour.")
         # These should be fine
-        game.deck = self.deck
-        game.fell_cards = self.fell_cards
-        game.cards_to_fall = self.cards_to_fall
-        game.card_monitor.cards_kill_dict = self.cards_fall_dict
-        game.card_monitor.player_cards = {pl.name:cards for pl,cards in zip(game.players,self.known_player_cards)}
+        game.deck.cards = self.deck
+        game.fell_cards = list(self.fell_cards)
+        game.cards_to_fall = list(self.cards_to_fall)
+        game.kopled_card = self.kopled_card
+        game.card_monitor.in_game_mask = self.in_game_mask
+        game.card_monitor.known_masks = {pl.name : mask for pl, mask in zip(game.players, self.known_masks)}
+        game.card_monitor.unknown_counts = {pl.name : nunknown for pl, nunknown in zip(game.players, self.unknown_counts)}
         game.turnCycle.ptr = self.tc_index
         
         for pl in game.players:
@@ -105,7 +244,7 @@ class FullGameState:
             # Restoring incorrect ranks would require starting
             # the players again, and that is not currently possible.
         for pl, cards in zip(game.players,self.full_player_cards):
-            pl.hand.cards = cards
+            pl.hand.cards = list(cards)
         if check:
             passed, msg = self.is_game_equal(game,return_msg=True)
             if not passed:
@@ -114,43 +253,35 @@ class FullGameState:
 
     @classmethod
     def from_game(cls,game : 'MoskaGame', copy : bool = True) -> 'FullGameState':
-        """ Create a game state from a game."""
-        full_player_cards = [pl.hand.cards for pl in game.players]
-        known_player_cards = [game.card_monitor.player_cards[pl.name] for pl in game.players]
-        players_ready = [pl.ready for pl in game.players]
-        players_in_game = [pl.rank is None for pl in game.players]
-        target_pid = game.get_target_player().pid
-        return cls(game.deck,
-                   known_player_cards,
-                   full_player_cards,
-                   game.fell_cards,
-                   game.cards_to_fall,
-                   game.card_monitor.cards_kill_dict,
-                   players_ready,
-                   players_in_game,
-                   game.turnCycle.ptr,
-                   target_pid,
-                   game.trump,
-                   copy = copy,
-                   )
+        """ Create a game state from a game. The state never shares containers with the game, so 'copy' has no effect."""
+        card_monitor = game.card_monitor
+        state = cls.__new__(cls)
+        object.__setattr__(state, "_zobrist", None)
+        state.deck = tuple(game.deck.cards)
+        state.full_player_cards = tuple((tuple(pl.hand.cards) for pl in game.players))
+        state.known_masks = tuple((card_monitor.known_masks[pl.name] for pl in game.players))
+        state.unknown_counts = tuple((card_monitor.unknown_counts[pl.name] for pl in game.players))
+        state.fell_cards = tuple(game.fell_cards)
+        state.cards_to_fall = tuple(game.cards_to_fall)
+        state.in_game_mask = card_monitor.in_game_mask
+        state.players_ready = tuple((pl.ready for pl in game.players))
+        state.players_in_game = tuple((pl.rank is None for pl in game.players))
+        state.tc_index = game.turnCycle.ptr
+        state.target_pid = game.get_target_player().pid
+        state.trump = game.trump
+        state.trump_card = game.trump_card
+        state.kopled_card = game.kopled_card
+        return state
 
     def copy(self) -> 'FullGameState':
-        """ Create a shallow copy of this object.
+        """ Create a copy of this object.
+        All the values are immutable, so they are shared with the copy.
         This is used when sampling the possible future game states in some models.
         """
-        return type(self)(self.deck,
-                          [copy.copy(cards) for cards in self.known_player_cards],
-                          [copy.copy(cards) for cards in self.full_player_cards],
-                          copy.copy(self.fell_cards),
-                          copy.copy(self.cards_to_fall),
-                          copy.copy(self.cards_fall_dict),
-                          copy.copy(self.players_ready),
-                          copy.copy(self.players_in_game),
-                          self.tc_index,
-                          self.target_pid,
-                          self.trump,
-                          copy = False,
-                          )
+        new = FullGameState.__new__(type(self))
+        for name in FullGameState.__slots__:
+            object.__setattr__(new, name, getattr(self, name))
+        return new
         
     def is_game_equal(self, other : 'MoskaGame', return_msg : bool = False) -> Tuple[bool,str]:
         """ Check if the game state is equal to the game state of a game instance.
@@ -163,39 +294,40 @@ class FullGameState:
             out = False
             msg = "The tc_index is not equal. {} != {}".format(self.tc_index,other.turnCycle.ptr)
         # Check if the kopled status is the same
-        elif [card.kopled for card in self.cards_to_fall] != [card.kopled for card in other.cards_to_fall]:
+        elif (self.kopled_card if self.kopled_card in self.cards_to_fall else None) is not (other.kopled_card if other.kopled_card in other.cards_to_fall else None):
             out = False
             msg = "The cards_to_fall kopled state is not equal. {} != {}".format(self.cards_to_fall,other.cards_to_fall)
         # Check if the cards in the deck are the same and in same order
-        elif self.deck.cards != other.deck.cards:
+        elif self.deck != tuple(other.deck.cards):
             out = False
-            msg = "The decks are not equal. {} != {}".format(self.deck.cards,other.deck.cards)
+            msg = "The decks are not equal. {} != {}".format(self.deck,other.deck.cards)
         # Check if the players have the same cards
-        elif self.full_player_cards != [pl.hand.cards for pl in other.players]:
+        elif self.full_player_cards != tuple((tuple(pl.hand.cards) for pl in other.players)):
             out = False
             msg = "The full player cards are not equal. {} != {}".format(self.full_player_cards,[pl.hand.cards for pl in other.players])
         # Check if the publically known cards are the same
-        elif self.known_player_cards != [other.card_monitor.player_cards[pl.name] for pl in other.players]:
+        elif (self.known_masks != tuple((other.card_monitor.known_masks[pl.name] for pl in other.players))
+              or self.unknown_counts != tuple((other.card_monitor.unknown_counts[pl.name] for pl in other.players))):
             out = False
             msg = "The known player cards are not equal. {} != {}".format(self.known_player_cards,[other.card_monitor.player_cards[pl.name] for pl in other.players])
         # Check if the fell cards are the same
-        elif self.fell_cards != other.fell_cards:
+        elif self.fell_cards != tuple(other.fell_cards):
             out = False
             msg = "The fell cards are not equal. {} != {}".format(self.fell_cards,other.fell_cards)
         # Check if the cards to fall are the same
-        elif self.cards_to_fall != other.cards_to_fall:
+        elif self.cards_to_fall != tuple(other.cards_to_fall):
             out = False
             msg = "The cards to fall are not equal. {} != {}".format(self.cards_to_fall,other.cards_to_fall)
         # Check if the cards in game are the same
-        elif self.cards_fall_dict != other.card_monitor.cards_kill_dict:
+        elif self.in_game_mask != other.card_monitor.in_game_mask:
             out = False
-            msg = "The cards fall dict are not equal. {} != {}".format(self.cards_fall_dict,other.card_monitor.cards_kill_dict)
+            msg = "The cards in game are not equal. {} != {}".format(self.cards_in_game(),other.card_monitor.cards_in_game())
         # Check if the players ready are the same
-        elif self.players_ready != [pl.ready for pl in other.players]:
+        elif self.players_ready != tuple((pl.ready for pl in other.players)):
             out = False
             msg = "The players ready are not equal. {} != {}".format(self.players_ready,[pl.ready for pl in other.players])
         # Check if the players still in the game are the same
-        elif self.players_in_game != [pl.rank is None for pl in other.players]:
+        elif self.players_in_game != tuple((pl.rank is None for pl in other.players)):
             out = False
             msg = "The players in game are not equal. {} != {}".format(self.players_in_game,[pl.rank is None for pl in other.players])
         if return_msg:
@@ -203,7 +335,7 @@ class FullGameState:
         return out
     
     def _get_card_score(self,card : Card) -> int:
-        return len(self.cards_fall_dict[card])
+        return self.card_score(card)
 
     def encode_cards(self, cards : List[Card],fill = -1,cards_fall_dict = None) -> List[int]:
         """ DEPRECATED!!!!
@@ -212,23 +344,23 @@ class FullGameState:
         If a card is not in the game (not in cards_fall), the value is -1.
         """
         warnings.warn("The card encoding method is deprecated",DeprecationWarning)
-        if not cards_fall_dict:
-            cards_fall_dict = self.cards_fall_dict
+        if cards_fall_dict:
+            card_score = lambda card : len(cards_fall_dict[card]) if card in cards_fall_dict else -1
+        else:
+            card_score = lambda card : self.card_score(card) if self.in_game_mask & card.bit else -1
         out = [fill] * len(REFERENCE_DECK)
         if len(out) != 52:
             raise ValueError("The reference deck is not 52 cards long.")
         # Loop through input cards
         for card in cards:
             # If the card is an uknown, skip it.
-            if card == Card(-1,"X"):
+            if card is UNKNOWN_CARD:
                 continue
             # If no such card exists, the value is -1, which indicates that the card is not in the game.
-            encoding_value = -1
-            if card in cards_fall_dict:
-                encoding_value = len(cards_fall_dict[card])
+            encoding_value = card_score(card)
             # The index of the card in the reference deck is set to the number of
             # cards that the card can fall OR -1 if the card is not in the game.
-            out[REFERENCE_DECK.index(card)] = encoding_value
+            out[card.id] = encoding_value
         return out
     
     def _as_perspective_bitmap_vector(self,player : 'AbstractPlayer') -> List[int]:
@@ -237,11 +369,11 @@ class FullGameState:
         TODO: Add the description of the encoding.
         """
         out = []
-        out += [len(self.deck.cards)]
-        out += [len(hand) for hand in self.known_player_cards]
+        out += [len(self.deck)]
+        out += self.player_ncards()
         out += [1 if ready else 0 for ready in self.players_ready]
         out += [1 if in_game else 0 for in_game in self.players_in_game]
-        out += [1 if any([card.kopled for card in self.cards_to_fall]) else 0]
+        out += [1 if self.kopled_card in self.cards_to_fall else 0]
         out += [1 if i == self.target_pid else 0 for i in range(4)]
         out += [1 if c.suit == self.trump else 0 for c in REFERENCE_DECK[0:4]]
         out += [1 if i == player.pid else 0 for i in range(4)]
@@ -249,31 +381,29 @@ class FullGameState:
         z_init = [0 for _ in range(52)]
 
         z = z_init.copy()
-        for card in self.cards_fall_dict:
-            z[REFERENCE_DECK.index(card)] = 1
+        for card in self.cards_in_game():
+            z[card.id] = 1
         out += z
 
         z = z_init.copy()
         for card in self.cards_to_fall:
-            z[REFERENCE_DECK.index(card)] = 1
+            z[card.id] = 1
         out += z
 
         z = z_init.copy()
         for card in self.fell_cards:
-            z[REFERENCE_DECK.index(card)] = 1
+            z[card.id] = 1
         out += z
 
-        for pl, cards in enumerate(self.known_player_cards):
+        for known_mask in self.known_masks:
             z = z_init.copy()
-            for card in cards:
-                if card == Card(-1,"X"):
-                    continue
-                z[REFERENCE_DECK.index(card)] = 1
+            for card in mask_to_cards(known_mask):
+                z[card.id] = 1
             out += z
 
         z = z_init.copy()
         for card in self.full_player_cards[player.pid]:
-            z[REFERENCE_DECK.index(card)] = 1
+            z[card.id] = 1
         out += z
         return out
         
@@ -301,9 +431,9 @@ class FullGameState:
             raise NameError("Unknown format: {}".format(fmt))
         out = []
         # How many cards are left in the deck
-        out += [len(self.deck.cards)]
+        out += [len(self.deck)]
         # How many cards each player has in their hand
-        out += [len(hand) for hand in self.known_player_cards]
+        out += self.player_ncards()
         # Which cards are still in the game, and encoded as how many cards they can fall.
         out += local_encode_cards(REFERENCE_DECK)
         # Which cards are on the table, waiting to be fell
@@ -318,7 +448,7 @@ class FullGameState:
         in_game_vec[self.target_pid] = 2 if in_game_vec[self.target_pid] == 1 else 0
         out += in_game_vec
         # Whether there is kopled card on the table
-        out += [1] if any([card.kopled for card in self.cards_to_fall]) else [0]
+        out += [1] if self.kopled_card in self.cards_to_fall else [0]
         # Encoded player hands from the perspective of the player: All picked up cards
         for known_cards in self.known_player_cards:
             out += local_encode_cards(known_cards)
@@ -328,4 +458,210 @@ class FullGameState:
         # len should be 1 + 4 +52 + 52 + 52 + 4 + 4 + 1 + 4*52 (+1) = 431/432
         return out
     
-        
\ No newline at end of file
+        
+
+
+# [i,j] is 1 if the card with id j can kill the card with id i, so that (cards in game) @ matrix is the number of cards in the game each card can fall
+_KILL_COUNT_MATRICES = {trump : table[:UNKNOWN_CARD_ID, :UNKNOWN_CARD_ID].T.astype(np.float32) for trump, table in KILL_TABLES.items()}
+_SUIT_INDEX = {card.suit : i for i, card in enumerate(REFERENCE_DECK[0:4])}
+
+def _encoding_layout(fmt : str, nplayers : int) -> Dict[str,slice]:
+    """ Return the columns of each part of the encoding, in the order of as_perspective_vector. """
+    if fmt == "bitmap":
+        widths = [("deck", 1), ("ncards", nplayers), ("ready", nplayers), ("in_game", nplayers), ("kopled", 1),
+                  ("target", 4), ("trump", 4), ("pid", 4),
+                  ("in_game_cards", 52), ("to_fall", 52), ("fell", 52), ("known", 52*nplayers), ("own", 52)]
+    else:
+        widths = [("deck", 1), ("ncards", nplayers), ("in_game_cards", 52), ("to_fall", 52), ("fell", 52),
+                  ("ready", nplayers), ("in_game", nplayers), ("kopled", 1), ("known", 52*nplayers), ("own", 52)]
+    layout = {}
+    start = 0
+    for name, width in widths:
+        layout[name] = slice(start, start + width)
+        start += width
+    return layout
+
+def _encoding_dependencies(fmt : str) -> Dict[str,Tuple[str,...]]:
+    """ Return the attributes of a state, that each part of the encoding depends on. """
+    # In the algebraic formats, the cards are encoded with their scores
+    card_deps = ("in_game_mask", "trump") if fmt != "bitmap" else ()
+    return {
+        "deck" : ("deck",),
+        "ncards" : ("known_masks", "unknown_counts"),
+        "ready" : ("players_ready",),
+        # In the algebraic formats, the target is marked in the players in game
+        "in_game" : ("players_in_game",) + (("target_pid",) if fmt != "bitmap" else ()),
+        "kopled" : ("kopled_card", "cards_to_fall"),
+        "target" : ("target_pid",),
+        "trump" : ("trump",),
+        "pid" : (),
+        "in_game_cards" : ("in_game_mask", "trump"),
+        "to_fall" : ("cards_to_fall",) + card_deps,
+        "fell" : ("fell_cards",) + card_deps,
+        "known" : ("known_masks",) + card_deps,
+        "own" : ("full_player_cards",) + card_deps,
+    }
+
+def _card_scores(states : Sequence[FullGameState]) -> np.ndarray:
+    """ Return an array of shape (len(states), 52) with the number of cards in the game each card can fall, or -1 if the card is not in the game. """
+    in_game = masks_to_array([state.in_game_mask for state in states]).astype(np.float32)
+    scores = np.empty(in_game.shape, dtype=np.float32)
+    trumps = [state.trump for state in states]
+    for trump in set(trumps):
+        inds = [i for i, t in enumerate(trumps) if t == trump]
+        scores[inds] = in_game[inds] @ _KILL_COUNT_MATRICES[trump]
+    scores[in_game == 0] = -1
+    return scores
+
+# The values of the parts of the encoding, that are read directly from the states
+_VALUE_PARTS = {
+    "deck" : lambda state : (len(state.deck),),
+    "unknown_counts" : attrgetter("unknown_counts"),     # Not a part, but the number of cards of the players is computed from it
+    "ready" : attrgetter("players_ready"),
+    "in_game" : attrgetter("players_in_game"),
+    "kopled" : lambda state : (state.kopled_card in state.cards_to_fall,),
+}
+_ONE_HOT_PARTS = ("target", "trump", "pid")
+
+def _card_part_masks(part : str, pid : int) -> Callable:
+    """ Return a function, that returns the masks of a state encoded by a part, that encodes collections of cards. """
+    if part == "in_game_cards":
+        return lambda state : (state.in_game_mask,)
+    if part == "to_fall":
+        return lambda state : (cards_to_mask(state.cards_to_fall),)
+    if part == "fell":
+        return lambda state : (cards_to_mask(state.fell_cards),)
+    if part == "known":
+        return attrgetter("known_masks")
+    if part == "own":
+        return lambda state : (cards_to_mask(state.full_player_cards[pid]),)
+    raise NameError("Unknown part of the encoding: {}".format(part))
+
+def _encode_parts(out : np.ndarray,
+                  rows,
+                  parts : Sequence[str],
+                  states : Sequence[FullGameState],
+                  pid : int,
+                  fmt : str,
+                  layout : Dict[str,slice],
+                  scores : np.ndarray = None,
+                  ) -> None:
+    """ Encode the parts (see _encoding_layout) of the states to out[rows]. All the values of the parts are collected with one pass over the states,
+    and the masks of all the card parts are unpacked at once.
+    In the algebraic formats, 'scores' are the scores of the cards (see _card_scores), if they are known.
+    """
+    n = len(states)
+    parts = list(parts)
+    card_parts = [part for part in parts if part not in _VALUE_PARTS and part not in _ONE_HOT_PARTS and part != "ncards"]
+    # The number of cards of each player is the number of their known cards plus the number of their unknown cards
+    if "ncards" in parts and "known" not in card_parts:
+        card_parts.append("known")
+    value_parts = [part for part in parts if part in _VALUE_PARTS] + (["unknown_counts"] if "ncards" in parts else [])
+    if value_parts:
+        getters = [_VALUE_PARTS[part] for part in value_parts]
+        values = np.array([[v for getter in getters for v in getter(state)] for state in states], dtype=np.float32)
+        start = 0
+        for part in value_parts:
+            width = len(states[0].players_in_game) if part == "unknown_counts" else layout[part].stop - layout[part].start
+            part_values = values[:, start:start + width]
+            start += width
+            if part == "unknown_counts":
+                unknown_counts = part_values
+                continue
+            if part == "in_game" and fmt != "bitmap":
+                # In the algebraic formats, the target is marked with a 2, if they are in the game
+                part_values[np.arange(n), np.array([state.target_pid for state in states])] *= 2
+            out[rows, layout[part]] = part_values
+    for part in parts:
+        if part not in _ONE_HOT_PARTS:
+            continue
+        # One-hot vectors of length 4
+        if part == "target":
+            inds = np.array([state.target_pid for state in states])
+        elif part == "trump":
+            inds = np.array([_SUIT_INDEX.get(state.trump, -1) for state in states])
+        else:
+            inds = np.full(n, pid)
+        one_hot = np.zeros((n, 4), dtype=np.float32)
+        in_range = (inds >= 0) & (inds < 4)
+        one_hot[np.arange(n)[in_range], inds[in_range]] = 1
+        out[rows, layout[part]] = one_hot
+    if not card_parts:
+        return
+    if fmt != "bitmap":
+        # In the algebraic formats, all the cards are encoded as their scores
+        if scores is None:
+            scores = _card_scores(states)
+        if "in_game_cards" in card_parts:
+            out[rows, layout["in_game_cards"]] = scores
+            card_parts.remove("in_game_cards")
+    getters = [_card_part_masks(part, pid) for part in card_parts]
+    bits = masks_to_array([[mask for getter in getters for mask in getter(state)] for state in states])
+    start = 0
+    for part in card_parts:
+        width = (layout[part].stop - layout[part].start) // 52
+        part_bits = bits[:, start:start + width]
+        start += width
+        if part == "known" and "ncards" in parts:
+            out[rows, layout["ncards"]] = part_bits.sum(axis=2) + unknown_counts
+            if part not in parts:
+                continue
+        if fmt != "bitmap":
+            # The cards not in the collection are 0 in the old format and -1 in the new format
+            fill = 0 if fmt == "old-algbr" else -1
+            out[rows, layout[part]] = np.where(part_bits == 1, scores[:, np.newaxis, :], np.float32(fill)).reshape(n, -1)
+        else:
+            out[rows, layout[part]] = part_bits.reshape(n, -1)
+    return
+
+# Encoding the parts from the parent has a fixed cost, which is only won back with many states
+_MIN_STATES_WITH_PARENT = 64
+
+def encode_states(states : Sequence[FullGameState], player : 'AbstractPlayer', fmt : str = "new", parent : FullGameState = None) -> np.ndarray:
+    """ Encode the states from the perspective of the player to a float32 array of shape (len(states), D), that can be given to a model.
+    Row i equals states[i].as_perspective_vector(player, fmt), for the formats 'bitmap', 'new-algbr' and 'old-algbr'.
+
+    The array is allocated once, and each part of the encoding is computed for all the states at once.
+    The card vectors are unpacked from the bitmasks of the states, instead of looping through the cards of each state.
+
+    If 'parent' is given, the states are expected to be successors of it, like the states made by MoveSimulator from a copy of the parent.
+    The parts of the encoding, whose attributes are the same objects in the parent and all the states, are encoded once from the parent
+    and broadcast to all the rows. Only the other parts are encoded for each state. Since the attributes of a state are immutable,
+    this gives the same result as encoding the states from scratch, but the states only pay for the parts their moves changed.
+    With less than _MIN_STATES_WITH_PARENT states, the parent is ignored.
+    """
+    if fmt not in ("bitmap", "new-algbr", "old-algbr"):
+        raise NameError("Unknown format: {}".format(fmt))
+    n = len(states)
+    if n == 0:
+        return np.zeros((0, 0), dtype=np.float32)
+    pid = player.pid
+    layout = _encoding_layout(fmt, len(states[0].players_in_game))
+    width = max((cols.stop for cols in layout.values()))
+    if parent is None or n < _MIN_STATES_WITH_PARENT:
+        out = np.empty((n, width), dtype=np.float32)
+        _encode_parts(out, slice(None), layout, states, pid, fmt, layout)
+        return out
+    if len(parent.players_in_game) != len(states[0].players_in_game):
+        raise ValueError("The parent state has a different number of players than the states")
+    # The attributes, that are the parents in all the states
+    dependencies = _encoding_dependencies(fmt)
+    names = dict.fromkeys((name for deps in dependencies.values() for name in deps))
+    changed_names = set()
+    for name in names:
+        get_value = attrgetter(name)
+        parent_value = get_value(parent)
+        if any(map(is_not, map(get_value, states), repeat(parent_value))):
+            changed_names.add(name)
+    changed_parts = [part for part in layout if changed_names.intersection(dependencies[part])]
+    unchanged_parts = [part for part in layout if part not in changed_parts]
+    out = np.empty((n, width), dtype=np.float32)
+    # The unchanged parts are encoded from the parent, and broadcast to all the rows
+    _encode_parts(out, slice(None), unchanged_parts, [parent], pid, fmt, layout)
+    if changed_parts:
+        # If the cards in the game and the trump are the parents, so are the scores of the cards
+        scores = None
+        if fmt != "bitmap" and not changed_names.intersection(("in_game_mask", "trump")):
+            scores = _card_scores([parent])
+        _encode_parts(out, slice(None), changed_parts, states, pid, fmt, layout, scores)
+    return out
@@ -1,14 +1,72 @@
 from __future__ import annotations
-from typing import Iterable, TYPE_CHECKING
+from typing import Dict, Iterable, List, Set, TYPE_CHECKING
+from .Deck import RANK_MASKS, SUIT_MASKS, cards_to_mask, mask_ranks, mask_to_cards, rank_count_at_least
 if TYPE_CHECKING:
     from Game.Game import MoskaGame
     from Deck import Card
 
 
+class _CardList(list):
+    """ A list of cards, that keeps the bitmask of its cards up to date when it is modified.
+    Adding cards sets their bits, and removing single cards clears them. Other modifications (slice assignments, undo journal rollbacks)
+    recompute the mask. The cards of a hand are unique, so a removed card is not elsewhere in the list.
+    """
+    __slots__ = ("mask",)
+    def __init__(self, cards : Iterable[Card] = ()):
+        super().__init__(cards)
+        self.mask = cards_to_mask(self)
+    
+    def append(self, card : Card) -> None:
+        super().append(card)
+        self.mask |= card.bit
+    
+    def extend(self, cards : Iterable[Card]) -> None:
+        cards = list(cards)
+        super().extend(cards)
+        self.mask |= cards_to_mask(cards)
+    
+    def __iadd__(self, cards : Iterable[Card]) -> "_CardList":
+        self.extend(cards)
+        return self
+    
+    def insert(self, index : int, card : Card) -> None:
+        super().insert(index, card)
+        self.mask |= card.bit
+    
+    def remove(self, card : Card) -> None:
+        super().remove(card)
+        self.mask &= ~card.bit
+    
+    def pop(self, index : int = -1) -> Card:
+        card = super().pop(index)
+        self.mask &= ~card.bit
+        return card
+    
+    def clear(self) -> None:
+        super().clear()
+        self.mask = 0
+    
+    def __setitem__(self, index, value) -> None:
+        super().__setitem__(index, value)
+        self.mask = cards_to_mask(self)
+    
+    def __delitem__(self, index) -> None:
+        super().__delitem__(index)
+        self.mask = cards_to_mask(self)
+    
+    def __imul__(self, n : int) -> "_CardList":
+        super().__imul__(n)
+        self.mask = cards_to_mask(self)
+        return self
+
+
 class MoskaHand:
     """This class represents a players Hand
+
+    The cards are kept in a list in the order they were received, and the list maintains the bitmask of the cards (see Deck.cards_to_mask).
+    The rank and suit queries (cards_of_rank, cards_of_suit, ranks_with_at_least, ...) are bit operations on the mask, so they don't loop through the cards.
     """
-    cards = []
+    _cards : _CardList = _CardList()
     moskaGame = None
     def __init__(self,moskaGame : MoskaGame):
         """Initialize a MoskaHand instance. This requires a reference to a MoskaGame instance.
@@ -19,6 +77,17 @@ class MoskaHand:
         self.cards = moskaGame.deck.pop_cards(6)
         self.moskaGame = moskaGame
     
+    @property
+    def cards(self) -> List[Card]:
+        """ The cards in the hand. The list can be modified in place, and the mask of the hand is updated. """
+        return self._cards
+    
+    @cards.setter
+    def cards(self, cards : Iterable[Card]) -> None:
+        # 'hand.cards += cards' modifies the list in place, and then sets it
+        if cards is not self._cards:
+            self._cards = _CardList(cards)
+    
     def draw(self,n : int):
         """Draw n cards from the deck associated with the MoskaGame -instance.
         Add the cards to this hand.
@@ -26,7 +95,7 @@ class MoskaHand:
         Args:
             n (_type_): _description_
         """
-        self.cards += self.moskaGame.deck.pop_cards(n)
+        self._cards.extend(self.moskaGame.deck.pop_cards(n))
         return
     
     def add(self,cards : Iterable[Card]):
@@ -35,9 +104,49 @@ class MoskaHand:
         Args:
             cards (Iterable[Card]): Cards to add
         """
-        self.cards += [c for c in cards]
+        self._cards.extend(cards)
         return
     
+    @property
+    def mask(self) -> int:
+        """ The cards in the hand as a bitmask (see Deck.cards_to_mask) """
+        return self._cards.mask
+    
+    def rank_mask(self, rank : int) -> int:
+        """ The cards of the rank in the hand as a bitmask """
+        return self._cards.mask & RANK_MASKS[rank]
+    
+    def cards_of_rank(self, rank : int) -> List[Card]:
+        """ Return the cards of the rank in the hand, ordered by suit """
+        return mask_to_cards(self._cards.mask & RANK_MASKS[rank])
+    
+    def cards_of_suit(self, suit : str) -> List[Card]:
+        """ Return the cards of the suit in the hand, ordered by rank """
+        return mask_to_cards(self._cards.mask & SUIT_MASKS[suit])
+    
+    def ranks(self) -> Set[int]:
+        """ Return the set of ranks in the hand """
+        return mask_ranks(self._cards.mask)
+    
+    def ranks_with_at_least(self, n : int) -> Set[int]:
+        """ Return the set of ranks, that have atleast n cards in the hand """
+        return mask_ranks(rank_count_at_least(self._cards.mask, n))
+    
+    def rank_groups(self, min_cards : int = 1) -> Dict[int,List[Card]]:
+        """ Return a dictionary of rank : cards, of the ranks that have atleast 'min_cards' cards in the hand.
+        The ranks and the cards of each rank are in the order of the hand.
+        """
+        groups = {}
+        if min_cards <= 1:
+            for card in self._cards:
+                groups.setdefault(card.rank, []).append(card)
+            return groups
+        mask = rank_count_at_least(self._cards.mask, min_cards)
+        for card in self._cards:
+            if card.bit & mask:
+                groups.setdefault(card.rank, []).append(card)
+        return groups
+    
     def pop_cards(self,cond = lambda x : True, max_cards = float("inf")):
         """ Pop a maximum of 'max_cards' from the hand, that return True when cond is applied to the card.
         Return the values as a list.
@@ -47,12 +156,23 @@ class MoskaHand:
         TODO: Make safer, for ex by checking whether the calling thread has the moskaGames lock.
         """
         out = []
-        for card in self.cards.copy():
-            if cond(card):
-                out.append(self.cards.pop(self.cards.index(card)))
-            if len(out) >= max_cards:
-                break
-        return out[0:min(max_cards,len(out))]
+        keep = []
+        for card in self.cards:
+            if len(out) < max_cards and cond(card):
+                out.append(card)
+            else:
+                keep.append(card)
+        # Modify the list in place, since it might be referenced elsewhere (for ex. in the games undo journal)
+        self.cards[:] = keep
+        return out
+    
+    def pop_mask(self, mask : int) -> List[Card]:
+        """ Pop the cards, whose bit is set in mask, from the hand. Return the popped cards. """
+        if not mask & self._cards.mask:
+            return []
+        out = [card for card in self._cards if card.bit & mask]
+        self._cards[:] = [card for card in self._cards if not card.bit & mask]
+        return out
     
     def __repr__(self) -> str:
         """What to show when printing self
@@ -75,7 +195,7 @@ class MoskaHand:
     
     def copy(self):
         """ Return a copy of the hand"""
-        return _MoskaHandCopy([card for card in self.cards],self.moskaGame)
+        return _MoskaHandCopy(self.cards,self.moskaGame)
     
     def __eq__(self,other):
         """ Check if the cards are the same, and if the moskaGame -instances are the same.
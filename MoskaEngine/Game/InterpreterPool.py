@@ -0,0 +1,155 @@
+from bisect import bisect_left
+import os
+import threading
+import numpy as np
+from typing import Any, Callable, Dict, Iterable, List, Tuple, Union
+from .NumpyModel import NumpyModel
+
+DEFAULT_MAX_BATCH_SIZE = 1024       # The largest bucket of an InterpreterPool by default
+
+def bucket_sizes(max_batch_size : int) -> List[int]:
+    """ Return the batch sizes of the buckets: the powers of two smaller than max_batch_size, and max_batch_size. """
+    if max_batch_size < 1:
+        raise ValueError(f"max_batch_size must be atleast 1. Given: {max_batch_size}")
+    sizes = []
+    size = 1
+    while size < max_batch_size:
+        sizes.append(size)
+        size *= 2
+    sizes.append(max_batch_size)
+    return sizes
+
+def tflite_interpreter_factory(path : str) -> Callable[[], Any]:
+    """ Return a function, that creates a new tflite interpreter of the model in 'path'.
+    The model file is read once, and the interpreters are created from its contents.
+    """
+    import tensorflow as tf
+    with open(path, "rb") as f:
+        model_content = f.read()
+    return lambda : tf.lite.Interpreter(model_content=model_content)
+
+
+class InterpreterPool:
+    """ A pool of tflite interpreters of one model, each allocated for a fixed batch size.
+
+    Resizing the input of an interpreter and allocating its tensors is expensive, so instead of resizing one interpreter
+    to the number of samples at every prediction, the pool has an interpreter for each bucket of batch sizes (see bucket_sizes).
+    The interpreters are resized, allocated and invoked once (pre-warmed) when the pool is created.
+    A prediction uses the smallest bucket that fits the samples, and the input is copied to a preallocated buffer of the bucket,
+    where the rest of the rows are zeros. The outputs of the padding rows are discarded.
+    Inputs with more than 'max_batch_size' samples are predicted in chunks of 'max_batch_size' samples.
+
+    Each bucket has a lock, so the pool can be shared by games and players running in different threads (see get_interpreter_pool),
+    and predictions using different buckets run at the same time.
+    """
+    def __init__(self, path : str, max_batch_size : int = DEFAULT_MAX_BATCH_SIZE, interpreter_factory : Callable[[], Any] = None):
+        """ Create and pre-warm the interpreters of the model in 'path'.
+
+        Args:
+            path (str): The path to the .tflite model.
+            max_batch_size (int, optional): The size of the largest bucket. Defaults to DEFAULT_MAX_BATCH_SIZE.
+            interpreter_factory (Callable, optional): A function returning a new interpreter of the model. Defaults to a tflite interpreter of 'path'.
+        """
+        if interpreter_factory is None:
+            interpreter_factory = tflite_interpreter_factory(path)
+        self.path = path
+        self.buckets = bucket_sizes(max_batch_size)
+        self.max_batch_size = max_batch_size
+        self.interpreters : Dict[int,Any] = {}          # The interpreter of each bucket size
+        self._inputs : Dict[int,np.ndarray] = {}        # The padded input buffer of each bucket size
+        self._nfilled : Dict[int,int] = {}              # The number of rows of the buffer, that are not zeros
+        self._locks : Dict[int,threading.Lock] = {}     # The lock of the interpreter and buffer of each bucket size
+        # The details of the model before resizing, like they are in the model file
+        interpreter = interpreter_factory()
+        self.input_details = interpreter.get_input_details()
+        self.output_details = interpreter.get_output_details()
+        self._input_index = self.input_details[0]["index"]
+        self._output_index = self.output_details[0]["index"]
+        sample_shape = tuple(self.input_details[0]["shape"][1:])
+        dtype = self.input_details[0]["dtype"]
+        for size in self.buckets:
+            if interpreter is None:
+                interpreter = interpreter_factory()
+            interpreter.resize_tensor_input(self._input_index, (size,) + sample_shape)
+            interpreter.allocate_tensors()
+            buffer = np.zeros((size,) + sample_shape, dtype=dtype)
+            interpreter.set_tensor(self._input_index, buffer)
+            interpreter.invoke()
+            self.interpreters[size] = interpreter
+            self._inputs[size] = buffer
+            self._nfilled[size] = 0
+            self._locks[size] = threading.Lock()
+            interpreter = None
+        return
+
+    def predict(self, X : np.ndarray) -> np.ndarray:
+        """ Return the output of the model for the samples in X.
+        If X has one dimension less than the models input (no channel dimension), a channel dimension is added.
+        """
+        if X.ndim != len(self.input_details[0]["shape"]):
+            X = np.expand_dims(X, axis=-1)
+        n = X.shape[0]
+        if n <= self.max_batch_size:
+            return self._predict_bucket(X)
+        chunk = self.max_batch_size
+        return np.concatenate([self._predict_bucket(X[i:i + chunk]) for i in range(0, n, chunk)])
+
+    def _predict_bucket(self, X : np.ndarray) -> np.ndarray:
+        """ Predict atmost max_batch_size samples with the interpreter of the smallest fitting bucket. """
+        n = X.shape[0]
+        size = self.buckets[bisect_left(self.buckets, n)]
+        with self._locks[size]:
+            buffer = self._inputs[size]
+            buffer[:n] = X
+            # Clear the rows left by a previous larger prediction
+            if self._nfilled[size] > n:
+                buffer[n:self._nfilled[size]] = 0
+            self._nfilled[size] = n
+            interpreter = self.interpreters[size]
+            interpreter.set_tensor(self._input_index, buffer)
+            interpreter.invoke()
+            return interpreter.get_tensor(self._output_index)[:n]
+
+
+# The process-wide registry of loaded models, keyed by (real path, modification time, max_batch_size)
+_POOLS : Dict[Tuple[str,float,int],Union[InterpreterPool,NumpyModel]] = {}
+_POOLS_LOCK = threading.Lock()
+_POOLS_PID = os.getpid()        # The process, that loaded the pools in the registry
+
+def get_interpreter_pool(path : str, max_batch_size : int = DEFAULT_MAX_BATCH_SIZE, interpreter_factory : Callable[[], Any] = None) -> Union[InterpreterPool,NumpyModel]:
+    """ Return the InterpreterPool of the model in 'path', that is shared by every game in this process.
+    A model exported to a '.npz' file is loaded as a NumpyModel, which is predicted without tensorflow.
+    The model is loaded only the first time it is requested, and again if the model file has been modified since.
+    A forked process doesn't use the pools loaded by its parent, but loads its own.
+    The 'interpreter_factory' is only used, if the model is loaded.
+    """
+    global _POOLS_PID
+    real_path = os.path.realpath(path)
+    key = (real_path, os.path.getmtime(real_path), max_batch_size)
+    with _POOLS_LOCK:
+        if _POOLS_PID != os.getpid():
+            _POOLS.clear()
+            _POOLS_PID = os.getpid()
+        pool = _POOLS.get(key)
+        if pool is None:
+            if real_path.endswith(".npz"):
+                pool = NumpyModel(real_path)
+            else:
+                pool = InterpreterPool(real_path, max_batch_size=max_batch_size, interpreter_factory=interpreter_factory)
+            # Forget the pools of older versions of the file
+            for old_key in [k for k in _POOLS if k[0] == real_path and k[1] != key[1]]:
+                del _POOLS[old_key]
+            _POOLS[key] = pool
+    return pool
+
+def preload_interpreter_pools(paths : Iterable[str], max_batch_size : int = DEFAULT_MAX_BATCH_SIZE) -> None:
+    """ Load the models in 'paths' to the registry of this process, for example in the initializer of a multiprocessing.Pool. """
+    for path in paths:
+        get_interpreter_pool(path, max_batch_size=max_batch_size)
+    return
+
+def clear_interpreter_pools() -> None:
+    """ Remove every model from the registry of this process. The games already using a pool keep it. """
+    with _POOLS_LOCK:
+        _POOLS.clear()
+    return
@@ -0,0 +1,209 @@
+from __future__ import annotations
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, List
+from .Deck import Card, UNKNOWN_CARD, KILL_MASKS, cards_to_mask, mask_popcount
+from .GameState import FullGameState
+if TYPE_CHECKING:
+    from ..Player.AbstractPlayer import AbstractPlayer
+
+SIMULATED_MOVES = ("InitialPlay", "PlayToOther", "PlayToSelf", "PlayToSelfFromDeck", "PlayFallFromHand", "EndTurn", "Skip")
+
+def apply_move(state : FullGameState, move : str, args : List, ignore_errors : bool = False) -> FullGameState:
+    """ Return the state after playing 'move' with 'args' in 'state', without modifying 'state' or touching the game instance.
+    This implements the rules of the moves in Turns.py, and the changes the CardMonitor and MoskaGame._make_move make after a move,
+    so the returned state equals the state MoskaGame._make_mock_move would return from the same position.
+
+    The args are the same as given to MoskaGame._make_move, i.e. the first argument is the player making the move.
+    The players are only used for their pid.
+    'PlayFallFromDeck' can not be simulated, since the card lifted from the deck is not known.
+
+    The returned state shares the values, that were not changed by the move, with 'state'. The values are immutable, so this is safe.
+
+    Args:
+        state (FullGameState): The state before the move
+        move (str): The move identifier, one of SIMULATED_MOVES
+        args (List): The arguments of the move
+        ignore_errors (bool, optional): Whether to ignore removing a card, that is not in the players known cards. Same as in CardMonitor. Defaults to False.
+
+    Raises:
+        NameError: If the move can not be simulated
+        AssertionError: If the move is not valid
+
+    Returns:
+        FullGameState: The state after the move
+    """
+    if move not in SIMULATED_MOVES:
+        raise NameError(f"Attempted to simulate move '{move}'. Only moves {SIMULATED_MOVES} can be simulated.")
+    new = state.copy()
+    player = args[0]
+    if move in ("InitialPlay", "PlayToOther", "PlayToSelf", "PlayToSelfFromDeck"):
+        _play_to_player(new, move, player, args[1], args[2], ignore_errors)
+    elif move == "PlayFallFromHand":
+        _play_fall_from_hand(new, player, args[1], ignore_errors)
+    elif move == "EndTurn":
+        _end_turn(new, player, args[1] if len(args) > 1 else [])
+    _update_after_move(new, player.pid, ignore_errors)
+    # Every other player still in the game has to play again, unless the move was Skip
+    if move != "Skip":
+        new.players_ready = tuple((False if pid != player.pid and in_game else ready for pid, (ready, in_game) in enumerate(zip(new.players_ready, new.players_in_game))))
+    return new
+
+def add_cards_to_hand(state : FullGameState, pid : int, cards : List[Card], ignore_errors : bool = False) -> FullGameState:
+    """ Return a copy of state, where 'cards' are added to the hand of player 'pid', and the player is publicly known to have more cards.
+    This is used to simulate playing a card lifted from the deck, as if it was played from the hand.
+    """
+    new = state.copy()
+    new.set_player_cards(pid, new.full_player_cards[pid] + tuple(cards))
+    _update_unknown(new, pid, ignore_errors)
+    return new
+
+def _draw(state : FullGameState, pid : int, n : int) -> None:
+    """ Draw n cards (or the rest of the deck) from the top of the deck to the players hand. """
+    if n <= 0 or not state.deck:
+        return
+    drawn = state.deck[:n]
+    state.deck = state.deck[n:]
+    state.set_player_cards(pid, state.full_player_cards[pid] + drawn)
+    return
+
+def _play_to_player(state : FullGameState, move : str, player : AbstractPlayer, target : AbstractPlayer, cards : List[Card], ignore_errors : bool) -> None:
+    """ Play cards from the players hand to the table. Same as Turns._PlayToPlayer.play """
+    hand = state.full_player_cards[player.pid]
+    fits = len(state.full_player_cards[target.pid]) - len(state.cards_to_fall) >= len(cards)
+    assert all((card in hand for card in cards)), "Some of the played cards are not available"
+    if move == "InitialPlay":
+        assert len(state.cards_to_fall) + len(state.fell_cards) == 0, "The game is already initiated"
+        assert len(cards) == 1 or all((count >= 2 for count in Counter((c.rank for c in cards)).values())), "Selected values could not be played. Only pairs or greater, cards of same values can be played."
+        assert fits, "Attempted to play too many cards."
+        assert target.pid == state.target_pid, "Target is not active"
+    elif move == "PlayToSelfFromDeck":
+        assert player.pid == target.pid, "Player is not playing to self"
+        assert target.pid == state.target_pid, "The specified target is not active"
+    else:
+        if player.pid != target.pid:
+            assert fits, "Attempted to play too many cards."
+        else:
+            assert len(state.deck) > 0, "There is no deck left, and playing to self is not possible."
+        playable_values = set((c.rank for c in state.cards_to_fall + state.fell_cards))
+        assert all((card.rank in playable_values for card in cards)), "Some of the cards you tried to play, are not playable, because they haven't yet been played by another player."
+    state.set_player_cards(player.pid, [card for card in hand if card not in cards])
+    state.cards_to_fall = state.cards_to_fall + tuple(cards)
+    if player.pid != target.pid:
+        _draw(state, player.pid, 6 - len(state.full_player_cards[player.pid]))
+    # The CardMonitor doesn't update the known cards when playing from the deck
+    if move != "PlayToSelfFromDeck":
+        _remove_known(state, player.pid, cards, ignore_errors)
+    return
+
+def _play_fall_from_hand(state : FullGameState, player : AbstractPlayer, play_fall : Dict[Card,Card], ignore_errors : bool) -> None:
+    """ Fall cards on the table with cards from the players hand. Same as Turns.PlayFallFromHand.play """
+    assert all((KILL_MASKS[state.trump][pc.id] & fc.bit for pc, fc in play_fall.items())), "Some of the played cards were not matched to a correct card to fall."
+    assert state.target_pid == player.pid, "The player does not have the turn."
+    hand = state.full_player_cards[player.pid]
+    assert all((card in hand for card in play_fall.keys())), "Some of the played cards are not available"
+    hand = list(hand)
+    cards_to_fall = list(state.cards_to_fall)
+    fell_cards = list(state.fell_cards)
+    for pc, fc in play_fall.items():
+        cards_to_fall.pop(cards_to_fall.index(fc))
+        fell_cards.append(fc)
+        hand.remove(pc)
+        fell_cards.append(pc)
+    state.set_player_cards(player.pid, hand)
+    state.cards_to_fall = tuple(cards_to_fall)
+    state.fell_cards = tuple(fell_cards)
+    _remove_known(state, player.pid, list(play_fall.keys()), ignore_errors)
+    return
+
+def _end_turn(state : FullGameState, player : AbstractPlayer, pick_cards : List[Card]) -> None:
+    """ Pick the cards, fill the hand from the deck, move the turn and clear the table. Same as Turns.EndTurn.play """
+    assert state.cards_to_fall or state.fell_cards, "There are no played cards, and hence the turn cannot be ended yet."
+    picks_cards_to_fall = set(pick_cards) == set(state.cards_to_fall)
+    if not pick_cards:
+        assert not state.cards_to_fall, "There are cards on the table, and they must fall or be lifted."
+    else:
+        assert picks_cards_to_fall or set(pick_cards) == set(state.cards_to_fall + state.fell_cards), f"Either pick all cards that have not been fallen, or pick all cards from table"
+        assert state.target_pid == player.pid, "It is not this players turn to lift the cards"
+    state.set_player_cards(player.pid, state.full_player_cards[player.pid] + tuple(pick_cards))
+    _draw(state, player.pid, 6 - len(state.full_player_cards[player.pid]))
+    # No card is kopled after the turn
+    state.kopled_card = None
+    state.tc_index = _next_in_game(state, state.tc_index)
+    if len(pick_cards) > 0 or not state.players_in_game[player.pid]:
+        state.tc_index = _next_in_game(state, state.tc_index)
+    state.target_pid = state.tc_index % len(state.players_in_game)
+    # If only the cards to fall were picked, the fell cards are removed from the game
+    if picks_cards_to_fall:
+        _remove_from_game(state, state.fell_cards)
+    state.cards_to_fall = ()
+    state.fell_cards = ()
+    _add_known(state, player.pid, pick_cards)
+    return
+
+def _next_in_game(state : FullGameState, ptr : int) -> int:
+    """ Return the turn cycle pointer of the next player still in the game. Same as TurnCycle.get_next_active """
+    nplayers = len(state.players_in_game)
+    for _ in range(nplayers):
+        ptr += 1
+        if state.players_in_game[ptr % nplayers]:
+            return ptr
+    return ptr + 1
+
+def _remove_from_game(state : FullGameState, cards : List[Card]) -> None:
+    """ Remove cards from the cards in the game. Same as CardMonitor.remove_from_game """
+    state.in_game_mask &= ~cards_to_mask(cards)
+    return
+
+def _add_known(state : FullGameState, pid : int, cards : List[Card]) -> None:
+    """ Add cards to the players known cards. Same as CardMonitor.update_known with add=True """
+    nunknown = state.unknown_counts[pid] + sum((1 for card in cards if card is UNKNOWN_CARD))
+    state.set_known_cards(pid, state.known_masks[pid] | cards_to_mask(cards), nunknown)
+    return
+
+def _remove_known(state : FullGameState, pid : int, cards : List[Card], ignore_errors : bool) -> None:
+    """ Remove played cards from the players known cards. If a card wasn't known, an unknown card is removed instead.
+    Same as CardMonitor.update_known with add=False
+    """
+    known_mask = state.known_masks[pid]
+    nunknown = state.unknown_counts[pid]
+    for card in cards:
+        if known_mask & card.bit:
+            known_mask &= ~card.bit
+        elif nunknown > 0:
+            nunknown -= 1
+        elif not ignore_errors:
+            raise ValueError(f"Tried to remove {card} from player {pid}, but it was not in the players hand")
+    state.set_known_cards(pid, known_mask, nunknown)
+    return
+
+def _update_unknown(state : FullGameState, pid : int, ignore_errors : bool) -> None:
+    """ Add or remove unknown cards, so the number of known cards matches the players hand. Same as CardMonitor.update_unknown """
+    actual = state.full_player_cards[pid]
+    if state.trump_card is not None and len(state.deck) == 0 and state.trump_card in actual and not state.known_masks[pid] & state.trump_card.bit:
+        _add_known(state, pid, [state.trump_card])
+    missing = len(actual) - mask_popcount(state.known_masks[pid]) - state.unknown_counts[pid]
+    if missing > 0:
+        _add_known(state, pid, [UNKNOWN_CARD]*missing)
+    elif missing < 0:
+        _remove_known(state, pid, [UNKNOWN_CARD]*(-missing), ignore_errors)
+    return
+
+def _hidden_mask(state : FullGameState, pid : int) -> int:
+    """ Cards still in the game, whose location is not known to the player. Same as CardMonitor.get_hidden_mask """
+    known_mask = cards_to_mask(state.full_player_cards[pid] + state.cards_to_fall + state.fell_cards)
+    for other_pid, mask in enumerate(state.known_masks):
+        if other_pid == pid:
+            continue
+        known_mask |= mask
+    return state.in_game_mask & ~known_mask
+
+def _update_after_move(state : FullGameState, pid : int, ignore_errors : bool) -> None:
+    """ Update the publicly known cards after a move. Same as the end of CardMonitor.update_from_move """
+    pl_left = [i for i, in_game in enumerate(state.players_in_game) if in_game]
+    # With two players left and no deck, the other players cards are the cards hidden from the player
+    if (len(pl_left) == 2 and len(state.deck) == 0 and state.players_in_game[pid]
+        and (state.unknown_counts[pl_left[0]] or state.unknown_counts[pl_left[1]])):
+        other_pid = pl_left[0] if pl_left[0] != pid else pl_left[1]
+        state.set_known_cards(other_pid, state.known_masks[other_pid] | _hidden_mask(state, pid), 0)
+    _update_unknown(state, pid, ignore_errors)
+    return
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+import sys
+import numpy as np
+from typing import Callable, Dict, List, Tuple
+
+"""
+A NumPy backend for the models, that are plain stacks of BatchNormalization and Dense layers (like get_nn_model in Models/*/train_model.py).
+A trained keras model is exported to a .npz file with export_keras_model (or by running this file), and a model path ending with '.npz'
+is then predicted with a NumpyModel instead of a tflite interpreter. This doesn't require tensorflow, and works with the -OO flag.
+"""
+
+def _relu(X : np.ndarray) -> None:
+    np.maximum(X, 0, out=X)
+
+def _sigmoid(X : np.ndarray) -> None:
+    # exp(-x) overflows to inf for very negative x, and then the output is correctly 0
+    with np.errstate(over="ignore"):
+        np.negative(X, out=X)
+        np.exp(X, out=X)
+    X += 1
+    np.reciprocal(X, out=X)
+
+def _tanh(X : np.ndarray) -> None:
+    np.tanh(X, out=X)
+
+def _linear(X : np.ndarray) -> None:
+    return
+
+# The supported activations by their keras names. Each activation modifies the array in place
+ACTIVATIONS : Dict[str,Callable[[np.ndarray],None]] = {"relu" : _relu, "sigmoid" : _sigmoid, "tanh" : _tanh, "linear" : _linear}
+# Layers, that do nothing when predicting a flat input
+_SKIPPED_LAYERS = ("InputLayer", "Dropout", "Flatten")
+
+
+def export_keras_model(model, path : str) -> None:
+    """ Save the weights of a keras model with a flat input, and only BatchNormalization, Dense, Dropout and Flatten layers, to a .npz file.
+    The file contains the kind of each layer ('batchnorm' or 'dense'), the activation of each layer, the input size and
+    the arrays of each layer: the batch normalization as a scale and a shift ('<i>_scale', '<i>_shift'),
+    and the dense layers as a kernel and a bias ('<i>_kernel', '<i>_bias').
+
+    Raises:
+        ValueError: If the model has other layers or activations, or if the input is not flat.
+    """
+    input_shape = model.input_shape
+    if len(input_shape) != 2:
+        raise ValueError(f"Only models with a flat input can be exported. The input shape is {input_shape}")
+    kinds = []
+    activations = []
+    arrays = {}
+    for layer in model.layers:
+        name = type(layer).__name__
+        if name in _SKIPPED_LAYERS:
+            continue
+        i = len(kinds)
+        weights = layer.get_weights()
+        if name == "BatchNormalization":
+            gamma = weights.pop(0) if layer.scale else np.ones_like(weights[-1])
+            beta = weights.pop(0) if layer.center else np.zeros_like(weights[-1])
+            mean, variance = weights
+            scale = gamma / np.sqrt(variance + layer.epsilon)
+            arrays[f"{i}_scale"] = scale.astype(np.float32)
+            arrays[f"{i}_shift"] = (beta - mean * scale).astype(np.float32)
+            kinds.append("batchnorm")
+            activations.append("linear")
+        elif name == "Dense":
+            activation = layer.activation.__name__
+            if activation not in ACTIVATIONS:
+                raise ValueError(f"Activation {activation} of layer {layer.name} is not supported. Supported activations: {list(ACTIVATIONS)}")
+            kernel = weights[0]
+            bias = weights[1] if layer.use_bias else np.zeros(kernel.shape[1])
+            arrays[f"{i}_kernel"] = kernel.astype(np.float32)
+            arrays[f"{i}_bias"] = bias.astype(np.float32)
+            kinds.append("dense")
+            activations.append(activation)
+        else:
+            raise ValueError(f"Layer {layer.name} of type {name} is not supported by the NumPy backend.")
+    np.savez(path, kinds=np.array(kinds), activations=np.array(activations), input_size=np.array(input_shape[1]), **arrays)
+    return
+
+
+class NumpyModel:
+    """ A model exported with export_keras_model, predicted with NumPy.
+
+    When the model is loaded, each batch normalization followed by a dense layer is folded into the kernel and bias of the dense layer,
+    so a prediction is one matrix multiplication and an activation per dense layer.
+    The model has the same 'predict', 'input_details' and 'output_details' as an InterpreterPool, so a game can use either one.
+    The model has no state, so it can be shared by games and players running in different threads.
+    """
+    def __init__(self, path : str):
+        self.path = path
+        self.layers : List[Tuple[str,np.ndarray,np.ndarray,Callable]] = []     # (kind, kernel or scale, bias or shift, activation)
+        with np.load(path) as data:
+            kinds = [str(kind) for kind in data["kinds"]]
+            activations = [str(act) for act in data["activations"]]
+            self.input_size = int(data["input_size"])
+            pending = None      # The scale and shift of a batch normalization, that is not yet folded
+            for i, (kind, activation) in enumerate(zip(kinds, activations)):
+                if kind == "batchnorm":
+                    if pending is not None:
+                        self.layers.append(("affine",) + pending + (_linear,))
+                    pending = (data[f"{i}_scale"], data[f"{i}_shift"])
+                elif kind == "dense":
+                    kernel, bias = data[f"{i}_kernel"], data[f"{i}_bias"]
+                    if pending is not None:
+                        scale, shift = pending
+                        bias = bias + shift @ kernel
+                        kernel = scale[:, np.newaxis] * kernel
+                        pending = None
+                    self.layers.append(("dense", np.ascontiguousarray(kernel, dtype=np.float32), bias.astype(np.float32), ACTIVATIONS[activation]))
+                else:
+                    raise ValueError(f"Unknown layer kind {kind} in {path}")
+            if pending is not None:
+                self.layers.append(("affine",) + pending + (_linear,))
+        output_size = self.layers[-1][2].shape[0] if self.layers else self.input_size
+        self.input_details = [{"name" : "input", "index" : 0, "shape" : np.array([1, self.input_size]), "dtype" : np.float32}]
+        self.output_details = [{"name" : "output", "index" : 1, "shape" : np.array([1, output_size]), "dtype" : np.float32}]
+
+    def predict(self, X : np.ndarray) -> np.ndarray:
+        """ Return the output of the model for the samples in X, with shape (nsamples, output size).
+        A channel dimension in X is flattened.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        X = X.reshape(X.shape[0], -1)
+        for kind, a, b, activation in self.layers:
+            if kind == "dense":
+                X = X @ a
+                X += b
+            else:
+                X = X * a + b
+            activation(X)
+        return X
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python3 -m MoskaEngine.Game.NumpyModel <keras model path> <output .npz path>")
+        sys.exit(1)
+    import tensorflow as tf
+    export_keras_model(tf.keras.models.load_model(sys.argv[1], compile=False), sys.argv[2])
@@ -0,0 +1,81 @@
+from __future__ import annotations
+import random
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Dict, List
+if TYPE_CHECKING:
+    from ..Player.AbstractPlayer import AbstractPlayer
+
+
+class AbstractTurnPolicy(ABC):
+    """ A turn policy decides which player gets to act next in a MoskaGame.
+
+    The game asks the policy for the next player every time the games lock is released.
+    The candidates are the players who are still playing, and 'prev' is the player who acted last (or None at the start of the game).
+    The chosen player is the only one who can acquire the games lock next, so the hand-off doesn't need any sleeping or polling.
+    """
+    @abstractmethod
+    def next_player(self, candidates : List[AbstractPlayer], prev : AbstractPlayer = None) -> AbstractPlayer:
+        """ Return the player from candidates, who should act next.
+
+        Args:
+            candidates (List[AbstractPlayer]): The players who can act. Not empty, and sorted by pid.
+            prev (AbstractPlayer, optional): The player who acted last. Defaults to None.
+
+        Returns:
+            AbstractPlayer: The player who acts next
+        """
+        pass
+
+
+class RandomTurnPolicy(AbstractTurnPolicy):
+    """ Choose a random player from the candidates, other than the previous player (unless it is the only candidate).
+    This is how the turns were given out when the players threads raced for the lock.
+    """
+    def __init__(self, rng : random.Random = None) -> None:
+        # The random module itself has the same interface as random.Random
+        self.rng = rng if rng is not None else random
+
+    def next_player(self, candidates : List[AbstractPlayer], prev : AbstractPlayer = None) -> AbstractPlayer:
+        others = [pl for pl in candidates if pl is not prev]
+        if not others:
+            return candidates[0]
+        return self.rng.choice(others)
+
+
+class SeededRandomTurnPolicy(RandomTurnPolicy):
+    """ Like RandomTurnPolicy, but with its own random number generator, so the turn order of a game is reproducible from the seed.
+    A named shorthand for RandomTurnPolicy(rng=random.Random(seed)), which get_turn_policy returns for 'seeded-random', or for 'random' with a seed.
+    """
+    def __init__(self, seed : int = None) -> None:
+        super().__init__(rng = random.Random(seed))
+
+
+class RoundRobinTurnPolicy(AbstractTurnPolicy):
+    """ Give the turn to the next candidate (by pid) after the previous player.
+    """
+    def next_player(self, candidates : List[AbstractPlayer], prev : AbstractPlayer = None) -> AbstractPlayer:
+        if prev is None:
+            return candidates[0]
+        for pl in candidates:
+            if pl.pid > prev.pid:
+                return pl
+        return candidates[0]
+
+
+TURN_POLICIES : Dict[str,type] = {
+    "random" : RandomTurnPolicy,
+    "seeded-random" : SeededRandomTurnPolicy,
+    "round-robin" : RoundRobinTurnPolicy,
+}
+
+def get_turn_policy(policy : (str or AbstractTurnPolicy), seed : int = None) -> AbstractTurnPolicy:
+    """ Return a turn policy instance from either a policy name (a key in TURN_POLICIES) or a policy instance.
+    If a seed is given, 'random' gets its own generator seeded with it, like 'seeded-random'. Otherwise 'random' uses the random module.
+    """
+    if isinstance(policy, AbstractTurnPolicy):
+        return policy
+    if policy not in TURN_POLICIES:
+        raise NameError(f"Turn policy '{policy}' not recognized. Available policies: {list(TURN_POLICIES.keys())}")
+    if policy == "seeded-random" or (policy == "random" and seed is not None):
+        return SeededRandomTurnPolicy(seed = seed)
+    return TURN_POLICIES[policy]()
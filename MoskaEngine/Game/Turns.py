@@ -1,14 +1,14 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
 from typing import Callable, TYPE_CHECKING, Dict, List
-from collections import Counter
-from .Deck import Card
+from .Deck import Card, KILL_MASKS, cards_to_mask, mask_ranks, rank_count_at_least, rank_spread
 from ..Player.AbstractPlayer import AbstractPlayer
 if TYPE_CHECKING:
     from .Game import MoskaGame
 from . import utils
 
 class Turn(ABC):
+    moskaGame : MoskaGame = None
     @abstractmethod
     def __call__(self, *args, **kwargs):
         pass
@@ -16,6 +16,26 @@ class Turn(ABC):
     @abstractmethod
     def play(self):
         pass
+    
+    def _save_contents(self, *containers) -> None:
+        """ If the move is a mock move, record the contents of the containers (lists, deques, dicts) to the games undo journal,
+        before they are modified. This must be called before modifying the game.
+        """
+        journal = self.moskaGame.undo_journal
+        if journal is None:
+            return
+        for container in containers:
+            journal.save_contents(container)
+        return
+    
+    def _save_attr(self, obj, name : str) -> None:
+        """ If the move is a mock move, record the value of an attribute to the games undo journal, before it is set.
+        """
+        journal = self.moskaGame.undo_journal
+        if journal is None:
+            return
+        journal.save_attr(obj, name)
+        return
 
 
 class _PlayToPlayer(Turn):
@@ -38,7 +58,7 @@ class _PlayToPlayer(Turn):
         """ Check that the cards are playable.
         Return whether the player has the play_cards in hand.
         """
-        return all([card in self.player.hand.cards for card in self.cards])
+        return not cards_to_mask(self.cards) & ~self.player.hand.mask
     
     def check_fits(self) -> bool:
         """ Check that the cards fit in the table.
@@ -54,7 +74,9 @@ class _PlayToPlayer(Turn):
         """Play the play_cards to the table;
         Modify the players hand, add cards to the table, and draw cards from the deck.
         """
-        self.player.hand.pop_cards(lambda x : x in self.cards) # Remove the played cards from the players hand
+        self._save_contents(self.player.hand.cards, self.moskaGame.cards_to_fall)
+        self._save_attr(self.moskaGame.deck, "top")
+        self.player.hand.pop_mask(cards_to_mask(self.cards))   # Remove the played cards from the players hand
         self.moskaGame.add_cards_to_fall(self.cards)           # Add the cards to the cards_to_fall -list
         self.moskaGame.glog.info(f"{self.player.name} played {self.cards} to {self.moskaGame.get_target_player().name}")
         if self.player is not self.target:
@@ -87,8 +109,9 @@ class InitialPlay(_PlayToPlayer):
         self.play()
         
     def check_single_or_multiple(self):
-        c = Counter([c.rank for c in self.cards])
-        return len(self.cards) == 1 or all((count >= 2 for count in c.values()))
+        """ Check that the play is a single card, or each rank in the play has atleast 2 cards """
+        mask = cards_to_mask(self.cards)
+        return len(self.cards) == 1 or not mask & ~rank_count_at_least(mask, 2)
         
         
 class PlayToOther(_PlayToPlayer):
@@ -117,14 +140,17 @@ class PlayToOther(_PlayToPlayer):
         """ Returns True if there is still deck left. Else False """
         return len(self.player.moskaGame.deck) > 0
     
+    def _table_mask(self) -> int:
+        """ Return the cards on the table as a bitmask """
+        return cards_to_mask(self.moskaGame.cards_to_fall) | cards_to_mask(self.moskaGame.fell_cards)
+    
     def _playable_values(self):
         """ Return a set of values, that can be played to target"""
-        return set([c.rank for c in self.moskaGame.cards_to_fall + self.moskaGame.fell_cards])
+        return mask_ranks(self._table_mask())
     
     def check_in_table(self):
         """ Check that the cards have already been played by either the player or an opponent"""
-        playable_values = self._playable_values()
-        return all((card.rank in playable_values for card in self.cards))
+        return not cards_to_mask(self.cards) & ~rank_spread(self._table_mask())
 
 class PlayToSelfFromDeck(_PlayToPlayer):
     def __call__(self, player : AbstractPlayer, target : AbstractPlayer, cards : List[Card]):
@@ -165,13 +191,14 @@ class PlayFallFromHand(Turn):
         
     def check_cards_fall(self):
         """Returns whether all the pairs are correctly played"""
-        return all([utils.check_can_kill_card(pc,fc,self.moskaGame.trump) for pc,fc in self.play_fall.items()])
+        kill_masks = KILL_MASKS[self.moskaGame.trump]
+        return all((kill_masks[pc.id] & fc.bit for pc,fc in self.play_fall.items()))
     
     def check_cards_available(self) -> bool:
         """ Check that the cards are playable.
         Return whether the player has the play_cards in hand.
         """
-        return all([card in self.player.hand.cards for card in self.play_fall.keys()])
+        return not cards_to_mask(self.play_fall.keys()) & ~self.player.hand.mask
     
     def check_player_has_turn(self):
         return self.moskaGame.get_target_player() is self.player
@@ -181,11 +208,12 @@ class PlayFallFromHand(Turn):
         Remove cards to fall from table and add them to fell_cards.
         Remove the played cards from hand.
         """
+        self._save_contents(self.player.hand.cards, self.moskaGame.cards_to_fall, self.moskaGame.fell_cards)
         for pc,fc in self.play_fall.items():
             self.moskaGame.glog.info(f"{self.player.name} falling {pc}:{fc}")
             self.moskaGame.cards_to_fall.pop(self.moskaGame.cards_to_fall.index(fc))        # Remove from cards_to_fall
             self.moskaGame.fell_cards.append(fc)                                            # Add to fell cards
-            self.player.hand.pop_cards(cond = lambda x : x == pc)                           # Remove card from hand
+            self.player.hand.pop_mask(pc.bit)                                               # Remove card from hand
             self.moskaGame.fell_cards.append(pc)                                            # Add card to fell cards
         
             
@@ -219,12 +247,14 @@ class PlayFallFromDeck(Turn):
         return len(self.moskaGame.deck) > 0
     
     def check_not_already_kopled(self):
-        return not any((c.kopled for c in self.moskaGame.cards_to_fall))
+        return self.moskaGame.kopled_card not in self.moskaGame.cards_to_fall
     
     def play(self):
         """ Pop a card from deck, if the card can fall a card on the table, use fall_method to select the card.
         If the card can't fall any card, add it to table.
         """
+        self._save_contents(self.moskaGame.cards_to_fall, self.moskaGame.fell_cards)
+        self._save_attr(self.moskaGame.deck, "top")
         self.card = self.moskaGame.deck.pop_cards(1)[0]
         self.moskaGame.glog.info(f"{self.player.name} kopled {self.card}")
         if self.check_can_fall():
@@ -233,8 +263,9 @@ class PlayFallFromDeck(Turn):
             # If an incorrect card is selected to fall, then a random card is picked.
             if not self.check_can_fall(in_=[play_fall[1]]):
                 self.player.plog.error(f"The card {self.card} can not fall {play_fall[1]}. Falling a random card.")
+                kill_mask = KILL_MASKS[self.moskaGame.trump][self.card.id]
                 for card in self.moskaGame.cards_to_fall:
-                    if utils.check_can_kill_card(self.card, card, self.moskaGame.trump):
+                    if kill_mask & card.bit:
                         play_fall = (self.card,card)
                         break
             self.player.plog.info(f"Playing kopled card {play_fall[0]} to {play_fall[1]}")
@@ -243,7 +274,8 @@ class PlayFallFromDeck(Turn):
             self.moskaGame.fell_cards.append(play_fall[1])
             self.moskaGame.fell_cards.append(play_fall[0])
         else:
-            self.card.kopled = True
+            self._save_attr(self.moskaGame, "kopled_card")
+            self.moskaGame.kopled_card = self.card
             self.player.plog.debug(f"Adding {self.card} to cards_to_fall")
             self.moskaGame.glog.info(f"Adding {self.card} to cards_to_fall")
             self.moskaGame.add_cards_to_fall([self.card])
@@ -251,7 +283,7 @@ class PlayFallFromDeck(Turn):
     def check_can_fall(self,in_ = None):
         """ Return if the card can fall a card on the table """
         in_ = self.moskaGame.cards_to_fall if not in_ else in_
-        return any([utils.check_can_kill_card(self.card,fc,self.moskaGame.trump) for fc in in_])
+        return bool(KILL_MASKS[self.moskaGame.trump][self.card.id] & cards_to_mask(in_))
 
 class EndTurn(Turn):
     """ Class representing ending a turn. """
@@ -310,13 +342,13 @@ class EndTurn(Turn):
         """ Check if every pick_card equals cards_to_fall"""
         #return all([card in self.moskaGame.cards_to_fall for card in self.pick_cards])
         #return all([picked == card for picked,card in zip(self.pick_cards,self.moskaGame.cards_to_fall)])
-        return set(self.pick_cards) == set(self.moskaGame.cards_to_fall)
+        return cards_to_mask(self.pick_cards) == cards_to_mask(self.moskaGame.cards_to_fall)
     
     def check_pick_all_cards(self):
         """ Check if every pick_card is in either cards_to_fall or in fell_cards and not every card is in cards_to_fall"""
         #return all([card in self.moskaGame.cards_to_fall + self.moskaGame.fell_cards for card in self.pick_cards]) and not self.check_pick_cards_to_fall()
         #return all([picked == card for picked,card in zip(self.pick_cards,self.moskaGame.cards_to_fall + self.moskaGame.fell_cards)])
-        return set(self.pick_cards) == set(self.moskaGame.cards_to_fall + self.moskaGame.fell_cards)
+        return cards_to_mask(self.pick_cards) == cards_to_mask(self.moskaGame.cards_to_fall) | cards_to_mask(self.moskaGame.fell_cards)
     
     def check_has_played_cards(self):
         """ Check if there are cards that are not fallen or that are fallen"""
@@ -326,17 +358,20 @@ class EndTurn(Turn):
         """ End the turn by picking selected cards, drawing from the deck to fill hand,
         Turn the TurnCycle instance once if no cards picked, twice else
         """
+        self._save_contents(self.player.hand.cards, self.moskaGame.cards_to_fall, self.moskaGame.fell_cards)
+        self._save_attr(self.moskaGame.deck, "top")
+        self._save_attr(self.moskaGame.turnCycle, "ptr")
         self.player.hand.cards += self.pick_cards
         self.player.hand.draw(6 - len(self.player.hand))
-        for card in self.player.hand.cards:
-            # Mark each card as not kopled
-            card.kopled = False
-        self.moskaGame.turnCycle.get_next_condition(cond = lambda x : x.rank is None)
+        # No card is kopled after the turn
+        self._save_attr(self.moskaGame, "kopled_card")
+        self.moskaGame.kopled_card = None
+        self.moskaGame.turnCycle.get_next_active()
         self.moskaGame.glog.info(f"{self.player.name} ending turn.")
         self.player.plog.info(f"Lifted cards {self.pick_cards}")
         self.moskaGame.glog.info(f"{self.player.name} lifted {self.pick_cards}")
         if len(self.pick_cards) > 0 or self.check_finished():
-            self.moskaGame.turnCycle.get_next_condition(cond = lambda x : x.rank is None)
+            self.moskaGame.turnCycle.get_next_active()
         self.clear_table()
         
 class Skip(Turn):
@@ -0,0 +1,61 @@
+from collections import deque
+from typing import Any, Dict, List, Tuple
+
+
+class UndoJournal:
+    """ A log of the mutations done to a game during a mock move, so that the game can be rolled back to the state before the move.
+
+    This replaces taking a deep copy of the whole game before a mock move and restoring it afterwards.
+    The Turn classes (and the CardMonitor) record what they are about to modify, if the game has an active journal (MoskaGame.undo_journal):
+    - save_contents(container) saves the contents of a list, deque or dict, which is then restored in place.
+    - save_attr(obj, name) saves the value of an attribute, which is then set back.
+
+    Only the first save of a container is kept, since that is the state before the move.
+    rollback() undoes the saved changes in reverse order.
+    """
+    def __init__(self) -> None:
+        self._entries : List[Tuple] = []
+        self._saved_containers : Dict[int,Any] = {}
+
+    def save_contents(self, container) -> None:
+        """ Save the contents of a mutable container (list, deque or dict), before it is modified.
+        """
+        # The journal holds a reference to the container, so its id can not be reused by another object before rollback
+        if id(container) in self._saved_containers:
+            return
+        self._saved_containers[id(container)] = container
+        if isinstance(container, dict):
+            self._entries.append((container, container.copy()))
+        else:
+            self._entries.append((container, list(container)))
+        return
+
+    def save_attr(self, obj, name : str) -> None:
+        """ Save the value of the attribute 'name' of obj, before it is set.
+        """
+        self._entries.append((obj, name, getattr(obj, name)))
+        return
+
+    def rollback(self) -> None:
+        """ Undo all recorded changes in reverse order, and clear the journal.
+        """
+        for entry in reversed(self._entries):
+            if len(entry) == 3:
+                obj, name, value = entry
+                setattr(obj, name, value)
+                continue
+            container, contents = entry
+            if isinstance(container, dict):
+                container.clear()
+                container.update(contents)
+            elif isinstance(container, deque):
+                container.clear()
+                container.extend(contents)
+            else:
+                container[:] = contents
+        self._entries.clear()
+        self._saved_containers.clear()
+        return
+
+    def __len__(self) -> int:
+        return len(self._entries)
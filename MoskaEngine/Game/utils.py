@@ -1,4 +1,6 @@
 from __future__ import annotations
+import hashlib
+import logging
 import os
 from typing import Any, Callable, Iterable, List, TYPE_CHECKING, Sequence
 if TYPE_CHECKING:
@@ -9,6 +11,18 @@ CARD_SUITS = ("C","D","H","S")
 CARD_SUIT_SYMBOLS = {"S":'♠', "D":'♦',"H": '♥',"C": '♣',"X":"X"}    #Conversion table
 MAIN_DECK = None                                            # The main deck
 
+# A logger without handlers, that discards every message. Used as the logger of headless games and their players.
+HEADLESS_LOGGER = logging.getLogger("MoskaEngine.headless")
+HEADLESS_LOGGER.disabled = True
+HEADLESS_LOGGER.propagate = False
+
+def derive_seed(seed : int, *keys) -> int:
+    """ Derive the seed of an independent random stream, identified by 'keys', from a games random_seed.
+    The same seed and keys always give the same seed, also in different processes.
+    """
+    digest = hashlib.sha256(repr((seed,) + keys).encode()).digest()
+    return int.from_bytes(digest[:8], "little")
+
 def check_signature(sig : Sequence, inp : Sequence) -> bool:
     """ Check whether the input sequences types match the expected sequence.
     """
@@ -88,17 +102,19 @@ def raise_config_not_found_error(config_path : str) -> None:
     raise FileNotFoundError(f"Config file {config_path} not found. Use a custom file, or one of: {avail_configs_in_pkg}")
 
 def get_model_file(model_path : str) -> str:
-    """ Search for a configuration .json file.
-    First checks whether a 'config_path' exists, if you want to specify a custom path to a configuration file.
-    If no path is found, checks the Play/PlayerConfigs from Moska root.
+    """ Search for a model file.
+    First checks whether 'model_path' exists, if you want to specify a custom path to a model.
+    If no path is found, checks the Models/<model_path>/ folder from Moska root for a 'model.tflite',
+    or a 'model.npz' (exported with NumpyModel.export_keras_model) if there is no tflite model.
     """
     # First search from given path. If not found search MOSKA_ROOT_PATH
-    if not os.path.isfile(model_path):
-        model_path = f"/Models/{model_path}/model.tflite"
-        model_path = os.path.abspath(os.environ["MOSKA_ROOT_PATH"] + model_path)
-    if not os.path.isfile(model_path):
-        return ""
-    return model_path
+    if os.path.isfile(model_path):
+        return model_path
+    for file in ("model.tflite", "model.npz"):
+        path = os.path.abspath(os.environ["MOSKA_ROOT_PATH"] + f"/Models/{model_path}/{file}")
+        if os.path.isfile(path):
+            return path
+    return ""
 
 def raise_model_not_found_error(model_path : str) -> None:
     avail_models_in_pkg = os.listdir(os.environ["MOSKA_ROOT_PATH"] + "/Models/")
@@ -120,15 +136,70 @@ class TurnCycle:
     """
     population = []
     ptr = 0
-    def __init__(self,population : List[Any],ptr : int = 0):
+    def __init__(self,population : List[Any],ptr : int = 0, active : List[bool] = None):
         """Initialize the TurnCycle instance.
 
         Args:
             population (List): Initialize the list structure
             ptr (int, optional): The starting index. Defaults to 0.
+            active (List[bool], optional): Whether each element is active (for ex. a player still in the game). Defaults to all active.
         """
         self.population = population
         self.ptr = ptr
+        self.active = list(active) if active is not None else [True for _ in population]
+        self._set_active_ring()
+    
+    def _set_active_ring(self) -> None:
+        """ Precompute the ring of active elements: For each index, the offsets to the next active element (the element itself at offset len())
+        and to the previous active element (not the element itself). The offset is None, if there is no such element.
+        This is only recomputed when the population or the active elements change, so the lookups don't loop through the population.
+        """
+        n = len(self.population)
+        self._next_active_offsets = [next((j for j in range(1, n + 1) if self.active[(i + j) % n]), None) for i in range(n)]
+        self._prev_active_offsets = [next((j for j in range(1, n) if self.active[(i - j) % n]), None) for i in range(n)]
+        return
+    
+    def set_active(self, val : Any, active : bool) -> None:
+        """ Set whether the element 'val' (compared by identity) is active, and update the ring of active elements.
+        """
+        changed = False
+        for i, el in enumerate(self.population):
+            if el is val and self.active[i] != active:
+                self.active[i] = active
+                changed = True
+        if changed:
+            self._set_active_ring()
+        return
+    
+    def get_next_active(self, incr_ptr : bool = True) -> Any:
+        """ Same as get_next_condition with a condition, that is True for the active elements, but a lookup from the ring of active elements.
+        Returns the next active element after the pointer. If there are no active elements, returns an empty list.
+
+        Args:
+            incr_ptr (bool, optional): Whether to increment the pointer to the position of the next active element. Defaults to True.
+        """
+        offset = self._next_active_offsets[self.ptr % len(self.population)]
+        if offset is None:
+            # get_next_condition moves the pointer once around the cycle and one step further
+            if incr_ptr:
+                self.ptr += len(self.population) + 1
+            return []
+        out = self.get_at_index(self.ptr + offset)
+        if incr_ptr:
+            self.ptr += offset
+        return out
+    
+    def get_prev_active(self) -> Any:
+        """ Return the previous active element before the pointer, without moving the pointer.
+        If the element at the pointer is the only active element, return it. If there are no active elements, returns an empty list.
+        """
+        index = self.ptr % len(self.population)
+        offset = self._prev_active_offsets[index]
+        if offset is not None:
+            return self.population[(index - offset) % len(self.population)]
+        if self.active[index]:
+            return self.population[index]
+        return []
         
     def get_at_index(self,index = None) -> Any:
         """Return the element at index, with the modulo operator.
@@ -205,6 +276,8 @@ class TurnCycle:
             ptr (int, optional): Where to move the pointer. Defaults to no moving.
         """
         self.population.append(val)
+        self.active.append(True)
+        self._set_active_ring()
         self.ptr += 0
         if ptr:
             self.ptr = ptr
@@ -6,11 +6,15 @@ import sys
 #sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import time
 import sys
+import concurrent.futures
 from ..Game.Game import MoskaGame
+from ..Game.BatchedPredictor import BatchedPredictor
+from ..Game.InterpreterPool import DEFAULT_MAX_BATCH_SIZE, preload_interpreter_pools
+from ..Game.utils import get_model_file
 from ..Player.AbstractPlayer import AbstractPlayer
 import multiprocessing
 from typing import Any, Callable, Dict, Iterable, List, Tuple
-from .Utils import args_to_gamekwargs
+from .Utils import args_to_gamekwargs, replace_setting_values
 from .PlayerWrapper import PlayerWrapper
 
 """This file contains simulation utility functions for playing (multiple) games of Moska."""
@@ -81,9 +85,15 @@ def play_games(players : List[PlayerWrapper],
     cpus = min(os.cpu_count(),ngames) if cpus==-1 else cpus
     
     arg_gen = (args_to_gamekwargs(game_kwargs,players,i,shuffle_player_order) for i in range(ngames))
+    # The models of the first game are loaded once in each process when it starts, and shared by the games of the process
+    first_args = replace_setting_values(game_kwargs, 0)
+    model_paths = first_args.get("model_paths", [])
+    model_paths = [model_paths] if isinstance(model_paths, str) else model_paths
+    model_paths = [path for path in map(get_model_file, model_paths) if path]
+    preload_args = (model_paths, first_args.get("max_batch_size", DEFAULT_MAX_BATCH_SIZE))
     results = []
     print(f"Starting a pool with {cpus} processes and {chunksize} chunksize...")
-    with multiprocessing.Pool(cpus) as pool:
+    with multiprocessing.Pool(cpus, initializer=preload_interpreter_pools, initargs=preload_args) as pool:
         # Lazily run games distributing 'chunksize' games to each process. The results will not be ordered.
         gen = pool.map_async(run_game,arg_gen,chunksize = chunksize)
         failed_games = 0
@@ -110,6 +120,66 @@ def play_games(players : List[PlayerWrapper],
     print(f"Finished simulating {len(results)/ngames*100:.2f}% of games. {len(results) - failed_games} succesful games. {failed_games} failed.",flush=True)
     return results
 
+def play_games_batched(players : List[PlayerWrapper],
+                       game_kwargs : Callable,
+                       ngames : int = 1,
+                       max_games_at_once : int = 32,
+                       shuffle_player_order : bool = True,
+                       verbose : bool = True,
+                       predictor : BatchedPredictor = None,
+                       ):
+    """ Simulate multiple moska games in this process, and make the neural network predictions of all running games in large batches.
+    Up to 'max_games_at_once' games are run at the same time, each in its own thread with the 'sequential' scheduler.
+    When every running game is waiting for a model prediction (or has ended), the predictions are made with one model call.
+
+    The models are loaded once from the 'model_paths' of the first games arguments, and every game must use the same model paths.
+    The games run concurrently, so the 'timeout' of the games should be larger than when playing one game at a time.
+
+    Args:
+        players (List[PlayerWrapper]): The players, same as in play_games.
+        game_kwargs (Callable): The game arguments, same as in play_games.
+        ngames (int, optional): Number of games to play. Defaults to 1.
+        max_games_at_once (int, optional): How many games are run at the same time, i.e. the maximum number of predictions in a batch. Defaults to 32.
+        shuffle_player_order (bool, optional) : Whether to randomly shuffle the player order in the game.
+        predictor (BatchedPredictor, optional): The predictor to use. Defaults to None, in which case a predictor using the models of the games is created.
+
+    Returns:
+        list[List] : A list of lists, where each sublist contains the finishing ranks of a game.
+    """
+    arg_list = [args_to_gamekwargs(game_kwargs,players,i,shuffle_player_order) for i in range(ngames)]
+    if not arg_list:
+        return []
+    if predictor is None:
+        model_paths = arg_list[0].get("model_paths", [])
+        if any((kwargs.get("model_paths", []) != model_paths for kwargs in arg_list)):
+            raise ValueError("All the games must use the same model paths, when the predictions are batched.")
+        # The predictions are made with the models of a game, that is only used for predictions
+        model_game = MoskaGame(model_paths=model_paths, gather_data=False)
+        predictor = BatchedPredictor(model_game.predict_with_models)
+    results = []
+
+    def run_batched_game(kwargs):
+        kwargs = kwargs.copy()
+        kwargs["scheduler"] = "sequential"
+        # The models are only loaded to the predictor
+        kwargs["model_paths"] = []
+        kwargs["batched_predictor"] = predictor
+        predictor.add_game()
+        try:
+            return MoskaGame(**kwargs).start()
+        finally:
+            predictor.remove_game()
+
+    start = time.time()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_games_at_once) as executor:
+        for res in executor.map(run_batched_game, arg_list):
+            results.append(res)
+    failed_games = results.count(None)
+    if verbose:
+        print(f"Finished simulating {len(results)} games in {time.time() - start:.2f} seconds. {len(results) - failed_games} succesful games. {failed_games} failed.",flush=True)
+        print(f"Made {predictor.nrequests} predictions with {predictor.ncalls} model calls.",flush=True)
+    return results
+
 def get_loss_percents(results, player="all", show = True):
     """ Return and/or print the results as a dictionary of player names and their loss percentage.
     Doesnt print the player if they have no losses.
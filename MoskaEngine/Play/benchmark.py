@@ -11,6 +11,7 @@ from ..Player.NNHIFEvaluatorBot import NNHIFEvaluatorBot
 from ..Player.HeuristicEvaluatorBot import HeuristicEvaluatorBot
 from .Simulate import play_games, get_loss_percents
 from .Utils import make_log_dir
+from ..Game.utils import get_model_file
 from .PlayerWrapper import PlayerWrapper
 
 class Benchmark:
@@ -37,24 +38,27 @@ class Benchmark:
         """ Benchmark a player against a set of predefined models.
         """
         custom_game_kwargs = custom_game_kwargs.copy()
-        models = self.game_kwargs.copy().get("model_paths", [])
-        if "model_paths" in custom_game_kwargs:
-            models += custom_game_kwargs["model_paths"]
-            custom_game_kwargs.pop("model_paths")
-        models = [os.path.abspath(m) for m in models]
-        models = list(set(models))
+        # A new list, so the model paths of the benchmark itself are not modified
+        models = list(self.game_kwargs.get("model_paths", []))
+        models += custom_game_kwargs.pop("model_paths", [])
+        # The games are run in the benchmark folder, so the paths must be absolute
+        models = [os.path.abspath(get_model_file(m) or m) for m in models]
+        models = list(dict.fromkeys(models))
 
         # Game arguments
-        gamekwargs = {**self.game_kwargs, **custom_game_kwargs}
+        gamekwargs = {**self.game_kwargs, **custom_game_kwargs, "model_paths" : models}
         players = [player] + self.main_players
         for pl in players:
             pl.settings = {**self.shared_kwargs, **pl.settings, **custom_shared_pl_kwargs}
-        # Make the log directory and change to it
+        # Make the log directory and change to it, and afterwards return to the current directory
+        cwd = os.getcwd()
         make_log_dir(self.folder)
-        results = play_games(players, gamekwargs, ngames=ngames, cpus=cpus, chunksize=chunksize,shuffle_player_order=True,verbose=False)
+        try:
+            results = play_games(players, gamekwargs, ngames=ngames, cpus=cpus, chunksize=chunksize,shuffle_player_order=True,verbose=False)
+        finally:
+            os.chdir(cwd)
         loss_perc = get_loss_percents(results)
         print(f"Confidence interval of {player.settings['name']}: {self.calc_CI(loss_perc.get(player.settings['name'], 0)/100, ngames)}")
-        os.chdir("..")
         return loss_perc.get(player.settings["name"], 0)
 
 BENCH1 = Benchmark(
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+import argparse
+import copy
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+from typing import Any, Dict, Iterable, List
+import numpy as np
+from ..Game.InterpreterPool import get_interpreter_pool
+from ..Player.NNHIFEvaluatorBot import NNHIFEvaluatorBot
+from .PlayerWrapper import PlayerWrapper
+
+"""
+This file contains a post-training quantisation pipeline for the evaluator models.
+A trained keras model (for example the 'model-checkpoints' of a model in Models/) is converted to tflite models
+with float32 (the reference), float16 and int8 weights. The int8 model is calibrated with a representative dataset
+sampled from the 'Vectors' folders of gathered games.
+Each quantised model is compared to the float32 model by the drift of its predictions, and optionally by the loss rate of
+an NNHIFEvaluatorBot using it in a Benchmark. A quantised model passes the accuracy gate, if both differences are small enough.
+"""
+
+CONVERSION_MODES = ("float32", "float16", "int8")       # float32 is the reference, that the quantised models are compared to
+
+def load_representative_vectors(folders : Iterable[str], nsamples : int = 1000, seed : int = 0) -> np.ndarray:
+    """ Return 'nsamples' random state vectors (without the label column) from the files in the 'Vectors' folders.
+    The files are read in a random order until there are enough vectors.
+
+    Raises:
+        ValueError: If a folder doesn't exist, or if the folders have no vectors.
+    """
+    rng = random.Random(seed)
+    files = []
+    for folder in folders:
+        if not os.path.isdir(folder):
+            raise ValueError(f"Path {folder} is not a directory")
+        files += sorted((os.path.join(folder, file) for file in os.listdir(folder)))
+    rng.shuffle(files)
+    vectors = []
+    nvectors = 0
+    for file in files:
+        if nvectors >= nsamples:
+            break
+        if os.path.getsize(file) == 0:
+            continue
+        data = np.loadtxt(file, delimiter=",", dtype=np.float32, ndmin=2)
+        # The last column is the label
+        vectors.append(data[:, :-1])
+        nvectors += len(data)
+    if not vectors:
+        raise ValueError(f"No vectors found in {folders}")
+    vectors = np.concatenate(vectors)
+    rows = rng.sample(range(len(vectors)), min(nsamples, len(vectors)))
+    return vectors[rows]
+
+def get_keras_model_path(model : str) -> str:
+    """ Return the path of a keras model: either the given path, or the 'model-checkpoints' of the model in Models/. """
+    if os.path.exists(model):
+        return model
+    path = os.path.abspath(os.environ["MOSKA_ROOT_PATH"] + f"/Models/{model}/model-checkpoints")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No keras model found for {model}. Use a path to a keras model, or the name of a model in Models/ with 'model-checkpoints'.")
+    return path
+
+def convert_model(model : str, representative : np.ndarray, out_folder : str = "", modes : Iterable[str] = CONVERSION_MODES) -> Dict[str,str]:
+    """ Convert a keras model to tflite models, and return the paths of the models by the mode.
+    The models are written to 'out_folder' (by default the folder of the keras model) as 'model-<mode>.tflite'.
+    The input and output of every model are float32, so the quantised models can be used like any other model.
+
+    Args:
+        model (str): A path to a keras model, or the name of a model in Models/ (see get_keras_model_path).
+        representative (np.ndarray): The vectors, used to calibrate the int8 activations.
+        out_folder (str, optional): Where to write the models. Defaults to the folder of the keras model.
+        modes (Iterable[str], optional): Which models to create. Defaults to CONVERSION_MODES.
+    """
+    modes = list(modes)
+    for mode in modes:
+        if mode not in CONVERSION_MODES:
+            raise ValueError(f"Unknown conversion mode {mode}. Supported modes: {CONVERSION_MODES}")
+    import tensorflow as tf
+    model_path = get_keras_model_path(model)
+    keras_model = tf.keras.models.load_model(model_path, compile=False)
+    out_folder = out_folder if out_folder else os.path.dirname(os.path.normpath(model_path))
+    os.makedirs(out_folder, exist_ok=True)
+    input_shape = (1,) + tuple(keras_model.input_shape[1:])
+    paths = {}
+    for mode in modes:
+        converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+        if mode == "float16":
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            converter.target_spec.supported_types = [tf.float16]
+        elif mode == "int8":
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            converter.representative_dataset = lambda : ([row.reshape(input_shape)] for row in representative)
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        path = os.path.join(out_folder, f"model-{mode}.tflite")
+        with open(path, "wb") as f:
+            f.write(converter.convert())
+        paths[mode] = path
+    return paths
+
+def prediction_drift(reference_path : str, model_path : str, X : np.ndarray) -> Dict[str,float]:
+    """ Compare the predictions of two models on the vectors X.
+    Returns the mean and maximum absolute difference of the predictions, the fraction of vectors predicted on the same side of 0.5,
+    and the correlation of the ranks of the predictions (the bots choose the move by comparing the evaluations).
+    """
+    reference = get_interpreter_pool(reference_path).predict(X).ravel().astype(np.float64)
+    pred = get_interpreter_pool(model_path).predict(X).ravel().astype(np.float64)
+    diff = np.abs(reference - pred)
+    reference_ranks = np.argsort(np.argsort(reference, kind="stable"), kind="stable")
+    pred_ranks = np.argsort(np.argsort(pred, kind="stable"), kind="stable")
+    rank_correlation = np.corrcoef(reference_ranks, pred_ranks)[0, 1] if len(X) > 1 else 1.0
+    return {
+        "mean_abs_drift" : float(diff.mean()),
+        "max_abs_drift" : float(diff.max()),
+        "agreement" : float(np.mean((reference > 0.5) == (pred > 0.5))),
+        "rank_correlation" : float(rank_correlation),
+    }
+
+def benchmark_loss_rate(model_path : str, benchmark = None, player_settings : Dict[str,Any] = None, ngames : int = 200, cpus : int = -1) -> float:
+    """ Return the loss percentage of an NNHIFEvaluatorBot using the model in 'model_path', in a Benchmark.
+    The logs of the benchmark games are not kept.
+
+    Args:
+        benchmark (Benchmark, optional): The benchmark to run. Defaults to BENCH3 (three MoskaBot3 opponents).
+        player_settings (Dict, optional): Settings of the benchmarked player, that replace the defaults.
+    """
+    if benchmark is None:
+        # The benchmarks are imported here, since they load their models when imported
+        from .benchmark import BENCH3
+        benchmark = BENCH3
+    settings = {"name" : "player", "max_num_states" : 1000, "max_num_samples" : 100, "pred_format" : "bitmap", "log_level" : logging.WARNING}
+    model_path = os.path.abspath(model_path)
+    player = PlayerWrapper(NNHIFEvaluatorBot, {**settings, **(player_settings or {}), "model_id" : model_path})
+    # The benchmark fails if its log folder exists, so each run makes the folder in a new temporary directory
+    with tempfile.TemporaryDirectory() as folder:
+        benchmark = copy.copy(benchmark)
+        benchmark.folder = os.path.join(folder, os.path.basename(benchmark.folder))
+        return benchmark.run(player, cpus=cpus, ngames=ngames, custom_game_kwargs={"model_paths" : [model_path]})
+
+def loss_rate_difference(reference_path : str,
+                         model_path : str,
+                         reference_loss_rate : float = None,
+                         benchmark = None,
+                         player_settings : Dict[str,Any] = None,
+                         ngames : int = 200,
+                         cpus : int = -1,
+                         ) -> Dict[str,float]:
+    """ Compare the loss percentages of an NNHIFEvaluatorBot using the reference model, and one using the other model, against the same opponents.
+    Returns the loss percentages and their difference (positive if the other model loses more).
+    If 'reference_loss_rate' is given, the reference model is not benchmarked again, so several models can be compared to the same reference.
+    The other arguments are passed to benchmark_loss_rate.
+    """
+    kwargs = {"benchmark" : benchmark, "player_settings" : player_settings, "ngames" : ngames, "cpus" : cpus}
+    if reference_loss_rate is None:
+        reference_loss_rate = benchmark_loss_rate(reference_path, **kwargs)
+    loss_rate = benchmark_loss_rate(model_path, **kwargs)
+    return {
+        "reference_loss_rate" : reference_loss_rate,
+        "loss_rate" : loss_rate,
+        "loss_rate_difference" : loss_rate - reference_loss_rate,
+    }
+
+def passes_gate(result : Dict[str,float], max_mean_drift : float = 0.02, max_loss_rate_increase : float = 2.0) -> bool:
+    """ Whether a quantised model is accurate enough: the mean prediction drift is atmost 'max_mean_drift',
+    and if the model was benchmarked, its loss rate is atmost 'max_loss_rate_increase' percentage points higher than the reference's.
+    """
+    if result["mean_abs_drift"] > max_mean_drift:
+        return False
+    return result.get("loss_rate_difference", 0) <= max_loss_rate_increase
+
+def quantize_model(model : str,
+                   vector_folders : List[str],
+                   out_folder : str = "",
+                   nsamples : int = 1000,
+                   ngames : int = 0,
+                   cpus : int = -1,
+                   max_mean_drift : float = 0.02,
+                   max_loss_rate_increase : float = 2.0,
+                   ) -> Dict[str,Dict[str,Any]]:
+    """ Create the float16 and int8 models of a keras model, and compare them to the float32 model.
+    The report is returned, and written to 'quantization-report.json' in the folder of the models.
+
+    Args:
+        model (str): A path to a keras model, or the name of a model in Models/.
+        vector_folders (List[str]): The 'Vectors' folders, from which the representative and the evaluation vectors are sampled.
+        out_folder (str, optional): Where to write the models and the report. Defaults to the folder of the keras model.
+        nsamples (int, optional): The number of representative vectors, and separately the number of vectors to compare the predictions on. Defaults to 1000.
+        ngames (int, optional): The number of benchmark games per model. The reference is benchmarked once. Defaults to 0, in which case the loss rates are not compared.
+        cpus (int, optional): The number of processes for the benchmark games. Defaults to -1 = the number of cpus.
+
+    Returns:
+        Dict[str,Dict] : The path, prediction drift, loss rates (if benchmarked) and whether the gate passed, of each quantised model.
+    """
+    vectors = load_representative_vectors(vector_folders, nsamples=2*nsamples)
+    representative, evaluation = vectors[:nsamples], vectors[nsamples:]
+    if len(evaluation) == 0:
+        evaluation = representative
+    paths = convert_model(model, representative, out_folder=out_folder)
+    reference_path = paths.pop("float32")
+    # Every quantised model is compared to the same benchmark of the reference
+    reference_loss_rate = benchmark_loss_rate(reference_path, ngames=ngames, cpus=cpus) if ngames > 0 else None
+    report = {}
+    for mode, path in paths.items():
+        result = {"path" : path, **prediction_drift(reference_path, path, evaluation)}
+        if ngames > 0:
+            result.update(loss_rate_difference(reference_path, path, reference_loss_rate=reference_loss_rate, ngames=ngames, cpus=cpus))
+        result["passed"] = passes_gate(result, max_mean_drift=max_mean_drift, max_loss_rate_increase=max_loss_rate_increase)
+        report[mode] = result
+    with open(os.path.join(os.path.dirname(reference_path), "quantization-report.json"), "w") as f:
+        json.dump(report, f, indent=4)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create float16 and int8 tflite models of a keras model, and check their accuracy against the float model")
+    parser.add_argument("model", type=str, help="A path to a keras model, or the name of a model in Models/ with 'model-checkpoints'.")
+    parser.add_argument("vector_folders", type=str, nargs="+", help="The 'Vectors' folders of gathered games.")
+    parser.add_argument("--out_folder", type=str, default="", help="Where to write the models. Defaults to the folder of the keras model.")
+    parser.add_argument("--nsamples", type=int, default=1000, help="The number of representative vectors.")
+    parser.add_argument("--ngames", type=int, default=0, help="The number of benchmark games per model. 0 skips the benchmark.")
+    parser.add_argument("--cpus", type=int, default=-1, help="The number of processes for the benchmark games.")
+    parser.add_argument("--max_mean_drift", type=float, default=0.02, help="The largest allowed mean absolute drift of the predictions.")
+    parser.add_argument("--max_loss_rate_increase", type=float, default=2.0, help="The largest allowed increase of the loss percentage.")
+    args = parser.parse_args()
+    report = quantize_model(args.model, args.vector_folders, out_folder=args.out_folder, nsamples=args.nsamples, ngames=args.ngames,
+                            cpus=args.cpus, max_mean_drift=args.max_mean_drift, max_loss_rate_increase=args.max_loss_rate_increase)
+    print(json.dumps(report, indent=4))
+    sys.exit(0 if all((result["passed"] for result in report.values())) else 1)
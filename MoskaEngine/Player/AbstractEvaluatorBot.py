@@ -1,6 +1,6 @@
 from __future__ import annotations
 from abc import abstractmethod
-from collections import Counter, namedtuple
+from collections import namedtuple
 from dataclasses import dataclass
 import itertools
 import logging
@@ -13,9 +13,11 @@ from typing import Any, Dict, List,TYPE_CHECKING, Set, Tuple
 from .utils import Assignment, _get_single_assignments, _get_assignments
 
 from ..Game.GameState import FullGameState
+from ..Game.MoveSimulator import apply_move, add_cards_to_hand
 if TYPE_CHECKING:
     from ..Game.Deck import Card
     from ..Game.Game import MoskaGame
+    from ..Game.Hand import MoskaHand
 
 class AbstractEvaluatorBot(AbstractPlayer):
     """ This class is an abstract class for bots that evaluate the game states.
@@ -41,10 +43,14 @@ class AbstractEvaluatorBot(AbstractPlayer):
                  # Top p sampling: For example 0.2 means we pick the move from the smallest set of plays whose cum p distr is > 0.2
                  top_p_play : float = 0,
                  top_p_weights : str = "uniform",
+                 simulate_moves : bool = True,
                  ):
         self.top_p_play = top_p_play
         self.top_p_weights = top_p_weights
         self.max_num_states = max_num_states
+        # Whether to generate the next states with MoveSimulator.apply_move, instead of making mock moves on the game
+        self.simulate_moves = simulate_moves
+        self._root_state : FullGameState = None     # The state of the game, from which the next states are simulated
         super().__init__(moskaGame, name, delay, requires_graphic, log_level, log_file)
     
     @abstractmethod
@@ -98,7 +104,12 @@ class AbstractEvaluatorBot(AbstractPlayer):
     def _make_mock_move(self,move,args) -> FullGameState:
         """ A wrapper around making a mock move, which is used to check the immediate next state.
         This is more relevant in the AbstractHIFEvaluatorBot.
+        If simulate_moves is True, the move is applied to a copy of the state in get_possible_next_states, and the game is not modified.
         """
+        if self.simulate_moves:
+            if self.moskaGame.metrics is not None:
+                self.moskaGame.metrics.nmock_moves += 1
+            return apply_move(self._root_state, move, args, ignore_errors=self.moskaGame.card_monitor.ignore_errors)
         state = self.moskaGame._make_mock_move(move,args)
         return state
     
@@ -123,7 +134,7 @@ class AbstractEvaluatorBot(AbstractPlayer):
         
         # Get a random sample of the plays. Evaluating each could take a long time
         # TODO: Prioritize by length?
-        assignments = random.sample(list(assignments), min(len(assignments), self.max_num_states))
+        assignments = self.rng.sample(list(assignments), min(len(assignments), self.max_num_states))
         
         plays = []
         for play in assignments:
@@ -148,13 +159,12 @@ class AbstractEvaluatorBot(AbstractPlayer):
 
         Returns a list of plays, and the corresponding states.
         """
-        playable_from_hand = self._playable_values_from_hand()
-        chand = self.hand.copy()
-        playable_cards = chand.pop_cards(cond=lambda c : c.rank in playable_from_hand)
+        playable_mask = self._playable_mask_from_hand()
+        playable_cards = [c for c in self.hand.cards if c.bit & playable_mask]
         plays = []
         for i in range(1,len(playable_cards)+1):
             plays += list(itertools.combinations(playable_cards,i,))
-        plays = random.sample(plays,min(len(plays),self.max_num_states))
+        plays = self.rng.sample(plays,min(len(plays),self.max_num_states))
         states = []
         for i,play in enumerate(plays):
             # Convert play to a list, required by Turns
@@ -186,6 +196,9 @@ class AbstractEvaluatorBot(AbstractPlayer):
                 for assign in assignments:
                     play = [card, self.moskaGame.cards_to_fall[assign._table_inds[0]]]
                     plays.append(play)
+                    if self.simulate_moves:
+                        states.append(self._make_mock_move_with_card(card, "PlayFallFromHand", [self, {play[0]:play[1]}]))
+                        continue
                     # Add the card to the hand and check the state after playing the card
                     self.hand.add([card])
                     # The card must be added to hand to be able to check the state
@@ -204,6 +217,9 @@ class AbstractEvaluatorBot(AbstractPlayer):
             else:
                 play = [card]
                 plays.append(play)
+                if self.simulate_moves:
+                    states.append(self._make_mock_move_with_card(card, "PlayToSelfFromDeck", [self, self, play]))
+                    continue
                 # Add the card to the hand and check the state after playing the card TO SELF
                 self.hand.add(play)
                 state = self._make_mock_move("PlayToSelfFromDeck",[self, self, play])
@@ -217,18 +233,32 @@ class AbstractEvaluatorBot(AbstractPlayer):
         self.plog.debug(f"{len([p for p in plays if len(p) == 2])} plays to 'PlayFallFromHand' and {len([p for p in plays if len(p) == 1])} plays to 'PlayToSelfFromDeck'.")
         return plays, states
     
+    def _make_mock_move_with_card(self, card : Card, move : str, args) -> FullGameState:
+        """ Simulate a move from a state, where the card lifted from the deck is in the players hand.
+        """
+        root_state = self._root_state
+        self._root_state = add_cards_to_hand(root_state, self.pid, [card], ignore_errors=self.moskaGame.card_monitor.ignore_errors)
+        try:
+            state = self._make_mock_move(move, args)
+        finally:
+            self._root_state = root_state
+        if isinstance(state,list):
+            if len(state) != 1:
+                raise ValueError(f"Expected only one state for {move}")
+            state = state[0]
+        return state
+    
     def _get_play_to_other_play_states(self) -> Tuple[List[List[Card]], List[FullGameState]]:
         """ Get N possible plays and the resulting states for playing a card to other.
         Returns a list of plays, and the corresponding states.
         """
-        playable_from_hand = self._playable_values_from_hand()
-        chand = self.hand.copy()
-        playable_cards = chand.pop_cards(cond=lambda c : c.rank in playable_from_hand)
+        playable_mask = self._playable_mask_from_hand()
+        playable_cards = [c for c in self.hand.cards if c.bit & playable_mask]
         play_iterables = []
         for i in range(1,min(len(playable_cards)+1,self._fits_to_table()+1)):
             play_iterables.append(itertools.combinations(playable_cards,i))
         plays = list(itertools.chain.from_iterable(play_iterables))
-        plays = random.sample(plays,min(len(plays),self.max_num_states))
+        plays = self.rng.sample(plays,min(len(plays),self.max_num_states))
         states = []
         target = self.moskaGame.get_target_player()
         actual_plays = []
@@ -245,15 +275,10 @@ class AbstractEvaluatorBot(AbstractPlayer):
         plays = actual_plays
         return plays, states
     
-    def _get_initial_plays(self, cards : List[Card], fits : int):
-        single_solutions = itertools.combinations(cards,1)
-        og_counter = Counter([c.rank for c in cards])
-        cards = [c for c in cards if og_counter[c.rank] >= 2]
-        #card_sets = []
-        #for val, count in og_counter.items():
-        #    if count >= 2:
-        #        card_sets.append([c for c in cards if c.value == val])
-        card_sets = [[c for c in cards if c.rank == val] for val, count in og_counter.items() if count >= 2]
+    def _get_initial_plays(self, hand : MoskaHand, fits : int):
+        single_solutions = itertools.combinations(hand.cards,1)
+        # The cards of each rank with atleast two cards in hand, in the order of the hand
+        card_sets = list(hand.rank_groups(min_cards=2).values())
 
         legal_plays = list(single_solutions)
         # Take all combinations of atleast two cards from each set
@@ -316,16 +341,15 @@ class AbstractEvaluatorBot(AbstractPlayer):
         """ Get N possible plays and the resulting states for playing cards to other on an Initiating turn.
         Return the possible plays, and the corresponding states.
         """
-        cards = self.hand.copy().cards
-        fits = min(self._fits_to_table(), len(cards))
+        fits = min(self._fits_to_table(), len(self.hand))
         self.plog.debug(f"{fits} fits to table")
-        legal_plays = self._get_initial_plays(cards, fits)
+        legal_plays = self._get_initial_plays(self.hand, fits)
         self.plog.debug(f"Found {len(legal_plays)} legal plays to 'InitialPlay'.")
         if len(legal_plays) > self.max_num_states:
             self.plog.debug(f"Sampling {self.max_num_states} states from {len(legal_plays)} legal plays.")
-            legal_plays = random.sample(legal_plays,self.max_num_states)
+            legal_plays = self.rng.sample(legal_plays,self.max_num_states)
         target = self.moskaGame.get_target_player()
-        random.shuffle(legal_plays)
+        self.rng.shuffle(legal_plays)
         states = []
         plays = []
         for i, play in enumerate(legal_plays):
@@ -348,6 +372,9 @@ class AbstractEvaluatorBot(AbstractPlayer):
         """ Returns a tuple containing the possible next moves, the corresponding states and the evaluation of the game after playing the move.
         """
         state = FullGameState.from_game(self.moskaGame,copy=True)
+        # The simulated moves are applied to this state. Hashing it first lets the successors update the hash incrementally.
+        state.compute_zobrist_hash()
+        self._root_state = state
         self.plog.info("Getting possible next states for move: " + move)
         start = time.time()
         if move == "Skip":
@@ -392,14 +419,25 @@ class AbstractEvaluatorBot(AbstractPlayer):
         is_eq, msg = state.is_game_equal(self.moskaGame,return_msg=True)
         if not is_eq:
             raise Exception("State changed during get_possible_next_states:\n" + msg)
-        # TODO: Perhaps add a check for duplicate states
         start = time.time()
-        predictions = self.evaluate_states(states)
-        if len(predictions) != len(states):
+        # Different plays often lead to the same state, so each unique state is only evaluated once
+        unique_index : Dict[int,int] = {}     # Zobrist hash : index in unique_states
+        unique_states = []
+        state_index = []
+        for s in states:
+            i = unique_index.get(s.zobrist_hash)
+            if i is None:
+                i = len(unique_states)
+                unique_index[s.zobrist_hash] = i
+                unique_states.append(s)
+            state_index.append(i)
+        unique_predictions = self.evaluate_states(unique_states)
+        if len(unique_predictions) != len(unique_states):
             raise Exception("Number of predictions and states don't match!!")
-        if any([not isinstance(p,float) for p in predictions]):
+        if any([not isinstance(p,float) for p in unique_predictions]):
             raise Exception("Not all predictions are of type float")
-        self.plog.debug(f"Time taken to evaluate {len(states)} states: {time.time() - start}")
+        predictions = [unique_predictions[i] for i in state_index]
+        self.plog.debug(f"Time taken to evaluate {len(unique_states)} unique states of {len(states)} states: {time.time() - start}")
         return plays, states, predictions
     
     
@@ -438,7 +476,7 @@ class AbstractEvaluatorBot(AbstractPlayer):
         self.plog.info(f"Found Top p={self.top_p_play} plays: {len(valid_plays)}")
         #print(f"Valid plays: {valid_plays}")
         # Randomly pick a play from the valid plays
-        chosen_move_idx = np.random.choice(np.arange(0,len(valid_plays),1), p = valid_evals if self.top_p_weights == "weighted" else None)
+        chosen_move_idx = self.np_rng.choice(np.arange(0,len(valid_plays),1), p = valid_evals if self.top_p_weights == "weighted" else None)
         chosen_move = valid_plays[chosen_move_idx]
         self.plog.info(f"Chosen move: {chosen_move[0]}")
         chosen_move_str = chosen_move[0]
@@ -50,7 +50,7 @@ class AbstractHIFEvaluatorBot(AbstractEvaluatorBot):
         This overwrites the superclass, to return a list of states, because the next state might not be known.
         """
         states = []
-        state = self.moskaGame._make_mock_move(move,args)
+        state = super()._make_mock_move(move,args)
         if move == "PlayToOther":
             # See which cards were lifted
             curr_cards = self.hand.copy().cards
@@ -66,8 +66,10 @@ class AbstractHIFEvaluatorBot(AbstractEvaluatorBot):
                 card_samples = self.moskaGame.card_monitor.get_sample_cards_from_deck(self, len(lifted_cards),self.max_num_samples)
                 for cards in card_samples:
                     sample_state = state.copy()
+                    sample_hand = list(state.full_player_cards[self.pid])
                     for i, index_to_change in enumerate(lifted_card_indices):
-                        sample_state.full_player_cards[self.pid][index_to_change] = cards[i]
+                        sample_hand[index_to_change] = cards[i]
+                    sample_state.set_player_cards(self.pid, sample_hand)
                     states.append(sample_state)
         elif move == "InitialPlay":
             curr_cards = self.hand.copy().cards
@@ -81,8 +83,10 @@ class AbstractHIFEvaluatorBot(AbstractEvaluatorBot):
                 lifted_card_indices = [i for i,c in enumerate(state.full_player_cards[self.pid]) if c in lifted_cards]
                 for cards in self.moskaGame.card_monitor.get_sample_cards_from_deck(self, len(lifted_cards),self.max_num_samples):
                     sample_state = state.copy()
+                    sample_hand = list(state.full_player_cards[self.pid])
                     for i, index_to_change in enumerate(lifted_card_indices):
-                        sample_state.full_player_cards[self.pid][index_to_change] = cards[i]
+                        sample_hand[index_to_change] = cards[i]
+                    sample_state.set_player_cards(self.pid, sample_hand)
                     states.append(sample_state)
 
         elif move == "EndTurn":
@@ -100,8 +104,10 @@ class AbstractHIFEvaluatorBot(AbstractEvaluatorBot):
                 lifted_card_indices = [i for i,c in enumerate(state.full_player_cards[self.pid]) if c in lifted_cards]
                 for cards in self.moskaGame.card_monitor.get_sample_cards_from_deck(self, len(lifted_cards),self.max_num_samples):
                     sample_state = state.copy()
+                    sample_hand = list(state.full_player_cards[self.pid])
                     for i, index_to_change in enumerate(lifted_card_indices):
-                        sample_state.full_player_cards[self.pid][index_to_change] = cards[i]
+                        sample_hand[index_to_change] = cards[i]
+                    sample_state.set_player_cards(self.pid, sample_hand)
                     states.append(sample_state)
         else:
             states = [state]
@@ -5,7 +5,7 @@ import random
 import numpy as np
 from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Set, Tuple
 from ..Game.GameState import FullGameState
-from ..Game.Deck import Card
+from ..Game.Deck import Card, can_kill, cards_kill_mask, cards_to_mask, mask_ranks, rank_spread
 if TYPE_CHECKING:   # False at runtime, since we only need MoskaGame for typechecking
     from ..Game.Game import MoskaGame
 from ..Game.Hand import MoskaHand
@@ -64,6 +64,8 @@ class AbstractPlayer(ABC):
         self.thread_id : int = None             # The native id of the thread
         self.moves : Dict[str,Callable] = {}    # A dictionary of str -> func, where the string is a moves identifier, and the func is a wrapper over all of the abstract methods
         self.state_vectors = []                 # A list containing 'vectors' (as lists), which contain all positions the player has been AFTER playing their move.
+        self.rng = random.Random()              # The players random number generator. When the game starts, set to a stream derived from the games random_seed
+        self.np_rng = np.random.default_rng()   # The players numpy random number generator, like 'rng'
         self.min_turns = min_turns              # Number of turns to play until marking self as ready
         self.moskaGame = moskaGame              # The moskaGame, where this player plays
         self.log_level = log_level              # What level log messages to log
@@ -95,7 +97,11 @@ class AbstractPlayer(ABC):
         Write logs to self.log_file
 
         Currently this is called in the `_start` method, which is called from Game when the game begins.
+        In a headless game, the player uses the games logger, which discards everything.
         """
+        if self.moskaGame is not None and self.moskaGame.headless:
+            self.plog = utils.HEADLESS_LOGGER
+            return
         # If no randomness is specified, then in parallel simulations multiple players might write to the same log file
         plog = logging.getLogger(self.name + str(random.randint(0,1000000)))
         plog.setLevel(self.log_level)
@@ -130,6 +136,9 @@ class AbstractPlayer(ABC):
         # If moskaGame is not set in the constructor, it must be set later
         if name == "moskaGame" and value is not None:
             self.set_moskaGame(value, _from_settr = True)
+        # A player is active in the games turn cycle, until they have a rank
+        elif name == "rank" and self.moskaGame is not None:
+            self.moskaGame.turnCycle.set_active(self, value is None)
     
     def _set_pid_name_logfile(self,pid) -> None:
         """ Set the players pid. The pid is used to identify the player in the game.
@@ -149,7 +158,11 @@ class AbstractPlayer(ABC):
         Returns:
             set[int]: Which values have been played to the table
         """
-        return set([c.rank for c in self.moskaGame.cards_to_fall + self.moskaGame.fell_cards])
+        return mask_ranks(self._table_mask())
+    
+    def _table_mask(self) -> int:
+        """Return the cards on the table (fallen and not fallen) as a bitmask."""
+        return cards_to_mask(self.moskaGame.cards_to_fall) | cards_to_mask(self.moskaGame.fell_cards)
     
     def _playable_values_from_hand(self) -> Set[int]:
         """Return a set of values, that can be played to target.
@@ -160,7 +173,13 @@ class AbstractPlayer(ABC):
         Returns:
             set: intersection of played values and values in the hand
         """
-        return self._playable_values_to_table().intersection([c.rank for c in self.hand.cards])
+        return mask_ranks(self._playable_mask_from_hand())
+    
+    def _playable_mask_from_hand(self) -> int:
+        """Return the cards in hand, that can be played to target, as a bitmask.
+        These are the cards in hand, whose rank is on the table.
+        """
+        return self.hand.mask & rank_spread(self._table_mask())
     
     def _fits_to_table(self) -> int:
         """Return the number of cards playable to the active/target player.
@@ -227,7 +246,7 @@ class AbstractPlayer(ABC):
         - All players are ready
         - And the player cant play from deck (there is no deck left or there is a kopled card already)
         """
-        if self._can_end_turn() and not self._can_fall_cards() and not self._playable_values_from_hand() and (len(self.moskaGame.deck) == 0 or any(c.kopled for c in self.moskaGame.cards_to_fall)):
+        if self._can_end_turn() and not self._can_fall_cards() and not self._playable_values_from_hand() and (len(self.moskaGame.deck) == 0 or self.moskaGame.kopled_card in self.moskaGame.cards_to_fall):
             return True
         return False
     
@@ -237,12 +256,8 @@ class AbstractPlayer(ABC):
         Returns:
             bool: True if player can kill cards from their hand, else False
         """
-        # Loop through the hand, and table and see if there is a card that can be used to kill a card on the table.
-        for pc in self.hand:
-            for fc in self.moskaGame.cards_to_fall:
-                 if utils.check_can_kill_card(pc,fc,self.moskaGame.trump):
-                     return True
-        return False
+        # Check if some card on the table is in the cards that the hand can kill
+        return bool(cards_kill_mask(self.hand.cards, self.moskaGame.trump) & cards_to_mask(self.moskaGame.cards_to_fall))
 
     def _play_fall_from_deck(self) -> None:
         """ This is a wrapper method around 'deck_lift_fall_method'
@@ -295,6 +310,9 @@ class AbstractPlayer(ABC):
         if self is self.moskaGame.get_target_player() and (not self.hand and len(self.moskaGame.deck) == 0 and not self.moskaGame.cards_to_fall):
             self.rank = poss_rank
             self.EXIT_STATUS = 1
+        # A finished player is always ready. This is set here, because this is called while holding the games lock
+        if self.rank is not None:
+            self.ready = True
         self.plog.debug(f"Set rank to {self.rank}")
         return self.rank
     
@@ -316,7 +334,7 @@ class AbstractPlayer(ABC):
         playable = self._playable_moves()
         self.plog.info(f"Playable moves: {playable}")
         # Return the move id to play
-        move = self.choose_move(playable)
+        move = self._choose_move_with_metrics(playable)
         self.plog.info(f"Selected move: {move}")
         # Get the function to call, which returns the arguments to pass to the game
         extra_args = self.moves[move]()
@@ -326,12 +344,24 @@ class AbstractPlayer(ABC):
         # Call the game to play the move. Catches Assertion (incorrect move) and Type errors
         success, msg  = self.moskaGame._make_move(move,args)
         # If gathering data, save the state vector
-        if (success and (move != "Skip" or len(self.state_vectors) == 0 or random.random() < 0.25)) and self.moskaGame.GATHER_DATA:
+        if (success and (move != "Skip" or len(self.state_vectors) == 0 or self.rng.random() < 0.25)) and self.moskaGame.GATHER_DATA:
             state = FullGameState.from_game(self.moskaGame, copy=False)
             vec = state.as_perspective_vector(self,fmt="bitmap")
             self.state_vectors.append(vec)
         return success, msg
     
+    def _choose_move_with_metrics(self, playable : List[str]) -> str:
+        """ Call 'choose_move(playable)', and record the time it took and the number of mock moves made, if the game collects metrics.
+        """
+        metrics = self.moskaGame.metrics
+        if metrics is None:
+            return self.choose_move(playable)
+        start = time.perf_counter()
+        nmock_moves = metrics.nmock_moves
+        move = self.choose_move(playable)
+        metrics.add_decision(type(self).__name__, move, time.perf_counter() - start, metrics.nmock_moves - nmock_moves)
+        return move
+    
     def _playable_moves(self) -> List[str]:
         """ Return the playable moves as a list of move names, such as "EndTurn", "PlayFallFromHand", etc.
 
@@ -369,7 +399,7 @@ class AbstractPlayer(ABC):
             if not self._can_fall_cards():
                 playable.remove("PlayFallFromHand")
             # If there is no deck left, or there is already a kopled card on the table, or there are no cards to fall
-            if any((c.kopled for c in self.moskaGame.cards_to_fall)) or len(self.moskaGame.deck) <= 0 or not self.moskaGame.cards_to_fall:
+            if self.moskaGame.kopled_card in self.moskaGame.cards_to_fall or len(self.moskaGame.deck) <= 0 or not self.moskaGame.cards_to_fall:
                 playable.remove("PlayFallFromDeck")
             # If all players are ready and there are no other moves left OR all other players are ready and there are played cards
             if self._must_end_turn() or self._can_end_turn():
@@ -414,9 +444,19 @@ class AbstractPlayer(ABC):
         return json.dumps(json_dict,indent=0)
     
     def _start(self) -> int:
-        """ Initializes the players thread, starts the thread and returns the threads native identification """
+        """ Initializes the players thread, starts the thread and returns the threads native identification.
+        If the game uses the 'sequential' scheduler, no thread is started. Instead the player gets a pseudo thread id,
+        and the game calls '_play_turn' for the player from the main thread.
+        """
         self._set_pid_name_logfile(self.moskaGame.players.index(self))
-        if self.thread is None or not self.thread.is_alive():
+        self._set_rngs()
+        if self.moskaGame.scheduler == "sequential":
+            self._set_plogger()
+            self._init_play()
+            # Pseudo thread ids are negative, so they can not collide with native thread ids
+            self.thread_id = -(self.pid + 1)
+            self.plog.info(f"Player started in sequential mode with ID {self.thread_id}")
+        elif self.thread is None or not self.thread.is_alive():
             self._set_plogger()
             # Make daemon, to kill the thread if the mian thread (game) fails in anyway.
             self.thread = threading.Thread(target=self._continuous_play,name=self.name,daemon=True)
@@ -427,6 +467,23 @@ class AbstractPlayer(ABC):
         self.EXIT_STATUS = 0
         return self.thread_id
     
+    def _set_rngs(self) -> None:
+        """ Set the players random number generators to streams derived from the games random_seed and the players pid.
+        The players should only use these for randomness during the game, so the game can be replayed from the seed.
+        """
+        seed = utils.derive_seed(self.moskaGame.random_seed, "player", self.pid)
+        self.rng = random.Random(seed)
+        self.np_rng = np.random.default_rng(seed)
+        return
+    
+    def _init_play(self) -> None:
+        """ Initialize the variables, that are used to keep track of the players turns during a game.
+        """
+        self._curr_target = self.moskaGame.get_target_player()
+        self._turns_taken_for_this_player = 0
+        self.rank = None
+        return
+    
     def _continuous_play(self) -> None:
         """ The main method of MoskaPlayer. This is the target of the players thread.
         This method is meant to be run indirectly, by starting the Thread associated with the player.
@@ -434,90 +491,112 @@ class AbstractPlayer(ABC):
 
         The thread is killed, if the main (game) thread fails for any reason.
         """
-        curr_target = self.moskaGame.get_target_player()
-        turns_taken_for_this_player = 0
-        self.rank = None
-        while self.rank is None:
-            # Incase we want to slow down the player
-            time.sleep(self.delay)
-            # Acquire the lock for moskaGame, returns true if the lock was acquired, and False if there was a problem
-            with self.moskaGame.get_lock(self) as ml:
-                if self.moskaGame.EXIT_FLAG:
-                    self.EXIT_STATUS = 2
-                    break                
-                if not ml:
-                    self.plog.debug(f"Lock was NOT acquired.")
-                    continue
-                self.plog.debug(f"Lock acquired.")
-                # Keep track of target changes.
-                target = self.moskaGame.get_target_player()
-                if target is not curr_target:
-                    self.plog.debug(f"Target has changed from {curr_target.name} to {target.name}")
-                    turns_taken_for_this_player = 0
-                    curr_target = target
-                turns_taken_for_this_player += 1
-                # If there is only 1 active player in the game, the player is last
-                if len(self.moskaGame.get_players_condition(lambda x : x.rank is None)) <= 1:
-                    self.plog.info(f"Player lost.")
-                    self._set_rank()
-                    break
-                try:
-                    # Try to play moves, as long as a valid move is played.
-                    # At _play_move, the self.ready is set to True
-                    current_hand = self.hand.cards.copy()
-                    success, msg = self._play_move()    # Return (True, "") if a valid move, else (False, "<error>")
-                    # NOTE: If a deterministic player can make invalid moves, it will get stuck in this loop.
-                    # Players should only make valid moves, because currently invalid moves are handled by errors,
-                    # and make the game slower when triggered.
-                    while not success:
-                        self.plog.warning(msg)
-                        self.ready = False
-                        self.plog.debug(f"Player set to not ready, because of: {msg}")
-                        # If the game is in json format, send json
-                        if self.moskaGame.in_web:
-                            j = {
-                                "error" : msg,
-                                "type" : "illegal"
-                            }
-                            print(json.dumps(j),flush=True)
-                        else:
-                            print(msg, flush=True)
-                        
-                        success, msg = self._play_move()
-                    new_hand = self.hand.cards.copy()
-                # If an exception was raised for some reason. Invalid move errors are caught, and do not end up here.
-                except Exception as msg:
-                    self.plog.error(traceback.format_exc())
-                    self.plog.error(msg)
-                    self.EXIT_STATUS = 2
-                    break
-                # The target player is not ready, until they play "EndTurn"
-                # Value of self.min_turns doesn't seem to have an effect.
-                if (turns_taken_for_this_player < self.min_turns) or (self is curr_target and self.moskaGame.cards_to_fall) or (current_hand != new_hand):
-                    self.ready = False
-                    msg = f"Player set to NOT ready, because"
-                    if turns_taken_for_this_player < self.min_turns:
-                        msg += f" turns taken ({turns_taken_for_this_player} < {self.min_turns})"
-                    if self is curr_target and self.moskaGame.cards_to_fall:
-                        msg += f" cards on table"
-                    if current_hand != new_hand:
-                        msg += f" hand changed"
-                    self.plog.debug(msg)
-                # Set the players rank
-                self._set_rank()
-                # Check if self has finished, and hasn't played "EndTurn"
-                # 'EndTurn' was last played, if the target changed during _play_move
-                if self.rank is not None and self is self.moskaGame.get_target_player():
-                    self.plog.info(f"Player finished as target. Playing 'EndTurn'.")
-                    success, msg = self.moskaGame._make_move("EndTurn",[self,[]])
-                    if not success:
-                        self.plog.error(msg)
+        try:
+            self._init_play()
+            while self.rank is None:
+                # Incase we want to slow down the player
+                time.sleep(self.delay)
+                # Acquire the lock for moskaGame, returns true if the lock was acquired, and False if there was a problem
+                with self.moskaGame.get_lock(self) as ml:
+                    if self.moskaGame.EXIT_FLAG:
                         self.EXIT_STATUS = 2
+                        break                
+                    if not ml:
+                        self.plog.debug(f"Lock was NOT acquired.")
+                        continue
+                    if not self._play_turn():
                         break
-                    self.ready = True
+            self._finish_play()
+        finally:
+            # If the thread stopped without finishing, it failed
+            if self.EXIT_STATUS == 0:
+                self.EXIT_STATUS = 2
+            # Tell the game that this player has stopped playing
+            self.moskaGame._notify_player_exit()
+        return
+    
+    def _play_turn(self) -> bool:
+        """ Play one turn. This must be called while holding the games lock.
+        In 'threads' mode this is called from '_continuous_play', and in 'sequential' mode directly from the game.
+
+        Returns:
+            bool: False if the player should stop playing (lost or failed), else True
+        """
+        self.plog.debug(f"Lock acquired.")
+        # Keep track of target changes.
+        target = self.moskaGame.get_target_player()
+        if target is not self._curr_target:
+            self.plog.debug(f"Target has changed from {self._curr_target.name} to {target.name}")
+            self._turns_taken_for_this_player = 0
+            self._curr_target = target
+        self._turns_taken_for_this_player += 1
+        # If there is only 1 active player in the game, the player is last
+        if len(self.moskaGame.get_players_condition(lambda x : x.rank is None)) <= 1:
+            self.plog.info(f"Player lost.")
+            self._set_rank()
+            return False
+        try:
+            # Try to play moves, as long as a valid move is played.
+            # At _play_move, the self.ready is set to True
+            current_hand = self.hand.cards.copy()
+            success, msg = self._play_move()    # Return (True, "") if a valid move, else (False, "<error>")
+            # NOTE: If a deterministic player can make invalid moves, it will get stuck in this loop.
+            # Players should only make valid moves, because currently invalid moves are handled by errors,
+            # and make the game slower when triggered.
+            while not success:
+                self.plog.warning(msg)
+                self.ready = False
+                self.plog.debug(f"Player set to not ready, because of: {msg}")
+                # If the game is in json format, send json
+                if self.moskaGame.in_web:
+                    j = {
+                        "error" : msg,
+                        "type" : "illegal"
+                    }
+                    print(json.dumps(j),flush=True)
+                else:
+                    print(msg, flush=True)
+                
+                success, msg = self._play_move()
+            new_hand = self.hand.cards.copy()
+        # If an exception was raised for some reason. Invalid move errors are caught, and do not end up here.
+        except Exception as msg:
+            self.plog.error(traceback.format_exc())
+            self.plog.error(msg)
+            self.EXIT_STATUS = 2
+            return False
+        # The target player is not ready, until they play "EndTurn"
+        # Value of self.min_turns doesn't seem to have an effect.
+        if (self._turns_taken_for_this_player < self.min_turns) or (self is self._curr_target and self.moskaGame.cards_to_fall) or (current_hand != new_hand):
+            self.ready = False
+            msg = f"Player set to NOT ready, because"
+            if self._turns_taken_for_this_player < self.min_turns:
+                msg += f" turns taken ({self._turns_taken_for_this_player} < {self.min_turns})"
+            if self is self._curr_target and self.moskaGame.cards_to_fall:
+                msg += f" cards on table"
+            if current_hand != new_hand:
+                msg += f" hand changed"
+            self.plog.debug(msg)
+        # Set the players rank
+        self._set_rank()
+        # Check if self has finished, and hasn't played "EndTurn"
+        # 'EndTurn' was last played, if the target changed during _play_move
+        if self.rank is not None and self is self.moskaGame.get_target_player():
+            self.plog.info(f"Player finished as target. Playing 'EndTurn'.")
+            success, msg = self.moskaGame._make_move("EndTurn",[self,[]])
+            if not success:
+                self.plog.error(msg)
+                self.EXIT_STATUS = 2
+                return False
+            self.ready = True
+        return True
+    
+    def _finish_play(self) -> None:
+        """ Called once the player has stopped playing; either finished, failed, or the game exited.
+        Logs the result and closes the loggers handlers.
+        """
         if self.EXIT_STATUS == 1:
             self.plog.info(f"Finished as {self.rank}")
-            self.ready = True
         elif self.EXIT_STATUS == 2:
             self.plog.info("Finished with error")
         # Close logger handlers
@@ -539,7 +618,7 @@ class AbstractPlayer(ABC):
         Returns:
             bool: True if played_card can fall fall_card, false otherwise
         """
-        return utils.check_can_kill_card(played_card,fall_card,self.moskaGame.trump)
+        return can_kill(played_card,fall_card,self.moskaGame.trump)
     
     def _map_to_list(self,card : Card) -> List[Card]:
         """ Return a list of cards, that the input card can fall from moskaGame.cards_to_fall
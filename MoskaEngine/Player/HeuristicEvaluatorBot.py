@@ -7,6 +7,7 @@ from ._ScoreCards import _ScoreCards
 from .AbstractEvaluatorBot import AbstractEvaluatorBot
 from typing import Dict, List,TYPE_CHECKING, Tuple
 from ..Game.GameState import FullGameState
+from ..Game.Deck import cards_to_mask, mask_to_cards
 if TYPE_CHECKING:
     from ..Game.Deck import Card
     from ..Game.Game import MoskaGame
@@ -53,17 +54,17 @@ class HeuristicEvaluatorBot(AbstractEvaluatorBot):
             return []
         # If only one card in deck, it is the trump card, so we know the card
         if len(state.deck) == 1:
-            trump_card = state.deck.cards.copy().pop()
-            trump_card.score = len(state.cards_fall_dict[trump_card])
+            trump_card = state.deck[-1]
+            self.scorer.scores[trump_card] = state.card_score(trump_card)
             return [trump_card]
         
         # Cards in self hand, cards in table and known cards are not in the deck
-        cards_not_in_deck = state.full_player_cards[self.pid] + state.fell_cards + state.cards_to_fall
+        not_in_deck_mask = cards_to_mask(state.full_player_cards[self.pid] + state.fell_cards + state.cards_to_fall)
         # Add known player cards
-        for player_pid, known_cards in enumerate(state.known_player_cards):
+        for player_pid, known_mask in enumerate(state.known_masks):
             if player_pid != self.pid:
-                cards_not_in_deck += [card for card in known_cards if card.suit != "X"]
-        cards_possibly_in_deck = set(state.cards_fall_dict.keys()).difference(cards_not_in_deck)
+                not_in_deck_mask |= known_mask
+        cards_possibly_in_deck = mask_to_cards(state.in_game_mask & ~not_in_deck_mask)
         return cards_possibly_in_deck
         
     def _calc_expected_value_from_lift(self, state : FullGameState) -> float:
@@ -75,7 +76,7 @@ class HeuristicEvaluatorBot(AbstractEvaluatorBot):
         """
         # Cards whose location is not known
         cards_possibly_in_deck = self._get_cards_possibly_in_deck(state)
-        total_possible_falls = sum((c.score for c in cards_possibly_in_deck))
+        total_possible_falls = sum((self.scorer.scores[c] for c in cards_possibly_in_deck))
         if len(cards_possibly_in_deck) == 0:
             return 0
         # Calculate the expected score of a card that is lifted from the deck
@@ -106,10 +107,10 @@ class HeuristicEvaluatorBot(AbstractEvaluatorBot):
         - Whether there is a kopled card on the table
         """
         # Cards in hand at the state
-        my_cards = state.full_player_cards[self.pid]
+        my_cards = list(state.full_player_cards[self.pid])
         # If the player is the target, we evaluate the position assuming he lifts the cards from the table
-        my_cards += state.cards_to_fall if self.pid == state.target_pid else []
-        my_cards_score = sum((c.score for c in my_cards))
+        my_cards += state.cards_to_fall if self.pid == state.target_pid else ()
+        my_cards_score = sum((self.scorer.scores[c] for c in my_cards))
         
         # Calculate the expected score of a card that is lifted from the deck
         expected_score_from_lift = self._calc_expected_value_from_lift(state)
@@ -132,7 +133,7 @@ class HeuristicEvaluatorBot(AbstractEvaluatorBot):
         avg_hand_score = (my_cards_score + from_lifted_score) / (len(my_cards) + liftn)
         # Create a linear combination of the different factors using weights from self.coefficients
         score = avg_hand_score * self.coefficients["my_cards"]
-        score += self.coefficients["kopled"] if any((c.kopled for c in state.cards_to_fall)) else 0
+        score += self.coefficients["kopled"] if state.kopled_card in state.cards_to_fall else 0
         score += len(set(my_cards)) * self.coefficients["len_set_my_cards"]
         score += missing_from_hand * self.coefficients["missing_card"]
         score += len(my_cards) * self.coefficients["len_my_cards"]
@@ -140,13 +141,10 @@ class HeuristicEvaluatorBot(AbstractEvaluatorBot):
     
     def _assign_score_to_state_cards(self, state : FullGameState) -> None:
         """ Assign score to cards in the state, based on how many cards they can fall.
+        The cards on the table and in the hands are still in the game, so only the cards in the game need a score.
         """
-        self.scorer._assign_scores_from_to(list(state.cards_fall_dict.keys()), state.cards_fall_dict)
-        self.scorer._assign_scores_from_to(state.fell_cards, state.cards_fall_dict)
-        self.scorer._assign_scores_from_to(state.cards_to_fall, state.cards_fall_dict)
-        self.scorer._assign_scores_from_to(state.full_player_cards[self.pid], state.cards_fall_dict)
-        for pid, known_cards in enumerate(state.known_player_cards):
-            self.scorer._assign_scores_from_to(known_cards, state.cards_fall_dict)
+        for card in state.cards_in_game():
+            self.scorer.scores[card] = state.card_score(card)
         return
         
     def evaluate_states(self, states: List[FullGameState]) -> List[float]:
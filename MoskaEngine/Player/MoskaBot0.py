@@ -22,7 +22,7 @@ class MoskaBot0(AbstractPlayer):
         Returns:
             str: _description_
         """
-        move = random.choice(playable)
+        move = self.rng.choice(playable)
         return move
     
     
@@ -22,7 +22,7 @@ class MoskaBot1(AbstractPlayer):
         return super()._play_move()
     
     def choose_move(self, playable: List[str]) -> str:
-        return random.choice(playable)
+        return self.rng.choice(playable)
     
     def end_turn(self) -> List[Card]:
         """Return which cards you want to pick from the table when finishing your turn.
@@ -102,9 +102,9 @@ class MoskaBot1(AbstractPlayer):
         """ Return a list of cards that will be played to target on an initiating turn. AKA playing to an empty table.
         Default: Play all the smallest cards in hand, that fit to table."""
         #self.scoring.assign_scores_inplace()
-        sm_card = min([c.score for c in self.hand])
+        sm_card = min([self.scoring.scores[c] for c in self.hand])
         hand = self.hand.copy()
-        play_cards = hand.pop_cards(cond=lambda x : x.score == sm_card,max_cards = self._fits_to_table())
+        play_cards = hand.pop_cards(cond=lambda x : self.scoring.scores[x] == sm_card,max_cards = self._fits_to_table())
         return play_cards
     
     def play_to_target(self) -> List[Card]:
@@ -119,5 +119,5 @@ class MoskaBot1(AbstractPlayer):
         if playable_values:
             #self.scoring.assign_scores_inplace()
             hand = self.hand.copy()
-            play_cards = hand.pop_cards(cond=lambda x : x.value in playable_values and x.score < 11, max_cards = self._fits_to_table())
+            play_cards = hand.pop_cards(cond=lambda x : x.value in playable_values and self.scoring.scores[x] < 11, max_cards = self._fits_to_table())
         return play_cards
@@ -43,7 +43,7 @@ class MoskaBot3(AbstractPlayer):
     
     def _play_move(self) -> Tuple[bool, str]:
         self.scoring.assign_scores_inplace()
-        self.scoring._assign_scores(self.moskaGame.card_monitor.cards_kill_dict.keys())
+        self.scoring._assign_scores(self.moskaGame.card_monitor.cards_in_game())
         return super()._play_move()
         
     def choose_move(self, playable: List[str]) -> str:
@@ -68,7 +68,7 @@ class MoskaBot3(AbstractPlayer):
         self.plog.info(f"Scores: {scores}")
         best_play = max(scores.items(),key = lambda x : x[1])
         best_plays = [(pl,score) for pl,score in scores.items() if score == best_play[1]]
-        best_play = random.choice(best_plays)
+        best_play = self.rng.choice(best_plays)
         self.plog.info(f"Playing: {best_play[0]} with score {best_play[1]}")
         #play = random.choice(playable)
         return best_play[0]
@@ -86,18 +86,18 @@ class MoskaBot3(AbstractPlayer):
     def _calc_assignment_score_from_hand(self, hcard : Card, tcard : Card) -> float:
         """ Calculate the score of playing hcard (card in hand) to tcard (card on the table).
         The smaller the score, the better."""
-        score = hcard.score - tcard.score
+        score = self.scoring.scores[hcard] - self.scoring.scores[tcard]
         # Scale the score with some value (currently not calculated [1])
         score = self.parameters.fall_card_scale_hand_play_score(hcard,tcard)*score
         return score
     
     def _calc_assignment_score_from_deck(self,deck_card : Card, tcard : Card):
-        score = deck_card.score - tcard.score
+        score = self.scoring.scores[deck_card] - self.scoring.scores[tcard]
         score = self.parameters.fall_card_scale_deck_play_score(deck_card,tcard) * score
         return score
     
     def _calc_assignment_score_to_self(self,card_in_hand : Card, card_to_self : Card):
-        score = card_in_hand.score - card_to_self.score
+        score = self.scoring.scores[card_in_hand] - self.scoring.scores[card_to_self]
         score = self.parameters.to_self_scale_play_score(card_in_hand,card_to_self)*score
         return score  
     
@@ -198,10 +198,11 @@ class MoskaBot3(AbstractPlayer):
             List[Card]: _description_
         """
         same_values = {}
-        for val in set([c.rank for c in self.hand.cards]):
+        rank_groups = self.hand.rank_groups()
+        for val in set(rank_groups):
             # A dictionary of value : List[Card], where the cards are sorted in ascending order according to score
             # For example same_values[3] : [S3,A3], where S3.score = 4, S3.score = 6
-            same_values[val] = list(sorted(filter(lambda x : x.rank == val, self.hand.cards),key=lambda x : x.score))
+            same_values[val] = sorted(rank_groups[val],key=lambda x : self.scoring.scores[x])
         fits = self._fits_to_table()
         play_cards = []
         new_play_cards = []
@@ -274,7 +275,7 @@ class MoskaBot3(AbstractPlayer):
         ncards = min(fits,len(cards))
         # Get ncards first cards from 'cards'
         play_cards = cards[0:None if ncards == len(cards) else ncards]
-        cards_score = sum([c.score for c in play_cards]) / ncards
+        cards_score = sum([self.scoring.scores[c] for c in play_cards]) / ncards
         cards_score = self.parameters.initial_play_scale_score(play_cards) * cards_score
         # Return the adjusted average score
         return cards_score
@@ -290,5 +291,5 @@ class MoskaBot3(AbstractPlayer):
         play_cards = []
         if playable_values:
             chand = self.hand.copy()
-            play_cards = chand.pop_cards(cond=lambda x : x.rank in playable_values and (x.score < 10 or len(self.moskaGame.deck) <= 0), max_cards = self._fits_to_table())
+            play_cards = chand.pop_cards(cond=lambda x : x.rank in playable_values and (self.scoring.scores[x] < 10 or len(self.moskaGame.deck) <= 0), max_cards = self._fits_to_table())
         return play_cards
\ No newline at end of file
@@ -4,7 +4,7 @@ import logging
 import numpy as np
 from .AbstractEvaluatorBot import AbstractEvaluatorBot
 from typing import Dict, List,TYPE_CHECKING, Tuple
-from ..Game.GameState import FullGameState
+from ..Game.GameState import FullGameState, encode_states
 if TYPE_CHECKING:
     from ..Game.Deck import Card
     from ..Game.Game import MoskaGame
@@ -32,8 +32,9 @@ class NNEvaluatorBot(AbstractEvaluatorBot):
         super().__init__(moskaGame, name, delay, requires_graphic, log_level, log_file, max_num_states, top_p_play, top_p_weights)
         
     def evaluate_states(self, states: List[FullGameState]) -> List[float]:
-        state_vectors = [state.as_perspective_vector(self,fmt=self.pred_format) for state in states]
-        preds = self.moskaGame.model_predict(np.array(state_vectors, dtype=np.float32), model_id=self.model_id).flatten()
+        # The simulated next states are copies of the root state, that share its unchanged attributes
+        state_vectors = encode_states(states, self, fmt=self.pred_format, parent=self._root_state if self.simulate_moves else None)
+        preds = self.moskaGame.model_predict(state_vectors, model_id=self.model_id).flatten()
         preds = preds.tolist()
         return preds
 
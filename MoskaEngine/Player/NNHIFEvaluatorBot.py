@@ -3,7 +3,7 @@ import logging
 import numpy as np
 from .AbstractHIFEvaluatorBot import AbstractHIFEvaluatorBot
 from typing import Dict, List,TYPE_CHECKING, Tuple
-from ..Game.GameState import FullGameState
+from ..Game.GameState import FullGameState, encode_states
 if TYPE_CHECKING:
     from ..Game.Deck import Card
     from ..Game.Game import MoskaGame
@@ -49,8 +49,8 @@ class NNHIFEvaluatorBot(AbstractHIFEvaluatorBot):
             return self.evaluate_states_hif(states)
     
     def evaluate_states_hif(self, states: List[FullGameState]) -> List[float]:
-        state_vectors = [state.as_perspective_vector(self,fmt=self.pred_format) for state in states]
-        states = np.array(state_vectors, dtype=np.float32)
+        # The simulated next states are copies of the root state, that share its unchanged attributes
+        states = encode_states(states, self, fmt=self.pred_format, parent=self._root_state if self.simulate_moves else None)
         preds = self.moskaGame.model_predict(states, model_id=self.model_id).flatten().tolist()
         return preds
     
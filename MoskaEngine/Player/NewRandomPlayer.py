@@ -4,11 +4,10 @@ import itertools
 import logging
 import random
 from typing import TYPE_CHECKING, Any, Dict, List, Tuple
-from ..Game.Deck import Card
+from ..Game.Deck import Card, rank_count_at_least
 if TYPE_CHECKING:
     from ..Game.Game import MoskaGame
 from .AbstractPlayer import AbstractPlayer
-from ..Game.utils import check_can_kill_card
 from ..Game.GameState import FullGameState
 
 class NewRandomPlayer(AbstractPlayer):
@@ -33,7 +32,7 @@ class NewRandomPlayer(AbstractPlayer):
         # Playable moves
         playable = self._playable_moves()
         # Return the move id to play
-        move = self.choose_move(playable)
+        move = self._choose_move_with_metrics(playable)
         state = FullGameState.from_game(self.moskaGame, copy=True)
         # Get the function to call, which returns the arguments to pass to the game
         extra_args = self.moves[move]()
@@ -55,14 +54,14 @@ class NewRandomPlayer(AbstractPlayer):
         
     def choose_move(self, playable: List[str]) -> str:
         """ Choose a random move from playable moves."""
-        play = random.choice(playable)
+        play = self.rng.choice(playable)
         return play
     
     def end_turn(self) -> List[Card]:
         """
         Choose randomly to pick the all the cards, or only the cards_to_fall
         """
-        pick_cards = random.choice([self.moskaGame.cards_to_fall.copy(),self.moskaGame.cards_to_fall.copy() + self.moskaGame.fell_cards.copy()])
+        pick_cards = self.rng.choice([self.moskaGame.cards_to_fall.copy(),self.moskaGame.cards_to_fall.copy() + self.moskaGame.fell_cards.copy()])
         return pick_cards
     
     def play_fall_card_from_hand(self) -> Dict[Card, Card]:
@@ -70,7 +69,8 @@ class NewRandomPlayer(AbstractPlayer):
         """
         #self.scoring.assign_scores_inplace()
         # Create the cost matrix
-        C = self._make_cost_matrix(scoring = lambda ch,ct : 1 if check_can_kill_card(ch,ct,self.moskaGame.trump) else 0,max_val=0)
+        # The scoring is only called for pairs, where the card can kill the card on the table
+        C = self._make_cost_matrix(scoring = lambda ch,ct : 1,max_val=0)
         self.plog.info(f"Cost matrix:\n {C}")
         hand_ind, fall_ind = C.nonzero()
         play_cards = {}
@@ -81,7 +81,7 @@ class NewRandomPlayer(AbstractPlayer):
             card_on_table = ctable[f]
             if card_from_hand in play_cards.keys() or card_on_table in play_cards.values():
                 continue
-            if random.random() < 0.5:
+            if self.rng.random() < 0.5:
                 play_cards[card_from_hand] = card_on_table
         return play_cards
     
@@ -89,15 +89,15 @@ class NewRandomPlayer(AbstractPlayer):
         """Return the card and a random card to fall with the card from the deck
         """
         can_fall = self._map_to_list(deck_card)
-        card_on_table = random.choice(can_fall)
+        card_on_table = self.rng.choice(can_fall)
         return (deck_card,card_on_table)
     
     def play_to_self(self) -> List[Card]:
         """Return a list of random cards to play to self.
         """
-        playable_values = self._playable_values_to_table()
-        playable_cards = [c for c in self.hand.copy().cards if c.rank in playable_values]
-        playable_cards = random.sample(playable_cards,random.randint(0,len(playable_cards)))
+        playable_mask = self._playable_mask_from_hand()
+        playable_cards = [c for c in self.hand.cards if c.bit & playable_mask]
+        playable_cards = self.rng.sample(playable_cards,self.rng.randint(0,len(playable_cards)))
         return playable_cards
     
     def _play_initial_old(self) -> List[Card]:
@@ -123,25 +123,26 @@ class NewRandomPlayer(AbstractPlayer):
             c = Counter([c.rank for c in play])
             if (len(play) == 1 or all((count >= 2 for count in c.values()))):
                 legal_plays.append(list(play))
-        to_play = random.choice(legal_plays)
+        to_play = self.rng.choice(legal_plays)
         return list(to_play)
     
     def play_initial(self) -> List[Card]:
         """ Return a list of cards to play from hand to an empty table.
         """
         cards_to_play = []
+        play_mask = 0
         hand_cards = self.hand.copy().cards
+        fits = self._fits_to_table()
         for i in range(10):
-            if len(cards_to_play) == self._fits_to_table() or not hand_cards:
+            if len(cards_to_play) == fits or not hand_cards:
                 break
-            card_to_play = random.choice(hand_cards)
-            cards_to_play.append(card_to_play)
-            c = Counter([c.rank for c in cards_to_play])
-            # If the play is not valid, remove the card from the play
-            if not (len(cards_to_play) == 1 or all((count >= 2 for count in c.values()))):
-                cards_to_play.remove(card_to_play)
+            card_to_play = self.rng.choice(hand_cards)
+            new_mask = play_mask | card_to_play.bit
+            # The play is valid, if it is a single card, or each rank in the play has atleast 2 cards.
             # If the play is valid, remove the card from the hand
-            else:
+            if not cards_to_play or not new_mask & ~rank_count_at_least(new_mask, 2):
+                cards_to_play.append(card_to_play)
+                play_mask = new_mask
                 hand_cards.remove(card_to_play)
         return cards_to_play
     
@@ -152,7 +153,7 @@ class NewRandomPlayer(AbstractPlayer):
         This method is meant to be overwriteable.
         Default: Play all playable values that fit.
         """
-        playable_values = self._playable_values_from_hand()
-        playable_cards = [c for c in self.hand.copy().cards if c.rank in playable_values]
-        playable_cards = random.sample(playable_cards,random.randint(0,min(len(playable_cards),self._fits_to_table())))
+        playable_mask = self._playable_mask_from_hand()
+        playable_cards = [c for c in self.hand.cards if c.bit & playable_mask]
+        playable_cards = self.rng.sample(playable_cards,self.rng.randint(0,min(len(playable_cards),self._fits_to_table())))
         return playable_cards
\ No newline at end of file
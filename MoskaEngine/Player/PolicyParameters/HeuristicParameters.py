@@ -1,6 +1,6 @@
 import random
 from ..AbstractPlayer import AbstractPlayer
-from ...Game.Deck import Card
+from ...Game.Deck import Card, cards_to_mask, mask_to_cards, mask_popcount
 
 from typing import TYPE_CHECKING, Any, Dict,Callable, List
 
@@ -56,9 +56,9 @@ class HeuristicParameters():
     def _calculate_score(self, cards_after_play : List[Card], lifted_from_deck : int, most_falls : int, e_lifted : float) -> float:
         """ Evaluate the hand after playing, or the excpected value of the hand"""
         try:
-            sc = sum((c.score for c in cards_after_play)) + self._adjust_for_missing_cards(cards_after_play,most_falls,lifted=lifted_from_deck) + self._e_score_from_lifted(e_lifted, lifted_from_deck)
+            sc = sum((self.player.scoring.scores[c] for c in cards_after_play)) + self._adjust_for_missing_cards(cards_after_play,most_falls,lifted=lifted_from_deck) + self._e_score_from_lifted(e_lifted, lifted_from_deck)
         except TypeError as te:
-            print([c.score for c in cards_after_play])
+            print([self.player.scoring.scores[c] for c in cards_after_play])
             raise TypeError(te)
         try:
             sc = sc / (len(cards_after_play) + lifted_from_deck)
@@ -71,7 +71,8 @@ class HeuristicParameters():
         This calls the corresponding method from the player, to see which cards the player is going to play"""
         
         e_lifted = self.expected_value_from_lift()
-        most_falls = max((len(falls) for card, falls in self.player.moskaGame.card_monitor.cards_kill_dict.items()))
+        card_monitor = self.player.moskaGame.card_monitor
+        most_falls = max((card_monitor.card_score(card) for card in card_monitor.cards_in_game()))
         self.player.plog.info(f"Expected score from deck: {e_lifted}")
         self.player.plog.info(f"Most falling card: {most_falls}")
         move_scores = {}
@@ -120,21 +121,20 @@ class HeuristicParameters():
         
         """
         game = self.player.moskaGame
-        cards_not_in_deck = self.player.hand.copy().cards + game.fell_cards
-        for pl, cards in game.card_monitor.player_cards.items():
+        card_monitor = game.card_monitor
+        mask_not_in_deck = self.player.hand.mask | cards_to_mask(game.fell_cards)
+        for pl, mask in card_monitor.known_masks.items():
             if pl == self.player.name:
                 continue
-            for card in cards:
-                if card != Card(-1,"X"):
-                    cards_not_in_deck.append(card)
-        self.player.plog.debug(f"Cards NOT in deck: {len(cards_not_in_deck)}")
-        cards_possibly_in_deck = set(game.card_monitor.cards_kill_dict.keys()).difference(cards_not_in_deck)
+            mask_not_in_deck |= mask
+        self.player.plog.debug(f"Cards NOT in deck: {mask_popcount(mask_not_in_deck)}")
+        cards_possibly_in_deck = mask_to_cards(card_monitor.in_game_mask & ~mask_not_in_deck)
         self.player.plog.debug(f"Cards possibly in deck: {len(cards_possibly_in_deck)}")
         try:
-            total_possible_falls = sum((c.score for c in cards_possibly_in_deck))
+            total_possible_falls = sum((self.player.scoring.scores[c] for c in cards_possibly_in_deck))
         except TypeError as te:
             print(f"Cards possibly in deck: {cards_possibly_in_deck}")
-            print([c.score for c in cards_possibly_in_deck])
+            print([self.player.scoring.scores[c] for c in cards_possibly_in_deck])
             raise TypeError(te)
         try:
             e_lifted = total_possible_falls / len(cards_possibly_in_deck)
@@ -151,9 +151,10 @@ class HeuristicParameters():
         if tcard.rank in set([c.rank for c in self.player.hand.cards]):
             scale += self.method_values["fall_card_same_value_already_in_hand"]
         # If the card has been kopled and is preventing us from kopling again
-        if tcard.kopled and len(self.player.moskaGame.deck) > 0:
+        if tcard is self.player.moskaGame.kopled_card and len(self.player.moskaGame.deck) > 0:
             scale += self.method_values["fall_card_card_is_preventing_kopling"]
-        scale = scale*(hcard.score + tcard.score)/(hcard.score - tcard.score)
+        scores = self.player.scoring.scores
+        scale = scale*(scores[hcard] + scores[tcard])/(scores[hcard] - scores[tcard])
         #scale = scale*(hcard.score - tcard.score)/tcard.score
         return scale
     
@@ -168,13 +169,15 @@ class HeuristicParameters():
                 break
         if can_fall_with_other_cards:
             scale += self.method_values["fall_card_deck_card_not_played_to_unique"]
-        scale = scale*(deck_card.score + tcard.score) / (deck_card.score - tcard.score)
+        scores = self.player.scoring.scores
+        scale = scale*(scores[deck_card] + scores[tcard]) / (scores[deck_card] - scores[tcard])
         #scale = scale*(hcard.score - tcard.score)/(tcard.score + deck_card.score)
         return scale
     
     def to_self_scale_play_score(self, card_in_hand: Card, card_to_self: Card):
         scale = 1#(card_in_hand.score - card_to_self.score)/card_to_self.score
-        scale = scale*(card_in_hand.score + card_to_self.score) / (card_in_hand.score - card_to_self.score)
+        scores = self.player.scoring.scores
+        scale = scale*(scores[card_in_hand] + scores[card_to_self]) / (scores[card_in_hand] - scores[card_to_self])
         return scale
     
     def fall_card_maximum_play_score_from_hand(self, **kwargs):
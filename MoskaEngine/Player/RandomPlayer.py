@@ -14,7 +14,7 @@ class RandomPlayer(AbstractPlayer):
         super().__init__(moskaGame, name, delay, requires_graphic, log_level, log_file)
     
     def choose_move(self, playable: List[str]) -> str:
-        return random.choice(playable)
+        return self.rng.choice(playable)
     
     def play_fall_card_from_hand(self) -> Dict[Card, Card]:
         """Select random card-in-hand : card-on-table pairs
@@ -27,8 +27,8 @@ class RandomPlayer(AbstractPlayer):
             poss_plays[card] = self._map_to_list(card)
         out = {}
         for card, plays in poss_plays.items():
-            if plays and random.random() > 0.3:
-                play = random.choice(plays)
+            if plays and self.rng.random() > 0.3:
+                play = self.rng.choice(plays)
                 if play not in out.values():
                     out[card] = play
         return out
@@ -39,22 +39,22 @@ class RandomPlayer(AbstractPlayer):
         Returns:
             List[Card]: _description_
         """
-        return [random.choice(self.hand.cards)]
+        return [self.rng.choice(self.hand.cards)]
     
     def play_to_self(self) -> List[Card]:
         playb_vals = self._playable_values_from_hand()
         chand = self.hand.copy()
         play_val = playb_vals.pop()
-        return chand.pop_cards(cond=lambda x : x.value == play_val,max_cards=random.randint(0,len(self.hand)))
+        return chand.pop_cards(cond=lambda x : x.value == play_val,max_cards=self.rng.randint(0,len(self.hand)))
     
     def play_to_target(self) -> List[Card]:
         playb_vals = self._playable_values_from_hand()
         chand = self.hand.copy()
         play_val = playb_vals.pop()
-        return chand.pop_cards(cond=lambda x : x.value == play_val,max_cards=random.randint(0,self._fits_to_table()))
+        return chand.pop_cards(cond=lambda x : x.value == play_val,max_cards=self.rng.randint(0,self._fits_to_table()))
     
     def deck_lift_fall_method(self, deck_card: Card) -> Tuple[Card, Card]:
-        return (deck_card, random.choice(self.moskaGame.cards_to_fall))
+        return (deck_card, self.rng.choice(self.moskaGame.cards_to_fall))
     
     def end_turn(self) -> List[Card]:
         return self.moskaGame.cards_to_fall
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING, List, Iterable, Callable
+from typing import TYPE_CHECKING, Dict, List, Iterable, Callable
 if TYPE_CHECKING:
     from ..Game.Deck import Card
     from AbstractPlayer import AbstractPlayer
@@ -9,10 +9,12 @@ class _ScoreCards:
     Each player who uses a scoring system, has a separate instance of this class.
     This class is used to assing scores to cards in the players hand, and in the table,
     to determine which cards are the best to play.
+    The cards are shared by all games, so the scores are stored here, and read with 'scores[card]'.
     """
     default_method : Callable = None
     player : AbstractPlayer = None
     methods : dict[str,Callable] = {}
+    scores : Dict[Card,int] = {}        # The latest score assigned to each card
     
     def __init__(self,player : AbstractPlayer,
                  default_method : Callable | str = "basic",
@@ -25,6 +27,7 @@ class _ScoreCards:
         self.default_method = self.methods[default_method]
         self.methods["default"] = self.default_method
         self.player = player
+        self.scores = {}
         
     def _assign_scores_from_to(self, cards : List[Card], card_counter : dict[Card,List[Card]]):
         """ Assign scores to cards in the input list, using the card_counter.
@@ -34,16 +37,15 @@ class _ScoreCards:
         for card in cards:
             # Only assign score if card is in card_counter. We cant assign a score to unknown cards in the player hand
             if card in card_counter:
-                card.score = len(card_counter[card])
-            #card.score = len(card_counter[card])
+                self.scores[card] = len(card_counter[card])
         return cards
     
     def assign_scores_inplace(self, method : str = "default") -> None:
-        """ Assign scores to cards in the players hand and in the table inplace. The method
+        """ Assign scores to cards in the players hand and in the table. The method
         is the value at 'default' key in self.methods, which is defined at __init__.
         """
-        self.player.moskaGame.cards_to_fall = self._assign_scores(self.player.moskaGame.cards_to_fall,method)
-        self.player.hand.cards = self._assign_scores(self.player.hand.cards,method)
+        self._assign_scores(self.player.moskaGame.cards_to_fall,method)
+        self._assign_scores(self.player.hand.cards,method)
         return
 
     def get_sm_score_in_list(self, cards : List[Card]) -> int:
@@ -53,16 +55,16 @@ class _ScoreCards:
         if not cards:
             return None
         try:
-            sm_score = min((c.score for c in cards))
+            sm_score = min((self.scores[c] for c in cards))
         except Exception as e:
             print(e)
             print(f"Assign scores to cards first")
             raise Exception(e)
-        return list(filter(lambda x : x.score == sm_score,cards))[0]
+        return list(filter(lambda x : self.scores[x] == sm_score,cards))[0]
     
     def _count_cards_score(self, card : Card):
         """ Return how many cards can the input card fall. Uses the card_monitor to count the cards."""
-        return len(self.player.moskaGame.card_monitor.cards_kill_dict[card])
+        return self.player.moskaGame.card_monitor.card_score(card)
     
     def _basic_count_score(self,card : Card) -> int:
         """Return how many cards can the input card fall;
@@ -83,18 +85,17 @@ class _ScoreCards:
             return 12 - (14 - card.rank)
     
     def _assign_scores(self, cards : Iterable[Card],method : Callable = "default") -> List[Card]:
-        """Create new Card instances, with the Card instances from Iterable.
-        Return the new cards
+        """Assign a score to each card in the Iterable, and return the cards as a list.
 
         Args:
-            cards (Iterable[Card]): The cards which are copied to the new list of cards, along with the score
+            cards (Iterable[Card]): The cards to score
             
         Returns:
-            List[Card]: list of the same cards, with a score -attribute
+            List[Card]: list of the same cards, whose scores are in self.scores
         """
         method = self.methods[method]
         new_cards = []
         for card in cards:
-            card.score = method(card)
+            self.scores[card] = method(card)
             new_cards.append(card)
         return new_cards
\ No newline at end of file
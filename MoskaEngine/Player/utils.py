@@ -1,7 +1,6 @@
 from typing import Callable, Dict, List, Tuple, Set
 import numpy as np
-from ..Game.Deck import Card
-from ..Game import utils
+from ..Game.Deck import Card, KILL_MASKS, KILL_TABLES
 
 class Assignment:
     """ An assignment is a mapping from cards in the hand to cards on the table.
@@ -27,7 +26,8 @@ class Assignment:
 def _map_to_list(card : Card, to : List[Card], trump : str) -> List[Card]:
     """ Return a list of cards, that the input card can fall from `to` list of cards.
     """
-    return [c for c in to if utils.check_can_kill_card(card,c,trump)]
+    kill_mask = KILL_MASKS[trump][card.id]
+    return [c for c in to if c.bit & kill_mask]
 
 def _map_each_to_list(from_ : List[Card] , to : List[Card], trump : str) -> Dict[Card,List[Card]]:
     """Map each card in hand, to cards on the table, that can be fallen. Returns a dictionary of from_c : List_t pairs.
@@ -46,18 +46,12 @@ def _make_cost_matrix(from_ : List[Card], to : List[Card], trump : str, scoring
     TODO: Reverse this, so bigger values are better, and smaller values are worse.
 
     """
-    can_fall = _map_each_to_list(from_,to,trump)
     # Initialize the cost matrix (NOTE: Using inf to denote large values does not work for Scipy)
     C = np.full((len(from_),len(to)),max_val)
-    #self.plog.info(f"can_fall: {can_fall}")
-    for card, falls in can_fall.items():
-        # If there are no cards on the table, that card can fall, continue
-        if not falls:
-            continue
-        card_index = from_.index(card)
-        fall_indices = [to.index(c) for c in falls]
-        scores = [scoring(card,c) for c in falls]
-        C[card_index][fall_indices] = scores
+    # Slice the valid assignments from the kill table
+    can_fall = KILL_TABLES[trump][np.ix_([c.id for c in from_], [c.id for c in to])]
+    for i, j in zip(*np.nonzero(can_fall)):
+        C[i,j] = scoring(from_[i],to[j])
     return C
 
 def _get_single_assignments(matrix : np.ndarray) -> List[List[int]]:
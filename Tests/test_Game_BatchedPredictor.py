@@ -0,0 +1,57 @@
+import threading
+import unittest
+import numpy as np
+from MoskaEngine.Game.BatchedPredictor import BatchedPredictor
+from MoskaEngine.Play.PlayerWrapper import PlayerWrapper
+from MoskaEngine.Play.Simulate import play_games_batched
+from MoskaEngine.Player.MoskaBot3 import MoskaBot3
+from MoskaEngine.Player.NNEvaluatorBot import NNEvaluatorBot
+
+def _sum_model(X, model_id):
+    """ A stand-in for a model, that doesn't require tensorflow. Returns shape (1, nsamples, 1). """
+    return X.sum(axis=1, keepdims=True)[np.newaxis]
+
+class TestBatchedPredictor(unittest.TestCase):
+
+    def test_predictions_are_split_back(self):
+        predictor = BatchedPredictor(_sum_model)
+        nthreads = 8
+        results = {}
+        for _ in range(nthreads):
+            predictor.add_game()
+        def request(i):
+            X = np.full((i + 1, 3), i, dtype=np.float32)
+            results[i] = predictor.predict(X, model_id=0)
+            predictor.remove_game()
+        threads = [threading.Thread(target=request, args=(i,)) for i in range(nthreads)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        for i in range(nthreads):
+            self.assertEqual(results[i].shape, (1, i + 1, 1))
+            self.assertTrue(np.all(results[i] == 3*i))
+        # All threads were waiting, so the predictions were made with one call
+        self.assertEqual(predictor.ncalls, 1)
+        self.assertEqual(predictor.nrequests, nthreads)
+
+    def test_error_is_raised_in_game(self):
+        def failing_model(X, model_id):
+            raise ValueError("Model failed")
+        predictor = BatchedPredictor(failing_model)
+        predictor.add_game()
+        with self.assertRaises(ValueError):
+            predictor.predict(np.zeros((1, 3)), model_id=0)
+
+    def test_play_games_batched(self):
+        predictor = BatchedPredictor(_sum_model)
+        players = [PlayerWrapper(NNEvaluatorBot, {"name" : "nn1", "model_id" : 0, "pred_format" : "bitmap"}),
+                   PlayerWrapper(MoskaBot3, {"name" : "mb2"}),
+                   PlayerWrapper(MoskaBot3, {"name" : "mb3"}),
+                   ]
+        gamekwargs = {"log_file" : "", "gather_data" : False, "timeout" : 60}
+        results = play_games_batched(players, gamekwargs, ngames=4, max_games_at_once=4, verbose=False, predictor=predictor)
+        self.assertEqual(len(results), 4)
+        self.assertNotIn(None, results)
+        self.assertGreater(predictor.nrequests, 0)
+        self.assertLess(predictor.ncalls, predictor.nrequests)
@@ -0,0 +1,53 @@
+import unittest
+from MoskaEngine.Game.Game import MoskaGame
+from MoskaEngine.Game.CardMonitor import CardMonitor
+from MoskaEngine.Game.Deck import Card, UNKNOWN_CARD, CARDS_BY_ID
+from MoskaEngine.Game.UndoJournal import UndoJournal
+from MoskaEngine.Game.utils import check_can_kill_card
+from MoskaEngine.Player.MoskaBot3 import MoskaBot3
+
+class TestCardMonitor(unittest.TestCase):
+    def setUp(self):
+        self.game = MoskaGame(players=[MoskaBot3(name = "mb1"), MoskaBot3(name = "mb2")], log_level=0, gather_data=False, trusted=True)
+        self.game.trump = "H"
+        self.monitor = CardMonitor(self.game)
+        self.monitor.make_cards_kill_dict()
+        self.monitor.player_cards = {"mb1" : [UNKNOWN_CARD]*6, "mb2" : [UNKNOWN_CARD]*6}
+
+    def test_cards_kill_dict(self):
+        removed = [Card(2,"H"), Card(14,"S"), Card(9,"C")]
+        self.monitor.remove_from_game(removed)
+        kill_dict = self.monitor.cards_kill_dict
+        in_game = [card for card in CARDS_BY_ID if card not in removed]
+        self.assertEqual(list(kill_dict.keys()), in_game)
+        for card in in_game:
+            falls = [c for c in in_game if check_can_kill_card(card, c, "H")]
+            self.assertEqual(kill_dict[card], falls)
+            self.assertEqual(self.monitor.card_score(card), len(falls))
+        # The view is cached until the cards in the game change
+        self.assertIs(kill_dict, self.monitor.cards_kill_dict)
+        self.monitor.cards_kill_dict = {card : [] for card in in_game[:3]}
+        self.assertEqual(self.monitor.cards_in_game(), in_game[:3])
+
+    def test_update_known(self):
+        self.monitor.update_known("mb1", [Card(5,"S"), Card(3,"C")], add=True)
+        self.assertEqual(self.monitor.player_cards["mb1"], [UNKNOWN_CARD]*6 + [Card(3,"C"), Card(5,"S")])
+        # Removing a card, that is not known, removes an unknown card
+        self.monitor.update_known("mb1", [Card(3,"C"), Card(10,"D")], add=False)
+        self.assertEqual(self.monitor.player_cards["mb1"], [UNKNOWN_CARD]*5 + [Card(5,"S")])
+        self.assertEqual(self.monitor.ncards("mb1"), 6)
+        with self.assertRaises(ValueError):
+            self.monitor.update_known("mb2", [UNKNOWN_CARD]*7, add=False)
+
+    def test_rollback(self):
+        journal = UndoJournal()
+        self.game.undo_journal = journal
+        before = (self.monitor.player_cards, self.monitor.cards_kill_dict)
+        self.monitor.update_known("mb2", [Card(7,"D")], add=True)
+        self.monitor.remove_from_game([Card(7,"H"), Card(8,"H")])
+        self.assertNotEqual(before, (self.monitor.player_cards, self.monitor.cards_kill_dict))
+        journal.rollback()
+        self.assertEqual(before, (self.monitor.player_cards, self.monitor.cards_kill_dict))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,25 +1,39 @@
+import random
 import unittest
 from collections import Counter
+import copy
+import pickle
 import sys
 import os
-from MoskaEngine.Game.Deck import Card, StandardDeck
+from MoskaEngine.Game.Deck import Card, StandardDeck, UNKNOWN_CARD, UNKNOWN_CARD_ID, cards_to_mask, mask_to_cards, mask_ranks, rank_spread, mask_popcount, CARDS_BY_ID, KILL_TABLES, can_kill
+from MoskaEngine.Game.utils import check_can_kill_card
 
 class TestCard(unittest.TestCase):
     def test_card_attributes(self):
-        card = Card(5, "S", kopled=True, score=10)
+        card = Card(5, "S")
         self.assertEqual(card.rank, 5)
         self.assertEqual(card.suit, "S")
-        self.assertTrue(card.kopled)
-        self.assertEqual(card.score, 10)
-        # Check that raises TypeError if setting value or suit again
+        # Check that raises TypeError if setting any attribute, since the cards are shared
         with self.assertRaises(TypeError):
             card.rank = 10
         with self.assertRaises(TypeError):
             card.suit = "H"
-        card.kopled = False
-        card.score = 5
-        self.assertFalse(card.kopled)
-        self.assertEqual(card.score, 5)
+        with self.assertRaises(TypeError):
+            card.score = 5
+        with self.assertRaises(ValueError):
+            Card(1, "S")
+        
+    def test_card_ids(self):
+        # Each card is a single instance, with a unique id, that is its index in an unshuffled deck
+        self.assertIs(Card(5, "S"), Card(5, "S"))
+        self.assertEqual([card.id for card in StandardDeck(shuffle=False).cards], list(range(52)))
+        self.assertIs(Card.from_id(Card(12, "D").id), Card(12, "D"))
+        self.assertIs(Card(-1, "X"), UNKNOWN_CARD)
+        self.assertEqual(UNKNOWN_CARD.id, UNKNOWN_CARD_ID)
+        # Copying or pickling a card returns the same instance
+        card = Card(14, "H")
+        self.assertIs(copy.deepcopy([card])[0], card)
+        self.assertIs(pickle.loads(pickle.dumps(card)), card)
         
     def test_card_hash(self):
         card1 = Card(5, "S")
@@ -42,6 +56,30 @@ class TestCard(unittest.TestCase):
         self.assertTrue(card1 == Card(5, "S"))
         self.assertFalse(card1 == card2)
 
+    def test_card_masks(self):
+        cards = [Card(5, "S"), Card(14, "C"), Card(2, "D")]
+        mask = cards_to_mask(cards + [UNKNOWN_CARD])
+        # The unknown card has no bit
+        self.assertEqual(mask_popcount(mask), 3)
+        self.assertEqual(mask_to_cards(mask), [Card(2, "D"), Card(5, "S"), Card(14, "C")])
+        self.assertEqual(mask_ranks(mask), {2, 5, 14})
+        self.assertEqual(mask_ranks(0), set())
+        spread = mask_to_cards(rank_spread(mask))
+        self.assertEqual(len(spread), 12)
+        self.assertEqual(set((c.rank for c in spread)), {2, 5, 14})
+
+    def test_kill_tables(self):
+        # The precomputed tables must agree with check_can_kill_card for every trump and pair of cards
+        for trump, table in KILL_TABLES.items():
+            for kill_card in CARDS_BY_ID:
+                for killed_card in CARDS_BY_ID:
+                    expected = check_can_kill_card(kill_card, killed_card, trump)
+                    self.assertEqual(table[kill_card.id, killed_card.id], expected)
+                    self.assertEqual(can_kill(kill_card, killed_card, trump), expected)
+        # The unknown card kills nothing, and can not be killed
+        self.assertFalse(can_kill(Card(14, "S"), UNKNOWN_CARD, "S"))
+        self.assertFalse(can_kill(UNKNOWN_CARD, Card(2, "S"), "S"))
+
 class TestStandardDeck(unittest.TestCase):
     def test_deck_creation(self):
         deck = StandardDeck(shuffle=False)
@@ -68,6 +106,28 @@ class TestStandardDeck(unittest.TestCase):
         self.assertEqual(len(deck), 37)
         self.assertEqual(len(cards), 10)
         self.assertEqual(Counter(card.rank for card in cards), {3 : 3, 4: 4, 5: 3})
+        # Undoing a draw only requires restoring the top pointer
+        top = deck.top
+        cards = deck.pop_cards(40)
+        self.assertEqual(len(cards), 37)
+        self.assertEqual(deck.pop_cards(1), [])
+        deck.top = top
+        self.assertEqual(deck.cards, cards)
+
+    def test_deck_add_cards(self):
+        deck = StandardDeck(shuffle=False)
+        cards = deck.pop_cards(3)
+        deck.place_to_bottom(cards[0])
+        deck.add(cards[1:], shuffle=False)
+        self.assertEqual(len(deck), 52)
+        self.assertEqual(deck.cards[-3:], cards)
+        self.assertEqual(sorted(card.id for card in deck.cards), list(range(52)))
+
+    def test_deck_rng(self):
+        global_state = random.getstate()
+        self.assertEqual(StandardDeck(seed=1).cards, StandardDeck(rng=random.Random(1)).cards)
+        self.assertNotEqual(StandardDeck(seed=1).cards, StandardDeck(seed=2).cards)
+        self.assertEqual(global_state, random.getstate())
         
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,98 @@
+import unittest
+from types import SimpleNamespace
+import warnings
+import numpy as np
+from MoskaEngine.Game.Deck import Card, UNKNOWN_CARD, CARDS_BY_ID
+from MoskaEngine.Game.GameState import FullGameState, encode_states
+
+def _make_state():
+    hands = [[Card(2,"S"), Card(14,"H")], [Card(5,"D")]]
+    known = [[UNKNOWN_CARD, Card(14,"H")], [UNKNOWN_CARD]]
+    in_game = {card : [] for card in CARDS_BY_ID[:40]}
+    return FullGameState(CARDS_BY_ID[20:30], known, hands, [], [Card(3,"C")], in_game, [False, True], [True, True], 0, 1, "H", Card(11,"H"))
+
+class TestFullGameState(unittest.TestCase):
+    def test_layout(self):
+        state = _make_state()
+        self.assertEqual(state.deck, CARDS_BY_ID[20:30])
+        self.assertEqual(state.known_player_cards, [[UNKNOWN_CARD, Card(14,"H")], [UNKNOWN_CARD]])
+        self.assertEqual(state.player_ncards(), [2, 1])
+        self.assertEqual(list(state.cards_fall_dict.keys()), list(CARDS_BY_ID[:40]))
+        self.assertEqual(state.card_score(Card(5,"D")), len(state.cards_fall_dict[Card(5,"D")]))
+        self.assertFalse(hasattr(state, "__dict__"))
+
+    def test_copy(self):
+        state = _make_state()
+        new = state.copy()
+        for name in FullGameState.__slots__:
+            self.assertIs(getattr(new, name), getattr(state, name))
+        new.set_player_cards(0, [Card(2,"S")])
+        new.set_known_cards(1, Card(5,"D").bit, 0)
+        self.assertEqual(state.full_player_cards[0], (Card(2,"S"), Card(14,"H")))
+        self.assertEqual(state.known_player_cards[1], [UNKNOWN_CARD])
+        self.assertEqual(new.full_player_cards, ((Card(2,"S"),), (Card(5,"D"),)))
+        self.assertEqual(new.known_player_cards[1], [Card(5,"D")])
+
+    def test_zobrist_hash(self):
+        state = _make_state()
+        new = state.copy()
+        self.assertEqual(new.zobrist_hash, state.zobrist_hash)
+        new.set_player_cards(0, [Card(2,"S")])
+        new.in_game_mask &= ~Card(5,"D").bit
+        self.assertNotEqual(new.zobrist_hash, state.zobrist_hash)
+        # The order of the cards doesn't change the hash
+        new.set_player_cards(0, [Card(14,"H"), Card(2,"S")])
+        new.in_game_mask |= Card(5,"D").bit
+        self.assertEqual(new.zobrist_hash, state.zobrist_hash)
+        new.players_ready = (True, True)
+        self.assertEqual(new.zobrist_hash, _hash_from_scratch(new))
+
+    def test_encode_states(self):
+        state = _make_state()
+        other = state.copy()
+        other.kopled_card = Card(3,"C")
+        other.fell_cards = (Card(4,"H"),)
+        other.target_pid = 0
+        other.players_in_game = (True, False)
+        states = [state, other]
+        for pid in range(2):
+            player = SimpleNamespace(pid=pid)
+            for fmt in ["bitmap", "new-algbr", "old-algbr"]:
+                encoded = encode_states(states, player, fmt)
+                # The algebraic formats of as_perspective_vector are deprecated
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore", DeprecationWarning)
+                    expected = np.array([st.as_perspective_vector(player, fmt=fmt) for st in states], dtype=np.float32)
+                self.assertEqual(encoded.dtype, np.float32)
+                self.assertTrue(np.array_equal(encoded, expected))
+        with self.assertRaises(NameError):
+            encode_states(states, player, "new")
+
+    def test_encode_states_with_parent(self):
+        parent = _make_state()
+        states = []
+        for i in range(80):
+            state = parent.copy()
+            if i % 2:
+                state.set_player_cards(0, [Card(2,"S")])
+                state.cards_to_fall = (Card(3,"C"), Card(14,"H"))
+            if i % 3 == 0:
+                state.fell_cards = (Card(4,"H"),)
+                state.in_game_mask &= ~Card(4,"H").bit
+            if i % 5 == 0:
+                state.players_ready = (True, True)
+            states.append(state)
+        player = SimpleNamespace(pid=0)
+        for fmt in ["bitmap", "new-algbr", "old-algbr"]:
+            self.assertTrue(np.array_equal(encode_states(states, player, fmt, parent=parent), encode_states(states, player, fmt)))
+            # The states not sharing attributes with the parent are encoded correctly
+            self.assertTrue(np.array_equal(encode_states(states, player, fmt, parent=_make_state()), encode_states(states, player, fmt)))
+
+def _hash_from_scratch(state):
+    """ Compute the hash of a state from scratch. """
+    new = state.copy()
+    object.__setattr__(new, "_zobrist", None)
+    return new.zobrist_hash
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+from types import SimpleNamespace
+from collections import Counter
+import random
+from MoskaEngine.Game.Deck import Card, StandardDeck, CARDS_BY_ID, RANK_MASKS, cards_to_mask, rank_count_at_least
+from MoskaEngine.Game.Hand import MoskaHand
+from MoskaEngine.Game.UndoJournal import UndoJournal
+
+class TestMoskaHand(unittest.TestCase):
+    def setUp(self):
+        # The hand only needs the deck of the game
+        self.game = SimpleNamespace(deck=StandardDeck(shuffle=False))
+        self.hand = MoskaHand(self.game)
+
+    def test_mask_follows_modifications(self):
+        hand = self.hand
+        self.assertEqual(hand.cards, [Card(2,"C"), Card(2,"D"), Card(2,"H"), Card(2,"S"), Card(3,"C"), Card(3,"D")])
+        hand.draw(2)
+        hand.add([Card(14,"S")])
+        hand.cards += [Card(10,"H")]
+        self.assertEqual(hand.mask, cards_to_mask(hand.cards))
+        hand.pop_cards(cond=lambda c : c.rank == 2, max_cards=3)
+        hand.pop_mask(Card(14,"S").bit)
+        hand.cards.remove(Card(10,"H"))
+        self.assertEqual(hand.mask, cards_to_mask(hand.cards))
+        self.assertEqual(hand.cards, [Card(2,"S"), Card(3,"C"), Card(3,"D"), Card(3,"H"), Card(3,"S")])
+        # Rolling back the undo journal restores the list in place
+        journal = UndoJournal()
+        journal.save_contents(hand.cards)
+        hand.draw(1)
+        journal.rollback()
+        self.assertEqual(hand.mask, cards_to_mask(hand.cards))
+        self.assertEqual(len(hand), 5)
+        # The copy has its own cards
+        chand = hand.copy()
+        chand.pop_cards(max_cards=2)
+        self.assertEqual(len(hand), 5)
+        self.assertEqual(chand.mask, cards_to_mask(chand.cards))
+
+    def test_rank_and_suit_queries(self):
+        hand = self.hand
+        hand.cards = [Card(9,"H"), Card(3,"D"), Card(9,"C"), Card(12,"H"), Card(3,"S"), Card(9,"S")]
+        self.assertEqual(hand.cards_of_rank(9), [Card(9,"C"), Card(9,"H"), Card(9,"S")])
+        self.assertEqual(hand.cards_of_rank(5), [])
+        self.assertEqual(hand.cards_of_suit("H"), [Card(9,"H"), Card(12,"H")])
+        self.assertEqual(hand.ranks(), {3, 9, 12})
+        self.assertEqual(hand.ranks_with_at_least(2), {3, 9})
+        self.assertEqual(hand.ranks_with_at_least(3), {9})
+        self.assertEqual(hand.ranks_with_at_least(4), set())
+        self.assertEqual(hand.rank_groups(min_cards=2), {9 : [Card(9,"H"), Card(9,"C"), Card(9,"S")], 3 : [Card(3,"D"), Card(3,"S")]})
+        self.assertEqual(list(hand.rank_groups()), [9, 3, 12])
+
+    def test_rank_count_at_least(self):
+        rng = random.Random(0)
+        for _ in range(200):
+            cards = rng.sample(CARDS_BY_ID, rng.randint(0, 20))
+            counts = Counter((c.rank for c in cards))
+            for n in range(1, 5):
+                expected = sum((RANK_MASKS[rank] for rank, count in counts.items() if count >= n))
+                self.assertEqual(rank_count_at_least(cards_to_mask(cards), n), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
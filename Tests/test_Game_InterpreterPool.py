@@ -0,0 +1,134 @@
+import os
+import tempfile
+import threading
+import unittest
+import numpy as np
+from MoskaEngine.Game.InterpreterPool import InterpreterPool, bucket_sizes, get_interpreter_pool, clear_interpreter_pools
+
+class _SumInterpreter:
+    """ A stand-in for a tflite interpreter, that doesn't require tensorflow. The output is the sum of each sample. """
+    def __init__(self, sample_shape=(3,)):
+        self.shape = np.array((1,) + sample_shape)
+        self.nallocations = 0
+        self.ninvokes = 0
+        self.input = None
+        self.output = None
+
+    def get_input_details(self):
+        return [{"index" : 0, "shape" : self.shape.copy(), "dtype" : np.float32}]
+
+    def get_output_details(self):
+        return [{"index" : 1, "shape" : np.array((self.shape[0], 1)), "dtype" : np.float32}]
+
+    def resize_tensor_input(self, index, shape):
+        self.shape = np.array(shape)
+
+    def allocate_tensors(self):
+        self.nallocations += 1
+
+    def set_tensor(self, index, X):
+        assert tuple(X.shape) == tuple(self.shape)
+        self.input = X.copy()
+
+    def invoke(self):
+        self.ninvokes += 1
+        self.output = self.input.reshape(len(self.input), -1).sum(axis=1, keepdims=True)
+
+    def get_tensor(self, index):
+        return self.output.copy()
+
+
+class TestInterpreterPool(unittest.TestCase):
+
+    def test_bucket_sizes(self):
+        self.assertEqual(bucket_sizes(1), [1])
+        self.assertEqual(bucket_sizes(8), [1, 2, 4, 8])
+        self.assertEqual(bucket_sizes(12), [1, 2, 4, 8, 12])
+        with self.assertRaises(ValueError):
+            bucket_sizes(0)
+
+    def test_predictions_are_padded_and_chunked(self):
+        created = []
+        def factory():
+            created.append(_SumInterpreter())
+            return created[-1]
+        pool = InterpreterPool("sum.tflite", max_batch_size=8, interpreter_factory=factory)
+        self.assertEqual(sorted(pool.interpreters), [1, 2, 4, 8])
+        # Every interpreter is allocated and invoked once when the pool is created
+        self.assertTrue(all((interp.nallocations == 1 and interp.ninvokes == 1 for interp in pool.interpreters.values())))
+        rng = np.random.default_rng(0)
+        for n in [1, 3, 8, 5, 2, 20, 5, 0]:
+            X = rng.random((n, 3), dtype=np.float32)
+            out = pool.predict(X)
+            self.assertEqual(out.shape, (n, 1))
+            np.testing.assert_allclose(out, X.sum(axis=1, keepdims=True), rtol=1e-6)
+        # Predicting doesn't allocate the tensors again
+        self.assertTrue(all((interp.nallocations == 1 for interp in created)))
+        # The padding rows are zeros, also after a larger prediction in the same bucket
+        self.assertTrue(np.all(pool.interpreters[8].input[5:] == 0))
+
+    def test_channel_dimension_and_threads(self):
+        pool = InterpreterPool("sum.tflite", max_batch_size=16, interpreter_factory=lambda : _SumInterpreter(sample_shape=(4,1)))
+        results = {}
+        def request(i):
+            X = np.full((i + 1, 4), i, dtype=np.float32)
+            results[i] = pool.predict(X)
+        threads = [threading.Thread(target=request, args=(i,)) for i in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        for i in range(20):
+            self.assertEqual(results[i].shape, (i + 1, 1))
+            self.assertTrue(np.all(results[i] == 4*i))
+
+    def test_buckets_predict_concurrently(self):
+        invoked = threading.Event()
+        release = threading.Event()
+        class _BlockingInterpreter(_SumInterpreter):
+            def invoke(self):
+                # Block the predictions of the largest bucket, but not its pre-warming
+                if self.shape[0] == 8 and self.ninvokes > 0:
+                    invoked.set()
+                    release.wait(timeout=5)
+                super().invoke()
+        pool = InterpreterPool("sum.tflite", max_batch_size=8, interpreter_factory=_BlockingInterpreter)
+        blocked = threading.Thread(target=pool.predict, args=(np.ones((5, 3), dtype=np.float32),))
+        blocked.start()
+        invoked.wait(timeout=5)
+        # A prediction with a smaller bucket doesn't wait for the largest bucket
+        out = pool.predict(np.ones((2, 3), dtype=np.float32))
+        self.assertTrue(blocked.is_alive())
+        release.set()
+        blocked.join()
+        np.testing.assert_array_equal(out, [[3], [3]])
+
+    def test_registry_shares_pools(self):
+        nloads = []
+        def factory():
+            nloads.append(1)
+            return _SumInterpreter()
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "model.tflite")
+            open(path, "wb").close()
+            pools = []
+            def request():
+                pools.append(get_interpreter_pool(path, max_batch_size=4, interpreter_factory=factory))
+            threads = [threading.Thread(target=request) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            # The model is loaded once (one interpreter per bucket), and every caller gets the same pool
+            self.assertEqual(len(nloads), 3)
+            self.assertTrue(all((pool is pools[0] for pool in pools)))
+            self.assertIs(get_interpreter_pool(os.path.join(folder, ".", "model.tflite"), max_batch_size=4), pools[0])
+            # A different bucket cap or a modified file is loaded again
+            self.assertIsNot(get_interpreter_pool(path, max_batch_size=2, interpreter_factory=factory), pools[0])
+            os.utime(path, (0, 0))
+            self.assertIsNot(get_interpreter_pool(path, max_batch_size=4, interpreter_factory=factory), pools[0])
+            clear_interpreter_pools()
+
+
+if __name__ == '__main__':
+    unittest.main()
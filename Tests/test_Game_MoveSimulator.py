@@ -0,0 +1,70 @@
+import unittest
+from MoskaEngine.Game.Game import MoskaGame
+from MoskaEngine.Game.GameState import FullGameState
+from MoskaEngine.Game.MoveSimulator import apply_move
+from MoskaEngine.Player.HeuristicEvaluatorBot import HeuristicEvaluatorBot
+
+def _state_fields(state : FullGameState):
+    return (state.deck,
+            state.known_player_cards,
+            state.full_player_cards,
+            state.fell_cards,
+            state.cards_to_fall,
+            state.kopled_card if state.kopled_card in state.cards_to_fall else None,
+            state.cards_fall_dict,
+            state.players_ready,
+            state.players_in_game,
+            state.tc_index,
+            state.target_pid,
+            )
+
+class TestMoveSimulator(unittest.TestCase):
+    def test_apply_move_equals_mock_move(self):
+        """ Play games with evaluator bots making mock moves on the game,
+        and check that simulating each mock move gives the same state, without changing the original state.
+        """
+        orig_mock_move = MoskaGame._make_mock_move
+        nchecked = []
+        def checked_mock_move(game, move, args, state_fmt="FullGameState"):
+            before = FullGameState.from_game(game, copy=True)
+            before_fields = _state_fields(FullGameState.from_game(game, copy=True))
+            new_state = orig_mock_move(game, move, args, state_fmt)
+            before.compute_zobrist_hash()
+            simulated = apply_move(before, move, args)
+            self.assertEqual(_state_fields(simulated), _state_fields(new_state), f"Simulated move {move} differs")
+            # The incrementally updated hash equals the hash computed from scratch
+            self.assertEqual(simulated.zobrist_hash, new_state.zobrist_hash)
+            self.assertEqual(_state_fields(before), before_fields, f"Simulating {move} changed the state")
+            nchecked.append(move)
+            return new_state
+        for nplayers in [2, 4]:
+            players = [HeuristicEvaluatorBot(name = f"h{i}", max_num_states=20) for i in range(nplayers)]
+            for pl in players:
+                pl.simulate_moves = False
+            game = MoskaGame(players=players,
+                             log_level=0,
+                             timeout=20,
+                             gather_data=False,
+                             scheduler="sequential",
+                             )
+            game._make_mock_move = lambda move, args, state_fmt="FullGameState", game=game : checked_mock_move(game, move, args, state_fmt)
+            self.assertIsNotNone(game.start())
+        self.assertGreater(len(set(nchecked)), 3)
+    
+    def test_simulated_game(self):
+        """ Play a game with evaluator bots, which simulate the next states without modifying the game """
+        game = MoskaGame(players=[HeuristicEvaluatorBot(name = f"h{i}", max_num_states=20) for i in range(3)],
+                         log_level=0,
+                         timeout=20,
+                         gather_data=False,
+                         )
+        game._make_mock_move = None
+        self.assertIsNotNone(game.start())
+        self.assertEqual(game.EXIT_FLAG, False)
+    
+    def test_unknown_move(self):
+        with self.assertRaises(NameError):
+            apply_move(None, "PlayFallFromDeck", [None, lambda card : card])
+
+if __name__ == "__main__":
+    unittest.main()
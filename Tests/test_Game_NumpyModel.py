@@ -0,0 +1,89 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+import numpy as np
+from MoskaEngine.Game.Game import MoskaGame
+from MoskaEngine.Game.InterpreterPool import InterpreterPool, clear_interpreter_pools
+from MoskaEngine.Game.NumpyModel import NumpyModel, export_keras_model
+
+HAS_TENSORFLOW = importlib.util.find_spec("tensorflow") is not None
+
+def _reference(X, layers):
+    """ The forward pass of the layers without folding, in float64. """
+    X = X.astype(np.float64)
+    for kind, a, b, act in layers:
+        X = X @ a + b if kind == "dense" else X * a + b
+        if act == "relu":
+            X = np.maximum(X, 0)
+        elif act == "sigmoid":
+            X = 1 / (1 + np.exp(-X))
+    return X
+
+class TestNumpyModel(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        # Batch normalization, dense, batch normalization, dense, like get_nn_model
+        self.layers = [("batchnorm", rng.random(20) + 0.5, rng.normal(size=20), "linear"),
+                       ("dense", rng.normal(size=(20, 16)), rng.normal(size=16), "relu"),
+                       ("batchnorm", rng.random(16) + 0.5, rng.normal(size=16), "linear"),
+                       ("dense", rng.normal(size=(16, 1)), rng.normal(size=1), "sigmoid"),
+                       ]
+        arrays = {}
+        for i, (kind, a, b, _) in enumerate(self.layers):
+            names = ("scale", "shift") if kind == "batchnorm" else ("kernel", "bias")
+            arrays[f"{i}_{names[0]}"] = a.astype(np.float32)
+            arrays[f"{i}_{names[1]}"] = b.astype(np.float32)
+        self.path = os.path.join(self.folder.name, "model.npz")
+        np.savez(self.path, kinds=np.array([l[0] for l in self.layers]), activations=np.array([l[3] for l in self.layers]), input_size=np.array(20), **arrays)
+        self.X = rng.integers(0, 2, size=(50, 20)).astype(np.float32)
+
+    def tearDown(self):
+        clear_interpreter_pools()
+        self.folder.cleanup()
+
+    def test_predict(self):
+        model = NumpyModel(self.path)
+        # The batch normalizations are folded to the dense layers
+        self.assertEqual([layer[0] for layer in model.layers], ["dense", "dense"])
+        out = model.predict(self.X)
+        self.assertEqual(out.shape, (50, 1))
+        self.assertEqual(out.dtype, np.float32)
+        np.testing.assert_allclose(out, _reference(self.X, self.layers), rtol=1e-4, atol=1e-6)
+        # A channel dimension is flattened, and the input is not modified
+        X = self.X.copy()
+        np.testing.assert_array_equal(model.predict(X[..., np.newaxis]), out)
+        np.testing.assert_array_equal(X, self.X)
+
+    def test_game_uses_numpy_model(self):
+        game = MoskaGame(model_paths=[self.path], gather_data=False, headless=True)
+        self.assertIsInstance(game.interpreter_pools[0], NumpyModel)
+        out = game.predict_with_models(self.X, model_id=0)
+        self.assertEqual(out.shape, (1, 50, 1))
+        np.testing.assert_allclose(out[0], _reference(self.X, self.layers), rtol=1e-4, atol=1e-6)
+
+    @unittest.skipUnless(HAS_TENSORFLOW, "Requires tensorflow")
+    def test_parity_with_tensorflow(self):
+        import tensorflow as tf
+        model = tf.keras.models.Sequential()
+        model.add(tf.keras.layers.Input(shape=(20,)))
+        model.add(tf.keras.layers.BatchNormalization(axis=-1))
+        model.add(tf.keras.layers.Dense(16, activation="relu"))
+        model.add(tf.keras.layers.Dropout(0.4))
+        model.add(tf.keras.layers.Dense(8, activation="relu"))
+        model.add(tf.keras.layers.Dense(1, activation="sigmoid"))
+        # Non-trivial statistics for the batch normalization
+        rng = np.random.default_rng(1)
+        model.layers[0].set_weights([rng.random(20) + 0.5, rng.normal(size=20), rng.random(20), rng.random(20) + 0.1])
+        path = os.path.join(self.folder.name, "exported.npz")
+        export_keras_model(model, path)
+        out = NumpyModel(path).predict(self.X)
+        np.testing.assert_allclose(out, model(self.X, training=False).numpy(), rtol=1e-4, atol=1e-5)
+        content = tf.lite.TFLiteConverter.from_keras_model(model).convert()
+        pool = InterpreterPool("", max_batch_size=64, interpreter_factory=lambda : tf.lite.Interpreter(model_content=content))
+        np.testing.assert_allclose(out, pool.predict(self.X), rtol=1e-4, atol=1e-5)
+
+
+if __name__ == '__main__':
+    unittest.main()
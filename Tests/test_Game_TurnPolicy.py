@@ -0,0 +1,58 @@
+import unittest
+from MoskaEngine.Game.Game import MoskaGame
+from MoskaEngine.Game.TurnPolicy import RandomTurnPolicy, RoundRobinTurnPolicy, SeededRandomTurnPolicy, get_turn_policy
+from MoskaEngine.Player.MoskaBot3 import MoskaBot3
+
+class _Player:
+    """ A minimal stand-in for a player, the policies only look at the pid. """
+    def __init__(self, pid):
+        self.pid = pid
+
+class TestTurnPolicy(unittest.TestCase):
+    def setUp(self):
+        self.players = [_Player(pid) for pid in range(4)]
+    
+    def test_round_robin(self):
+        policy = RoundRobinTurnPolicy()
+        self.assertIs(policy.next_player(self.players, None), self.players[0])
+        self.assertIs(policy.next_player(self.players, self.players[1]), self.players[2])
+        self.assertIs(policy.next_player(self.players, self.players[3]), self.players[0])
+        # The previous player has finished
+        self.assertIs(policy.next_player(self.players[:2], self.players[2]), self.players[0])
+    
+    def test_random_excludes_previous(self):
+        policy = RandomTurnPolicy()
+        for _ in range(100):
+            self.assertIsNot(policy.next_player(self.players, self.players[2]), self.players[2])
+        # If the previous player is the only candidate, they get the turn
+        self.assertIs(policy.next_player(self.players[:1], self.players[0]), self.players[0])
+    
+    def test_seeded_random_is_reproducible(self):
+        p1 = SeededRandomTurnPolicy(seed=42)
+        p2 = SeededRandomTurnPolicy(seed=42)
+        order1 = [p1.next_player(self.players, None).pid for _ in range(20)]
+        order2 = [p2.next_player(self.players, None).pid for _ in range(20)]
+        self.assertEqual(order1, order2)
+    
+    def test_get_turn_policy(self):
+        self.assertIsInstance(get_turn_policy("round-robin"), RoundRobinTurnPolicy)
+        policy = RandomTurnPolicy()
+        self.assertIs(get_turn_policy(policy), policy)
+        with self.assertRaises(NameError):
+            get_turn_policy("not-a-policy")
+    
+    def test_game_with_policies(self):
+        for scheduler in ["threads", "sequential"]:
+            for policy in ["random", "seeded-random", "round-robin"]:
+                game = MoskaGame(players=[MoskaBot3(name = "mb1"), MoskaBot3(name = "mb2"), MoskaBot3(name = "mb3")],
+                                 log_level=0,
+                                 timeout=10,
+                                 gather_data=False,
+                                 scheduler=scheduler,
+                                 turn_policy=policy,
+                                 )
+                self.assertIsNotNone(game.start())
+                self.assertEqual(game.EXIT_FLAG, False)
+
+if __name__ == "__main__":
+    unittest.main()
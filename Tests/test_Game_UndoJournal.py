@@ -0,0 +1,71 @@
+import unittest
+from collections import deque
+from MoskaEngine.Game.UndoJournal import UndoJournal
+from MoskaEngine.Game.Game import MoskaGame
+from MoskaEngine.Game.GameState import FullGameState
+from MoskaEngine.Player.HeuristicEvaluatorBot import HeuristicEvaluatorBot
+
+class _Obj:
+    def __init__(self):
+        self.value = 1
+
+class TestUndoJournal(unittest.TestCase):
+    def test_rollback_containers(self):
+        lst = [1, 2, 3]
+        dq = deque([1, 2, 3])
+        dct = {"a" : lst}
+        journal = UndoJournal()
+        journal.save_contents(lst)
+        journal.save_contents(dq)
+        journal.save_contents(dct)
+        lst.pop(0)
+        dq.popleft()
+        dct["a"] = [5]
+        dct["b"] = []
+        # Saving again does not overwrite the original contents
+        journal.save_contents(lst)
+        lst.append(4)
+        journal.rollback()
+        self.assertEqual(lst, [1, 2, 3])
+        self.assertEqual(dq, deque([1, 2, 3]))
+        self.assertEqual(dct, {"a" : [1, 2, 3]})
+        self.assertIs(dct["a"], lst)
+        self.assertEqual(len(journal), 0)
+    
+    def test_rollback_attributes(self):
+        obj = _Obj()
+        journal = UndoJournal()
+        journal.save_attr(obj, "value")
+        obj.value = 2
+        journal.save_attr(obj, "value")
+        obj.value = 3
+        journal.rollback()
+        self.assertEqual(obj.value, 1)
+    
+    def test_mock_moves_restore_game(self):
+        """ Play a game with evaluator bots, and check after each mock move that the game was restored. """
+        orig_mock_move = MoskaGame._make_mock_move
+        nchecked = []
+        def checked_mock_move(game, move, args, state_fmt="FullGameState"):
+            before = FullGameState.from_game(game, copy=True)
+            new_state = orig_mock_move(game, move, args, state_fmt)
+            is_eq, msg = before.is_game_equal(game, return_msg=True)
+            self.assertTrue(is_eq, msg)
+            nchecked.append(1)
+            return new_state
+        players = [HeuristicEvaluatorBot(name = "h1", max_num_states=20), HeuristicEvaluatorBot(name = "h2", max_num_states=20)]
+        # Make the mock moves on the game, instead of simulating them
+        for pl in players:
+            pl.simulate_moves = False
+        game = MoskaGame(players=players,
+                         log_level=0,
+                         timeout=20,
+                         gather_data=False,
+                         scheduler="sequential",
+                         )
+        game._make_mock_move = lambda move, args, state_fmt="FullGameState" : checked_mock_move(game, move, args, state_fmt)
+        self.assertIsNotNone(game.start())
+        self.assertGreater(len(nchecked), 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,14 @@
 import os
+import pickle
+import random
+import threading
 import time
-from MoskaEngine.Game.Game import MoskaGame
+from MoskaEngine.Game.Game import MoskaGame, TrustedMoskaGame
 from MoskaEngine.Player.NewRandomPlayer import NewRandomPlayer
 from MoskaEngine.Player.MoskaBot3 import MoskaBot3
 from MoskaEngine.Player.NNEvaluatorBot import NNEvaluatorBot
 from MoskaEngine.Player.NNHIFEvaluatorBot import NNHIFEvaluatorBot
+from MoskaEngine.Player.HeuristicEvaluatorBot import HeuristicEvaluatorBot
 import unittest
 import shutil
 
@@ -34,6 +38,184 @@ class TestMoskaGame(unittest.TestCase):
         # Check that no new files were created
         self.assertEqual(curr_files, os.listdir())
 
+    def test_game_scratch_sequential(self):
+        """
+        Test running a game with the 'sequential' scheduler, where the players are played from the main thread.
+        """
+        game = MoskaGame(players=[MoskaBot3(name = "mb1"), MoskaBot3(name = "mb2"), NewRandomPlayer(name = "nr1")],
+                         log_level=0,
+                         timeout=10,
+                         gather_data=False,
+                         scheduler="sequential",
+                         )
+        result = game.start()
+        self.assertEqual(game.EXIT_FLAG, False)
+        self.assertIsNotNone(result)
+        # No threads should have been started
+        self.assertTrue(all((pl.thread is None for pl in game.players)))
+        self.assertTrue(all((pl.EXIT_STATUS == 1 for pl in game.players)))
+
+    def test_game_scratch_trusted(self):
+        """
+        Test running a trusted game, which doesn't check who sets the games attributes.
+        """
+        game = MoskaGame(players=[MoskaBot3(name = "mb1"), MoskaBot3(name = "mb2"), NewRandomPlayer(name = "nr1")],
+                         log_level=0,
+                         timeout=10,
+                         gather_data=False,
+                         scheduler="sequential",
+                         trusted=True,
+                         )
+        self.assertIsInstance(game, TrustedMoskaGame)
+        # Setting the players sets the turn cycle, also in a trusted game
+        self.assertIs(game.turnCycle.population, game.players)
+        result = game.start()
+        self.assertEqual(game.EXIT_FLAG, False)
+        self.assertIsNotNone(result)
+        self.assertTrue(all((pl.EXIT_STATUS == 1 for pl in game.players)))
+        with self.assertRaises(ValueError):
+            MoskaGame(players=[MoskaBot3(name = "mb1"), MoskaBot3(name = "mb2")], log_level=0, trusted=True, scheduler="threads")
+
+    def test_game_scratch_headless(self):
+        """
+        Test running a headless game, which doesn't log, create folders or write files, and returns the state vectors in memory.
+        """
+        curr_files = os.listdir()
+        curr_dir = os.getcwd()
+        game = MoskaGame(players=[MoskaBot3(name = "mb1", log_file="mb1.log"), MoskaBot3(name = "mb2"), NewRandomPlayer(name = "nr1")],
+                         log_file="game.log",
+                         in_folder="test_game_scratch_headless",
+                         timeout=10,
+                         gather_data=True,
+                         scheduler="sequential",
+                         headless=True,
+                         )
+        result = game.start()
+        self.assertIsNotNone(result)
+        self.assertEqual(curr_files, os.listdir())
+        self.assertEqual(curr_dir, os.getcwd())
+        self.assertTrue(game.glog.disabled)
+        self.assertTrue(all((pl.plog is game.glog for pl in game.players)))
+        self.assertTrue(game.state_results)
+        with self.assertRaises(ValueError):
+            MoskaGame(players=[MoskaBot3(name = "mb1"), MoskaBot3(name = "mb2")], headless=True, gather_jsons=True)
+
+    def test_game_scratch_metrics(self):
+        """
+        Test that a game collecting metrics returns them with the ranks.
+        """
+        for scheduler in ["threads", "sequential"]:
+            game = MoskaGame(players=[MoskaBot3(name = "mb1"), HeuristicEvaluatorBot(name = "he1"), NewRandomPlayer(name = "nr1")],
+                             log_level=0,
+                             timeout=10,
+                             gather_data=False,
+                             scheduler=scheduler,
+                             collect_metrics=True,
+                             )
+            ranks, metrics = game.start()
+            self.assertEqual(len(ranks), 3)
+            self.assertEqual(metrics["nmoves"], game.nturns)
+            self.assertGreater(metrics["nmock_moves"], 0)
+            self.assertIn("HeuristicEvaluatorBot/Skip", metrics["decisions"])
+            # The game ends the turn for a finished target without a decision
+            self.assertLessEqual(sum((d["count"] for d in metrics["decisions"].values())), game.nturns)
+            if scheduler == "threads":
+                self.assertGreater(metrics["lock_acquisitions"], 0)
+            else:
+                self.assertEqual(metrics["lock_acquisitions"], 0)
+
+    def test_game_replay_from_seed(self):
+        """
+        Test that a game with the same seed and players is replayed exactly, without using the global random module.
+        """
+        def play(seed, scheduler):
+            game = MoskaGame(players=[MoskaBot3(name = "mb1"), HeuristicEvaluatorBot(name = "he1"), NewRandomPlayer(name = "nr1")],
+                             timeout=10,
+                             gather_data=True,
+                             scheduler=scheduler,
+                             headless=True,
+                             random_seed=seed,
+                             )
+            return game.start(), game.nturns, game.state_results
+        global_state = random.getstate()
+        first = play(42, "sequential")
+        self.assertEqual(first, play(42, "sequential"))
+        self.assertEqual(first, play(42, "threads"))
+        self.assertNotEqual(first, play(43, "sequential"))
+        self.assertEqual(global_state, random.getstate())
+
+    def test_players_can_be_pickled(self):
+        """
+        Test that players can be pickled, since play_games sends them to the worker processes.
+        """
+        for pl in [MoskaBot3(name = "mb1"), NewRandomPlayer(name = "nr1"), HeuristicEvaluatorBot(name = "he1")]:
+            copy = pickle.loads(pickle.dumps(pl))
+            self.assertEqual(copy.name, pl.name)
+
+    def test_game_exit_wakes_waiting_players(self):
+        """
+        Test that every player thread exits, when the game exits while another thread holds the lock,
+        and the lock holder then finds out that the game is exiting.
+        """
+        game = MoskaGame(players=[MoskaBot3(name = f"mb{i}") for i in range(3)],
+                         log_level=0,
+                         timeout=10,
+                         gather_data=False,
+                         headless=True,
+                         )
+        game._set_trump()
+        game._create_locks()
+        with game.main_lock:
+            game._start_player_threads()
+            # No-one is given the turn, so the players wait for it
+            game.lock_holder = threading.get_native_id()
+            game._next_actor = -1
+            game.lock_holder = None
+        deadline = time.time() + 5
+        while len(game._turn_condition._waiters) < 3 and time.time() < deadline:
+            time.sleep(0.01)
+        held = threading.Event()
+        exiting = threading.Event()
+        got_lock = []
+        def hold_lock():
+            with game.main_lock:
+                game.threads[threading.get_native_id()] = game
+                held.set()
+                exiting.wait()
+                with game.get_lock() as ml:
+                    got_lock.append(ml)
+        holder = threading.Thread(target=hold_lock, daemon=True)
+        holder.start()
+        held.wait()
+        # The waiting players can't be woken up here, since the lock is held
+        game.EXIT_FLAG = True
+        exiting.set()
+        holder.join()
+        self.assertEqual(got_lock, [False])
+        for pl in game.players:
+            pl.thread.join(timeout=5)
+            self.assertFalse(pl.thread.is_alive())
+            self.assertEqual(pl.EXIT_STATUS, 2)
+
+    def test_game_player_failure(self):
+        """
+        Test that a failing player ends the game, and start returns None in both schedulers.
+        """
+        class FailingBot(MoskaBot3):
+            def choose_move(self, playable):
+                raise ValueError("Failing on purpose")
+        for scheduler in ["threads", "sequential"]:
+            game = MoskaGame(players=[MoskaBot3(name = "mb1"), FailingBot(name = "fail")],
+                             log_level=0,
+                             timeout=10,
+                             gather_data=False,
+                             scheduler=scheduler,
+                             )
+            result = game.start()
+            self.assertIsNone(result)
+            self.assertEqual(game.EXIT_FLAG, True)
+            self.assertEqual(game.players[1].EXIT_STATUS, 2)
+
     def test_game_scratch_with_logging(self):
         
         game = MoskaGame(players=[MoskaBot3(name = "mb1", log_file="mb1_test_game_scratch_with_logging.log"),
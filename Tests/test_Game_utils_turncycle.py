@@ -1,3 +1,4 @@
+import random
 import unittest
 from typing import List, Any, Callable
 import sys
@@ -86,6 +87,31 @@ class TestTurnCycle(unittest.TestCase):
         self.assertEqual(tc.get_next_condition(is_odd, incr_ptr=False), 3)
         self.assertEqual(tc.get_next_condition(is_odd,check_curr = False), 5)
         
+    def test_active_ring(self):
+        rng = random.Random(0)
+        for _ in range(200):
+            population = list(range(rng.randint(1, 8)))
+            active = [rng.random() < 0.5 for _ in population]
+            ptr = rng.randint(0, 20)
+            tc = TurnCycle(population, ptr=ptr, active=active)
+            # The ring lookups are the same as searching with a condition
+            ref = TurnCycle(population, ptr=ptr)
+            self.assertEqual(tc.get_next_active(), ref.get_next_condition(lambda x : active[x]))
+            self.assertEqual(tc.ptr, ref.ptr)
+            target = tc.get_at_index()
+            prev = ref.get_prev_condition(lambda x : active[x] and x != target)
+            if prev == []:
+                prev = ref.get_prev_condition(lambda x : active[x])
+            self.assertEqual(tc.get_prev_active(), prev)
+            self.assertEqual(tc.ptr, ref.ptr)
+        tc = TurnCycle(["a", "b", "c"])
+        tc.set_active("b", False)
+        self.assertEqual(tc.get_next_active(), "c")
+        self.assertEqual(tc.get_prev_active(), "a")
+        tc.set_active("a", False)
+        self.assertEqual(tc.get_prev_active(), "c")
+        self.assertEqual(tc.get_next_active(incr_ptr=False), "c")
+        
     def test_set_pointer(self):
         tc = TurnCycle([1, 2, 3, 4])
         tc.set_pointer(2)
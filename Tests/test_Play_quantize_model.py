@@ -0,0 +1,119 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from MoskaEngine.Game.InterpreterPool import clear_interpreter_pools
+from MoskaEngine.Play.quantize_model import load_representative_vectors, prediction_drift, passes_gate, loss_rate_difference, benchmark_loss_rate
+
+def _import_benchmarks():
+    """ Return the benchmark module, or None if the bundled models it loads are not available. """
+    try:
+        from MoskaEngine.Play import benchmark
+    except FileNotFoundError:
+        return None
+    return benchmark
+
+class _RecordingBenchmark:
+    """ A stand-in for a Benchmark, that records where it was run instead of playing games. """
+    def __init__(self):
+        self.folder = "Benchmark3"
+        self.runs = []
+
+    def run(self, player, cpus=-1, ngames=1000, custom_game_kwargs={}):
+        self.runs.append((self.folder, os.getcwd(), player.settings["model_id"], custom_game_kwargs["model_paths"]))
+        return 25.0
+
+def _save_dense_model(path, kernel, bias):
+    np.savez(path, kinds=np.array(["dense"]), activations=np.array(["sigmoid"]), input_size=np.array(kernel.shape[0]),
+             **{"0_kernel" : kernel.astype(np.float32), "0_bias" : bias.astype(np.float32)})
+
+class TestQuantizeModel(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        clear_interpreter_pools()
+        self.folder.cleanup()
+
+    def test_load_representative_vectors(self):
+        vectors = os.path.join(self.folder.name, "Vectors")
+        os.makedirs(vectors)
+        # Files are written like in MoskaGame: a vector and its label per line
+        for i in range(5):
+            with open(os.path.join(vectors, f"data_{i}.out"), "w") as f:
+                f.write("\n".join((",".join([str(i)] * 4 + [str(i % 2)]) for _ in range(10))))
+        open(os.path.join(vectors, "empty.out"), "w").close()
+        X = load_representative_vectors([vectors], nsamples=15, seed=0)
+        self.assertEqual(X.shape, (15, 4))
+        self.assertEqual(X.dtype, np.float32)
+        self.assertTrue(np.all(X == X[:, :1]))
+        np.testing.assert_array_equal(X, load_representative_vectors([vectors], nsamples=15, seed=0))
+        # At most all the vectors are returned
+        self.assertEqual(len(load_representative_vectors([vectors], nsamples=100)), 50)
+        with self.assertRaises(ValueError):
+            load_representative_vectors([os.path.join(self.folder.name, "missing")])
+
+    def test_prediction_drift_and_gate(self):
+        rng = np.random.default_rng(0)
+        kernel, bias = rng.normal(size=(8, 1)), rng.normal(size=1)
+        reference = os.path.join(self.folder.name, "reference.npz")
+        close = os.path.join(self.folder.name, "close.npz")
+        _save_dense_model(reference, kernel, bias)
+        _save_dense_model(close, kernel + rng.normal(scale=1e-3, size=kernel.shape), bias)
+        X = rng.integers(0, 2, size=(200, 8)).astype(np.float32)
+        same = prediction_drift(reference, reference, X)
+        self.assertEqual(same["mean_abs_drift"], 0)
+        self.assertEqual(same["agreement"], 1)
+        self.assertAlmostEqual(same["rank_correlation"], 1)
+        drift = prediction_drift(reference, close, X)
+        self.assertGreater(drift["mean_abs_drift"], 0)
+        self.assertLess(drift["mean_abs_drift"], 0.01)
+        self.assertGreater(drift["rank_correlation"], 0.99)
+        self.assertTrue(passes_gate(drift))
+        self.assertFalse(passes_gate(drift, max_mean_drift=drift["mean_abs_drift"] / 2))
+        self.assertFalse(passes_gate({**drift, "loss_rate_difference" : 5.0}))
+
+    def test_benchmark_loss_rate_keeps_working_directory(self):
+        benchmark = _RecordingBenchmark()
+        model = os.path.join(self.folder.name, "model.npz")
+        _save_dense_model(model, np.ones((8, 1)), np.zeros(1))
+        cwd = os.getcwd()
+        self.assertEqual(benchmark_loss_rate(model, benchmark=benchmark), 25.0)
+        self.assertEqual(benchmark_loss_rate(model, benchmark=benchmark), 25.0)
+        # Each run is a copy of the benchmark (sharing the list of runs), with the log folder in a new temporary directory
+        self.assertEqual(benchmark.folder, "Benchmark3")
+        self.assertEqual(len(benchmark.runs), 2)
+        self.assertNotEqual(benchmark.runs[0][0], benchmark.runs[1][0])
+        for folder, run_cwd, model_id, model_paths in benchmark.runs:
+            self.assertTrue(folder.startswith(tempfile.gettempdir()))
+            self.assertEqual(os.path.basename(folder), "Benchmark3")
+            self.assertFalse(os.path.exists(os.path.dirname(folder)))
+            # The working directory is not changed
+            self.assertEqual(run_cwd, cwd)
+            self.assertEqual(model_id, os.path.abspath(model))
+            self.assertEqual(model_paths, [model_id])
+        self.assertEqual(cwd, os.getcwd())
+
+    @unittest.skipUnless(_import_benchmarks(), "Requires the bundled models")
+    def test_loss_rate_difference_keeps_benchmark_paths(self):
+        benchmark = _import_benchmarks()
+        rng = np.random.default_rng(0)
+        # A model of the bitmap vectors of a 4 player game
+        reference = os.path.join(self.folder.name, "reference.npz")
+        other = os.path.join(self.folder.name, "other.npz")
+        _save_dense_model(reference, rng.normal(scale=0.1, size=(442, 1)), np.zeros(1))
+        _save_dense_model(other, rng.normal(scale=0.1, size=(442, 1)), np.zeros(1))
+        model_paths = list(benchmark.BENCH3.game_kwargs["model_paths"])
+        cwd = os.getcwd()
+        files = os.listdir()
+        result = loss_rate_difference(reference, other, ngames=2, cpus=1)
+        # A given reference loss rate is not benchmarked again
+        self.assertEqual(loss_rate_difference(reference, other, reference_loss_rate=50.0, ngames=2, cpus=1)["reference_loss_rate"], 50.0)
+        self.assertEqual(cwd, os.getcwd())
+        self.assertEqual(files, os.listdir())
+        self.assertEqual(result["loss_rate_difference"], result["loss_rate"] - result["reference_loss_rate"])
+        self.assertEqual(benchmark.BENCH3.game_kwargs["model_paths"], model_paths)
+
+
+if __name__ == '__main__':
+    unittest.main()
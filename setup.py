@@ -23,7 +23,7 @@ setup(
     packages=find_packages(),
     # Include the model files, and the player config files
     package_data={
-        'MoskaEngine': ['Models/*/*.tflite', 'Play/PlayerConfigs/*.json']
+        'MoskaEngine': ['Models/*/*.tflite', 'Models/*/*.npz', 'Play/PlayerConfigs/*.json']
     },
     install_requires=requirements,
     # Require python 3.6 or higher, but not 3.11 or higher